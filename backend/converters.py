@@ -0,0 +1,10 @@
+class OccurrenceIdConverter:
+    """Matches a ClassOccurrence id or a virtual occurrence id."""
+
+    regex = r"[0-9]+|v[0-9]+-[0-9]{8}"
+
+    def to_python(self, value):
+        return int(value) if value.isdigit() else value
+
+    def to_url(self, value):
+        return str(value)
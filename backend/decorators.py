@@ -1,6 +1,10 @@
 from functools import wraps
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+
+from .services import db_routing, response_cache
+from .services.query_budget import registry as query_budget_registry
+from .services.query_budget import view_name
 
 
 def clerk_login_required(view_func):
@@ -33,6 +37,90 @@ def role_required(*allowed_roles):
 
             return view_func(request, *args, **kwargs)
 
+        # Lets middleware check the role before the view runs.
+        wrapper.allowed_roles = allowed_roles
+        return wrapper
+
+    return decorator
+
+
+def conditional_get(*resources):
+    """
+    Mark a view whose GET response only changes with the school's versions
+    of the given school_cache resources, so ConditionalGetMiddleware can
+    answer revalidations with 304 before the view runs. Such views read
+    from the primary, as the validators name its versions.
+    """
+    def decorator(view_func):
+        view_func.conditional_resources = resources
+        return view_func
+
+    return decorator
+
+
+def query_budget(max_queries):
+    """
+    Declare the most queries the view may run per request: a number, or a
+    callable of the request. Enforced by QueryBudgetMiddleware.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        query_budget_registry[view_name(view_func)] = max_queries
+        return view_func
+
+    return decorator
+
+
+def reads_from(source):
+    """
+    Override where the view reads from on GET and HEAD requests:
+    db_routing.PRIMARY or db_routing.REPLICA (the default).
+    """
+    if source not in (db_routing.PRIMARY, db_routing.REPLICA):
+        raise ValueError(f"Unknown read source: {source}")
+
+    def decorator(view_func):
+        view_func.reads_from = source
+        return view_func
+
+    return decorator
+
+
+def cached_response(*resources):
+    """
+    Serve the view's GET responses from services.response_cache, keyed by
+    the school's versions of the given school_cache resources. Goes below
+    the role decorator so the role is checked before anything is served.
+    """
+    def decorator(view_func):
+        endpoint = view_func.__name__
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or getattr(request, "school", None) is None:
+                return view_func(request, *args, **kwargs)
+
+            # Versions are read before the view runs, so a write racing with
+            # it can only store newer data under the older key, never the
+            # reverse.
+            query = response_cache.normalized_query(request.GET)
+            key = response_cache.make_key(
+                endpoint, request.school.id, request.role,
+                f"{request.path_info}?{query}", resources)
+            cached = response_cache.lookup(key, endpoint)
+            if cached is not None:
+                body, content_type = cached
+                return HttpResponse(body, content_type=content_type)
+
+            # What is stored here is served for this version from now on,
+            # so it must not come from a lagging replica.
+            with db_routing.primary_reads():
+                response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                response_cache.store(
+                    key, response.content, response["Content-Type"])
+            return response
+
         return wrapper
 
     return decorator
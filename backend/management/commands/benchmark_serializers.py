@@ -0,0 +1,131 @@
+import timeit
+from datetime import date, time
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from backend.models import (
+    ClassModel, ClassOccurrence, Payment, Schedule, Student,
+)
+from backend.serializers import (
+    CaseSerializer, ClassModelSerializer, ClassOccurrenceSerializer,
+    PaymentSerializer, ScheduleSerializer, StudentSerializer,
+)
+
+LIST_ENDPOINT_SERIALIZERS = [
+    (StudentSerializer, Student),
+    (ClassModelSerializer, ClassModel),
+    (ScheduleSerializer, Schedule),
+    (ClassOccurrenceSerializer, ClassOccurrence),
+    (PaymentSerializer, Payment),
+]
+
+
+class PerKeyTranslation:
+    """
+    The baseline: CaseSerializer's key translation before the compiled
+    tables, converting every key on every row.
+    """
+
+    def to_representation(self, instance):
+        data = serializers.ModelSerializer.to_representation(self, instance)
+        return {
+            CaseSerializer.snake_to_camel(key): value
+            for key, value in data.items()
+        }
+
+    def to_internal_value(self, data):
+        data = {
+            CaseSerializer.camel_to_snake(key): value
+            for key, value in data.items()
+        }
+        return serializers.ModelSerializer.to_internal_value(self, data)
+
+
+def baseline_serializer(serializer_class):
+    return type(
+        f"PerKey{serializer_class.__name__}",
+        (PerKeyTranslation, serializer_class), {})
+
+
+def writable_fields(serializer_class):
+    """Fields to_internal_value can read back without database lookups."""
+    return [
+        name for name, field in serializer_class().fields.items()
+        if not field.read_only
+        and not isinstance(field, serializers.RelatedField)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time StudentSerializer and ClassOccurrenceSerializer reads and "
+        "writes against per-key translation, and with --school the DRF "
+        "versus fast_data read path of the list endpoints on that school's "
+        "rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--school", type=int)
+
+    def handle(self, *args, **options):
+        def best(func):
+            return min(timeit.repeat(
+                func, number=1, repeat=options["repeat"])) * 1000
+
+        self.benchmark_key_translation(options, best)
+        if options["school"] is not None:
+            self.benchmark_read_path(options["school"], best)
+
+    def benchmark_read_path(self, school_id, best):
+        for serializer_class, model in LIST_ENDPOINT_SERIALIZERS:
+            queryset = model.objects.filter(school_id=school_id)
+            count = queryset.count()
+            drf = best(lambda: serializer_class(queryset.all(), many=True).data)
+            fast = best(lambda: serializer_class.fast_data(queryset.all()))
+            self.stdout.write(
+                f"{serializer_class.__name__} queryset ({count} rows): "
+                f"DRF {drf:.2f} ms, fast_data {fast:.2f} ms "
+                f"({drf / fast:.1f}x)")
+
+    def benchmark_key_translation(self, options, best):
+        samples = [
+            (StudentSerializer, Student(
+                id=1, school_id=1, first_name="John", last_name="Doe",
+                emergency_contacts="Jane Doe")),
+            (ClassOccurrenceSerializer, ClassOccurrence(
+                id=1, school_id=1, class_model_id=1, schedule_id=1,
+                fallback_class_name="Foil",
+                planned_date=date(2025, 7, 7), actual_date=date(2025, 7, 7),
+                planned_start_time=time(10), actual_start_time=time(10),
+                planned_duration=60, actual_duration=60)),
+        ]
+
+        for serializer_class, instance in samples:
+            baseline_class = baseline_serializer(serializer_class)
+            instances = [instance] * options["rows"]
+            fields = writable_fields(serializer_class)
+            rows = serializer_class(instances, many=True, fields=fields).data
+            shipped = serializer_class(fields=fields)
+            baseline = baseline_class(fields=fields)
+
+            timings = {
+                "to_representation": (
+                    best(lambda: baseline_class(instances, many=True).data),
+                    best(lambda: serializer_class(instances, many=True).data),
+                ),
+                "to_internal_value": (
+                    best(lambda: [baseline.to_internal_value(row)
+                                  for row in rows]),
+                    best(lambda: [shipped.to_internal_value(row)
+                                  for row in rows]),
+                ),
+            }
+
+            self.stdout.write(f"{serializer_class.__name__} ({options['rows']} rows)")
+            for name, (per_key, compiled) in timings.items():
+                self.stdout.write(
+                    f"  {name}: per-key {per_key:.2f} ms, "
+                    f"shipped {compiled:.2f} ms ({per_key / compiled:.1f}x)")
@@ -1,10 +1,16 @@
 from django.core.management.base import BaseCommand
-from backend.tasks import create_class_occurrences
+from backend.tasks import occurrence_generation_chord
 
 
 class Command(BaseCommand):
-    help = "Create class occurrences for the upcoming week"
+    help = "Create class occurrences for every school's upcoming horizon"
 
     def handle(self, *args, **kwargs):
-        create_class_occurrences()
+        generation = occurrence_generation_chord()
+        # Run the subtasks in this process instead of queueing them.
+        summary = generation.apply().get() if generation else {}
+        for school_id, counts in summary.items():
+            self.stdout.write(
+                f"School {school_id}: created {counts['created']}, "
+                f"skipped {counts['skipped']}")
         self.stdout.write("Done")
@@ -0,0 +1,248 @@
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from backend.management.commands.seed_schools import (
+    SEED_ORG_PREFIX, seed_user_id,
+)
+from backend.models import School
+from backend.services import verify_token
+from backend.tasks import generate_school_occurrences
+
+# Requests carry "Bearer seed:<clerk user id>" instead of a Clerk JWT.
+TOKEN_PREFIX = "seed:"
+
+
+def verify_seeded_token(token):
+    """Accept the tokens of seeded staff, and nothing else."""
+    if not token.startswith(TOKEN_PREFIX + SEED_ORG_PREFIX):
+        return None
+    clerk_user_id = token[len(TOKEN_PREFIX):]
+    return {"sub": clerk_user_id, "email": f"{clerk_user_id}@example.com"}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Session:
+    """Requests one seeded school's staff make, with their timings."""
+
+    def __init__(self, school, rng, samples):
+        self.school = school
+        self.rng = rng
+        self.samples = samples
+        # Every school's kiosk has its own address, as check_in is rate
+        # limited per IP.
+        self.client = Client(
+            HTTP_X_SCHOOL_ID=str(school.id),
+            REMOTE_ADDR=f"10.{school.id >> 16 & 255}.{school.id >> 8 & 255}"
+                        f".{school.id & 255}")
+
+    def request(self, role, method, url_name, data=None):
+        token = TOKEN_PREFIX + seed_user_id(self.school, role)
+        kwargs = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        if method == "get":
+            call = lambda: self.client.get(reverse(url_name), data, **kwargs)
+        else:
+            call = lambda: getattr(self.client, method)(
+                reverse(url_name), json.dumps(data),
+                content_type="application/json", **kwargs)
+        response = self.timed(f"{method.upper()} {url_name}", call)
+        if response.status_code != 200:
+            return None
+        return json.loads(response.content)
+
+    def timed(self, name, func, *args):
+        start = time.perf_counter()
+        status = 200
+        try:
+            result = func(*args)
+            status = getattr(result, "status_code", status)
+            return result
+        except Exception:
+            status = 500
+            raise
+        finally:
+            self.samples.append((name, time.perf_counter() - start, status))
+
+
+def kiosk_rush(session, options):
+    """Students arriving for a class check in on the kiosk at once."""
+    today = date.today()
+    occurrences = session.request("kiosk", "get", "today_class_occurrences")
+    students = session.request(
+        "kiosk", "get", "students", {"fields": "roster"})
+    if not occurrences or not occurrences["response"] or not students:
+        return
+    occurrence = session.rng.choice(occurrences["response"])
+    arriving = session.rng.sample(
+        students["response"], min(options["rush_size"], len(students["response"])))
+    for i, student in enumerate(arriving, 1):
+        session.request("kiosk", "post", "check_in", {"checkInData": {
+            "studentId": student["id"],
+            "classOccurrencesList": [occurrence["id"]],
+            "todayDate": today.isoformat(),
+        }})
+        # The teacher's screen polls while students keep arriving.
+        if i % 10 == 0:
+            session.request("teacher", "get", "attended_students")
+
+
+def teacher_confirm(session, options):
+    """A teacher marks who of today's check-ins showed up."""
+    today = date.today()
+    attended = session.request("teacher", "get", "attended_students")
+    if attended is None:
+        return
+    session.request("teacher", "put", "confirm", {
+        "date": today.isoformat(),
+        "confirmationList": [
+            {str(student["id"]): {
+                str(occurrence_id): session.rng.random() < 0.9
+                for occurrence_id in student["occurrences"]
+            }}
+            for student in attended["confirmedAttendance"]
+        ],
+    })
+    session.request("teacher", "get", "attendances", {
+        "month": today.month, "year": today.year})
+
+
+def month_end(session, options):
+    """The owner goes through last month's payments and attendance."""
+    last_month = date.today().replace(day=1) - timedelta(days=1)
+    month = {"month": last_month.month, "year": last_month.year}
+    session.request("owner", "get", "payment_summary", month)
+    cursor = None
+    for _ in range(options["max_pages"]):
+        page = session.request("owner", "get", "payments", {
+            **month, "limit": 100, **({"cursor": cursor} if cursor else {})})
+        cursor = page and page["nextCursor"]
+        if not cursor:
+            break
+    session.request("owner", "get", "attendances", month)
+    session.request("owner", "get", "prices")
+    session.request("owner", "get", "students")
+
+
+def occurrence_generation(session, options):
+    """The nightly task rolling the school's occurrence horizon forward."""
+    session.timed(
+        "task generate_school_occurrences", generate_school_occurrences,
+        [session.school.id], date.today().isoformat(), session.school.shard)
+
+
+SCENARIOS = {
+    "kiosk_rush": kiosk_rush,
+    "teacher_confirm": teacher_confirm,
+    "month_end": month_end,
+    "occurrence_generation": occurrence_generation,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay kiosk, teacher and owner scenarios against the schools made "
+        "by seed_schools in-process, and report latency percentiles and "
+        "throughput per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios", nargs="*",
+            help=f"Scenarios to run, all by default: {', '.join(SCENARIOS)}")
+        parser.add_argument(
+            "--school", type=int, action="append", dest="school_ids",
+            help="Seeded school to use, all seeded schools by default")
+        parser.add_argument(
+            "--iterations", type=int, default=3,
+            help="Times every scenario runs per school")
+        parser.add_argument(
+            "--concurrency", type=int, default=1,
+            help="Scenarios running at the same time, each on a thread")
+        parser.add_argument(
+            "--rush-size", type=int, default=30,
+            help="Students checking in per kiosk rush")
+        parser.add_argument(
+            "--max-pages", type=int, default=20,
+            help="Payment pages read per month-end report")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, scenarios, school_ids, **options):
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        schools = School.objects.filter(
+            clerk_org_id__startswith=SEED_ORG_PREFIX).order_by("id")
+        if school_ids:
+            schools = schools.filter(id__in=school_ids)
+        schools = list(schools)
+        if not schools:
+            raise CommandError("No seeded schools; run seed_schools first")
+
+        jobs = [
+            (SCENARIOS[name], school, random.Random(
+                f"{options['seed']}:{name}:{school.id}:{iteration}"))
+            for iteration in range(options["iterations"])
+            for school in schools
+            for name in scenarios or SCENARIOS
+        ]
+        samples = []
+
+        def run(job):
+            scenario, school, rng = job
+            scenario(Session(school, rng, samples), options)
+
+        def run_in_thread(job):
+            try:
+                run(job)
+            finally:
+                connections.close_all()
+
+        with patch.object(verify_token, "verify_clerk_token",
+                          verify_seeded_token), \
+                override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            start = time.perf_counter()
+            if options["concurrency"] == 1:
+                for job in jobs:
+                    run(job)
+            else:
+                with ThreadPoolExecutor(options["concurrency"]) as executor:
+                    list(executor.map(run_in_thread, jobs))
+            elapsed = time.perf_counter() - start
+
+        self.report(samples, elapsed)
+
+    def report(self, samples, elapsed):
+        by_name = {}
+        for name, seconds, status in samples:
+            by_name.setdefault(name, []).append((seconds, status))
+
+        self.stdout.write(
+            f"{'endpoint':<40} {'count':>6} {'errors':>6} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name, results in sorted(by_name.items()):
+            timings = sorted(seconds * 1000 for seconds, _ in results)
+            errors = sum(1 for _, status in results if status >= 400)
+            self.stdout.write(
+                f"{name:<40} {len(results):>6} {errors:>6} "
+                f"{percentile(timings, 0.5):>8.1f} "
+                f"{percentile(timings, 0.95):>8.1f} "
+                f"{percentile(timings, 0.99):>8.1f} "
+                f"{len(results) / elapsed:>8.1f}")
+        self.stdout.write(
+            f"{len(samples)} requests in {elapsed:.2f} s, "
+            f"{len(samples) / elapsed:.1f} req/s")
@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from backend.models import (
+    Attendance, ClassModel, ClassOccurrence, MonthlyPaymentsSummary, Payment,
+    Price, Schedule, School, Student,
+)
+from backend.services import db_routing, school_cache
+
+# Parents before children, so every batch's foreign keys already exist.
+# Rows keep their ids, which clients hold in URLs, cursors and offline
+# kiosks. If the target shard already uses one of them the move is refused,
+# unless --renumber gives the copies new ids and rewrites their foreign keys.
+TENANT_MODELS = [
+    ClassModel, Student, Schedule, ClassOccurrence, Price, Payment,
+    Attendance, MonthlyPaymentsSummary,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a school's data to another database shard, keeping its row "
+        "ids"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("school_id", type=int)
+        parser.add_argument("target", help="Database alias to move the school to")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Rows read and written per batch")
+        parser.add_argument(
+            "--keep-source", action="store_true",
+            help="Leave the copied rows on the old shard")
+        parser.add_argument(
+            "--renumber", action="store_true",
+            help="Give the copied rows new ids when theirs are taken on the "
+                 "target; clients holding the old ids will break")
+
+    def handle(self, *args, school_id, target, batch_size, keep_source,
+               renumber, **kwargs):
+        if target not in settings.DATABASE_SHARDS:
+            raise CommandError(f"{target} is not one of DATABASE_SHARDS")
+        directory = db_routing.directory_alias()
+        try:
+            school = School.objects.using(directory).get(id=school_id)
+        except School.DoesNotExist:
+            raise CommandError(f"School {school_id} does not exist")
+        source = school.shard
+        if source == target:
+            raise CommandError(f"School {school_id} is already on {target}")
+
+        if not db_routing.lock_school_writes(school_id):
+            raise CommandError(f"School {school_id} is already being moved")
+        try:
+            with transaction.atomic(using=target):
+                if target != directory:
+                    self.copy_school(school, target)
+                # {model: {id on the source: id on the target}}
+                id_maps = {}
+                for model in TENANT_MODELS:
+                    id_maps[model] = self.copy_rows(
+                        model, school_id, source, target, batch_size, id_maps,
+                        renumber)
+                    self.stdout.write(
+                        f"{model.__name__}: copied {len(id_maps[model])}")
+                if not renumber:
+                    self.reset_sequences(target)
+
+            School.objects.using(directory).filter(id=school_id).update(
+                shard=target)
+            db_routing.forget_shard(school_id)
+            # Cached payloads and ETags carry the old ids.
+            for resource in (school_cache.PRICES, school_cache.SCHEDULES,
+                             school_cache.OCCURRENCES, school_cache.CLASSES,
+                             school_cache.STUDENTS):
+                school_cache.bump_version(school_id, resource)
+
+            if not keep_source:
+                for model in reversed(TENANT_MODELS):
+                    self.delete_rows(model, school_id, source, batch_size)
+                if source != directory:
+                    School.objects.using(source).filter(id=school_id).delete()
+        finally:
+            db_routing.unlock_school_writes(school_id)
+
+        self.stdout.write(f"Moved school {school_id} from {source} to {target}")
+
+    @staticmethod
+    def copy_school(school, target):
+        School.objects.using(target).update_or_create(
+            pk=school.pk,
+            defaults={
+                field.attname: getattr(school, field.attname)
+                for field in School._meta.concrete_fields
+                if not field.primary_key
+            },
+        )
+
+    @staticmethod
+    def copy_rows(model, school_id, source, target, batch_size, id_maps,
+                  renumber):
+        """Copy the school's rows of model; returns {old id: new id}."""
+        rows = model._base_manager.using(source).filter(
+            school_id=school_id).order_by("pk")
+        id_map, batch = {}, []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                Command.write_batch(
+                    model, batch, target, id_maps, id_map, renumber)
+                batch = []
+        if batch:
+            Command.write_batch(
+                model, batch, target, id_maps, id_map, renumber)
+
+        expected = rows.count()
+        if len(id_map) != expected:
+            raise CommandError(
+                f"{model.__name__}: copied {len(id_map)} of {expected} rows")
+        return id_map
+
+    @staticmethod
+    def write_batch(model, batch, target, id_maps, id_map, renumber):
+        old_ids = [row.pk for row in batch]
+        if not renumber:
+            taken = sorted(model._base_manager.using(target).filter(
+                pk__in=old_ids).values_list("pk", flat=True))
+            if taken:
+                raise CommandError(
+                    f"{model.__name__} ids {taken} are taken on {target}; "
+                    f"rerun with --renumber to give the copies new ids")
+        for row in batch:
+            for field in model._meta.concrete_fields:
+                if not field.is_relation or field.related_model not in id_maps:
+                    continue
+                old_id = getattr(row, field.attname)
+                if old_id is None:
+                    continue
+                try:
+                    setattr(row, field.attname,
+                            id_maps[field.related_model][old_id])
+                except KeyError:
+                    raise CommandError(
+                        f"{model.__name__} {row.pk} refers to "
+                        f"{field.related_model.__name__} {old_id} of "
+                        f"another school")
+            if renumber:
+                row.pk = None
+        model._base_manager.using(target).bulk_create(batch)
+        id_map.update(zip(old_ids, (row.pk for row in batch)))
+
+    @staticmethod
+    def reset_sequences(target):
+        """Move the target's sequences past the ids copied with their rows."""
+        connection = connections[target]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), TENANT_MODELS)
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    @staticmethod
+    def delete_rows(model, school_id, source, batch_size):
+        rows = model._base_manager.using(source).filter(school_id=school_id)
+        while True:
+            ids = list(rows.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            model._base_manager.using(source).filter(pk__in=ids).delete()
@@ -0,0 +1,208 @@
+import random
+import secrets
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import make_aware
+
+from backend.models import (
+    Attendance, ClassModel, ClassOccurrence, Day, Payment, Price, Schedule,
+    School, SchoolMembership, Student, User,
+)
+from backend.services import db_routing, school_cache
+from backend.services.availability import WEEKDAY_NAMES
+from backend.services.occurrence_generation import generate_horizon_occurrences
+
+# Seeded schools are recognised by this prefix, e.g. by the loadtest command.
+SEED_ORG_PREFIX = "seed_"
+# Roles of the staff created for every seeded school, see seed_user_id().
+SEED_ROLES = ("owner", "teacher", "kiosk")
+
+FIRST_NAMES = [
+    "Ann", "Bo", "Cy", "Dana", "Eli", "Fay", "Gus", "Hana", "Ivan", "Jo",
+    "Kai", "Lea", "Max", "Nia", "Otto", "Pia", "Quin", "Rosa", "Sam", "Tess",
+]
+CLASS_NAMES = [
+    "Foil", "Epee", "Sabre", "Yoga", "Pilates", "Boxing", "Judo", "Ballet",
+    "Salsa", "Climbing", "Spin", "Karate",
+]
+DAY_START_HOUR = 7
+
+
+def seed_user_id(school, role):
+    return f"{school.clerk_org_id}_{role}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Create schools with students, classes, schedules, past occurrences, "
+        "attendance and payments for load testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schools", type=int, default=1)
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--classes", type=int, default=10)
+        parser.add_argument(
+            "--schedules-per-class", type=int, default=2,
+            help="Weekly slots of every class")
+        parser.add_argument(
+            "--years", type=float, default=1.0,
+            help="Years of past occurrences, attendance and payments")
+        parser.add_argument(
+            "--attendance", type=int, default=8,
+            help="Students checked in to every past occurrence")
+        parser.add_argument(
+            "--shard", default="default",
+            help="Database alias the schools' data is created on")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed for the data")
+
+    def handle(self, *args, **options):
+        if options["shard"] not in settings.DATABASE_SHARDS:
+            raise CommandError(f"{options['shard']} is not one of DATABASE_SHARDS")
+        if options["classes"] * options["schedules_per_class"] > 7 * 16:
+            raise CommandError("At most 112 schedules fit in a week")
+
+        rng = random.Random(options["seed"])
+        today = date.today()
+        for _ in range(options["schools"]):
+            school = School.objects.create(
+                name=f"Seeded studio {secrets.token_hex(3)}",
+                clerk_org_id=f"{SEED_ORG_PREFIX}{secrets.token_hex(6)}",
+                shard=options["shard"],
+            )
+            self.create_staff(school)
+            with db_routing.using_shard(school.shard), \
+                    transaction.atomic(using=school.shard):
+                counts = self.seed_school(school, today, rng, options)
+            # Bulk inserts send no signals; drop anything cached for this id.
+            for resource in (school_cache.PRICES, school_cache.SCHEDULES,
+                             school_cache.OCCURRENCES, school_cache.CLASSES,
+                             school_cache.STUDENTS):
+                school_cache.bump_version(school.id, resource)
+
+            self.stdout.write(
+                f"School {school.id} ({school.clerk_org_id}): "
+                + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+    @staticmethod
+    def create_staff(school):
+        for role in SEED_ROLES:
+            clerk_user_id = seed_user_id(school, role)
+            user = User.objects.create(
+                username=clerk_user_id, clerk_user_id=clerk_user_id,
+                email=f"{clerk_user_id}@example.com")
+            SchoolMembership.objects.create(user=user, school=school, role=role)
+
+    def seed_school(self, school, today, rng, options):
+        batch_size = options["batch_size"]
+
+        classes = ClassModel.objects.bulk_create([
+            ClassModel(
+                school=school,
+                name=f"{CLASS_NAMES[i % len(CLASS_NAMES)]} {i // len(CLASS_NAMES) + 1}",
+                duration_minutes=60,
+            )
+            for i in range(options["classes"])
+        ], batch_size=batch_size)
+        prices = Price.objects.bulk_create([
+            Price(school=school, class_id=class_model,
+                  amount=rng.choice([15, 20, 25, 30]))
+            for class_model in classes
+        ], batch_size=batch_size)
+
+        # One hour slots round-robin over the week, so schedules never overlap.
+        days = {day.name: day for day in Day.objects.all()}
+        schedules = Schedule.objects.bulk_create([
+            Schedule(
+                school=school,
+                class_model=classes[slot % len(classes)],
+                day=days[WEEKDAY_NAMES[slot % 7]],
+                class_time=time(DAY_START_HOUR + slot // 7),
+            )
+            for slot in range(len(classes) * options["schedules_per_class"])
+        ], batch_size=batch_size)
+
+        students = Student.objects.bulk_create([
+            Student(
+                school=school,
+                first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+                last_name=f"Student{i}",
+            )
+            for i in range(options["students"])
+        ], batch_size=batch_size)
+
+        start = today - timedelta(days=round(365 * options["years"]))
+        occurrences = ClassOccurrence.objects.bulk_create(
+            self.past_occurrences(school, schedules, start, today),
+            batch_size=batch_size)
+
+        attendances = []
+        for occurrence in occurrences:
+            for student in rng.sample(
+                    students, min(options["attendance"], len(students))):
+                attendance = Attendance(
+                    school=school, student_id=student,
+                    class_occurrence=occurrence,
+                    attendance_date=occurrence.actual_date,
+                    is_showed_up=rng.random() < 0.9)
+                attendance.fill_fallbacks()
+                attendances.append(attendance)
+        Attendance.objects.bulk_create(attendances, batch_size=batch_size)
+
+        amounts = {price.class_id_id: price.amount for price in prices}
+        payments = []
+        for year, month in self.months(start, today):
+            for student in students:
+                class_model = rng.choice(classes)
+                payments.append(Payment(
+                    school=school, student_id=student, class_id=class_model,
+                    student_name=f"{student.first_name} {student.last_name}",
+                    class_name=class_model.name,
+                    amount=amounts[class_model.id],
+                    payment_date=make_aware(datetime(
+                        year, month, rng.randint(1, 28), rng.randint(8, 20))),
+                    payment_month=month, payment_year=year))
+        Payment.objects.bulk_create(payments, batch_size=batch_size)
+
+        upcoming = generate_horizon_occurrences(
+            school_ids=[school.id], today=today).get(school.id, {})
+
+        return {
+            "classes": len(classes),
+            "schedules": len(schedules),
+            "students": len(students),
+            "past occurrences": len(occurrences),
+            "upcoming occurrences": upcoming.get("created", 0),
+            "attendances": len(attendances),
+            "payments": len(payments),
+        }
+
+    @staticmethod
+    def past_occurrences(school, schedules, start, end):
+        """Weekly occurrences of every schedule from start until before end."""
+        for schedule in schedules:
+            weekday = WEEKDAY_NAMES.index(schedule.day.name)
+            day = start + timedelta(days=(weekday - start.weekday()) % 7)
+            class_model = schedule.class_model
+            while day < end:
+                yield ClassOccurrence(
+                    school=school, class_model=class_model, schedule=schedule,
+                    fallback_class_name=class_model.name,
+                    planned_date=day, actual_date=day,
+                    planned_start_time=schedule.class_time,
+                    actual_start_time=schedule.class_time,
+                    planned_duration=class_model.duration_minutes,
+                    actual_duration=class_model.duration_minutes)
+                day += timedelta(weeks=1)
+
+    @staticmethod
+    def months(start, end):
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            yield year, month
+            year, month = (year, month + 1) if month < 12 else (year + 1, 1)
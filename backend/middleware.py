@@ -1,13 +1,29 @@
+import cProfile
 import logging
+import re
+import time
+import zlib
 
 import jwt
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
 
 from .models import SchoolMembership
-from .services import user_sync, verify_token
+from .services import (
+    db_routing, metrics, profiling, query_budget, school_cache, slow_queries,
+    user_sync, verify_token,
+)
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +69,7 @@ def get_clerk_user(request):
 
 
 # Paths that do not require school membership validation
-EXEMPT_PATHS = {"/backend/me/", "/backend/schools/"}
+EXEMPT_PATHS = {"/backend/me/", "/backend/schools/", "/backend/metrics/"}
 
 
 class ClerkAuthenticationMiddleware:
@@ -101,3 +117,438 @@ class ClerkAuthenticationMiddleware:
         request.role = membership.role
 
         return self.get_response(request)
+
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/")
+COMPRESSION_RATIO_BUCKETS = (1, 1.5, 2, 3, 5, 8, 13, 20, 50)
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        # Emit what was compressed so far without ending the stream.
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def accepted_encodings(accept_encoding):
+    """Return the content codings accept_encoding allows, without q=0 ones."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        try:
+            if match and float(match[1]) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Brotli- or gzip-compresses JSON and text responses the client accepts,
+    preferring brotli when the optional package is installed.
+
+    Responses under COMPRESSION_MIN_SIZE bytes are sent as they are.
+    Streamed responses are compressed chunk by chunk. Compression ratio and
+    CPU time go to the metrics registry.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (response.has_header("Content-Encoding")
+                or not response.get("Content-Type", "").startswith(
+                    COMPRESSIBLE_CONTENT_TYPES)):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoder_class = self.choose_encoder(
+            request.headers.get("Accept-Encoding", ""))
+        if encoder_class is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, encoder_class)
+            del response["Content-Length"]
+        else:
+            content = response.content
+            if len(content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            encoder = encoder_class()
+            start = time.thread_time()
+            compressed = encoder.compress(content) + encoder.finish()
+            cpu_seconds = time.thread_time() - start
+            if len(compressed) >= len(content):
+                return response
+            self.record(encoder_class.name, len(content), len(compressed),
+                        cpu_seconds)
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed bytes differ from what a strong ETag promised.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoder_class.name
+        return response
+
+    @staticmethod
+    def choose_encoder(accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        if brotli is not None and "br" in accepted:
+            return BrotliEncoder
+        if "gzip" in accepted:
+            return GzipEncoder
+        return None
+
+    def compress_stream(self, chunks, encoder_class):
+        encoder = encoder_class()
+        raw_size, compressed_size, cpu_seconds = 0, 0, 0.0
+        for chunk in chunks:
+            start = time.thread_time()
+            data = encoder.compress(chunk) + encoder.flush()
+            cpu_seconds += time.thread_time() - start
+            raw_size += len(chunk)
+            compressed_size += len(data)
+            if data:
+                yield data
+        start = time.thread_time()
+        data = encoder.finish()
+        cpu_seconds += time.thread_time() - start
+        compressed_size += len(data)
+        yield data
+        self.record(encoder_class.name, raw_size, compressed_size, cpu_seconds)
+
+    @staticmethod
+    def record(encoding, raw_size, compressed_size, cpu_seconds):
+        metrics.increment(
+            "response_compression_input_bytes", raw_size, encoding=encoding)
+        metrics.increment(
+            "response_compression_output_bytes", compressed_size,
+            encoding=encoding)
+        metrics.observe(
+            "response_compression_ratio",
+            raw_size / compressed_size if compressed_size else 1,
+            buckets=COMPRESSION_RATIO_BUCKETS, encoding=encoding)
+        metrics.observe(
+            "response_compression_cpu_seconds", cpu_seconds,
+            encoding=encoding)
+
+
+class ConditionalGetMiddleware:
+    """
+    ETag and Last-Modified for views marked with @conditional_get.
+
+    Validators come from the school's version counters of the resources the
+    view depends on, read in process_view, so a matching If-None-Match (or
+    If-Modified-Since) gets a 304 before the view touches the ORM.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        validators = getattr(request, "conditional_validators", None)
+        if validators is not None and response.status_code == 200:
+            etag, last_modified = validators
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            self.patch_caching_headers(response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        resources = getattr(view_func, "conditional_resources", None)
+        if (not resources or request.method not in ("GET", "HEAD")
+                or getattr(request, "school", None) is None):
+            return None
+        # Leave unauthorized requests to the view's own 403.
+        allowed_roles = getattr(view_func, "allowed_roles", None)
+        if allowed_roles is not None and request.role not in allowed_roles:
+            return None
+
+        school_id = request.school.id
+        versions = ".".join(
+            str(school_cache.get_version(school_id, resource))
+            for resource in resources)
+        query = zlib.crc32(request.META.get("QUERY_STRING", "").encode())
+        # Weak: the body is the same data, not always the same bytes.
+        etag = f'W/"{school_id}-{versions}-{query:x}"'
+        last_modified = int(max(
+            school_cache.get_last_modified(school_id, resource)
+            for resource in resources))
+        request.conditional_validators = (etag, last_modified)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            not_modified = self.etag_matches(etag, if_none_match)
+        else:
+            since = parse_http_date_safe(
+                request.headers.get("If-Modified-Since", ""))
+            not_modified = since is not None and last_modified <= since
+        if not not_modified:
+            return None
+
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        self.patch_caching_headers(response)
+        return response
+
+    @staticmethod
+    def etag_matches(etag, if_none_match):
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as If-None-Match requires.
+        opaque = etag.removeprefix("W/")
+        return any(
+            tag.removeprefix("W/") == opaque
+            for tag in parse_etags(if_none_match))
+
+    @staticmethod
+    def patch_caching_headers(response):
+        # Always revalidate, and only in the client's own cache.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization", "X-School-ID"))
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Routes the view's queries to request.school's shard, and its reads to
+    the read replica when it is safe to; see services.db_routing. Writes to
+    a school that is being moved between shards get a 503.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_routing.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db_routing.end_request(token)
+
+        school = getattr(request, "school", None)
+        if (wrote and school is not None
+                and db_routing.replica_alias() is not None):
+            db_routing.pin_to_primary(school.id, request.user.id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        school = getattr(request, "school", None)
+        if school is None:
+            return None
+        db_routing.set_shard(school.shard)
+
+        if request.method not in db_routing.SAFE_METHODS:
+            if db_routing.is_moving(school.id):
+                return JsonResponse({
+                    "error": "School is being moved, try again shortly",
+                }, status=503)
+            return None
+        if (db_routing.replica_alias() is None
+                or getattr(view_func, "reads_from", db_routing.REPLICA) != db_routing.REPLICA
+                # The ETag names the primary's version; a lagging body
+                # under it would be revalidated with 304s until the next
+                # write.
+                or getattr(view_func, "conditional_resources", None)
+                or db_routing.is_pinned(school.id, request.user.id)):
+            return None
+        db_routing.read_from_replica()
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests owners and admins ask for with a profiling token,
+    and a sample of the rest; see services.profiling.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = profiling.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running on this thread.
+            return self.get_response(request)
+        query_log = profiling.QueryLog()
+        query_log.install()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            query_log.uninstall()
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        try:
+            profile_id = profiling.save(profiler, query_log, {
+                "created_at": time.time(),
+                "school_id": request.school.id,
+                "user_id": request.user.id,
+                "method": request.method,
+                "path": request.get_full_path(),
+                "view": match.url_name if match else None,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "trigger": trigger,
+            })
+        except OSError:
+            logger.exception("Could not store the profile of %s", request.path)
+            return response
+
+        metrics.increment("requests_profiled", trigger=trigger)
+        response["X-Profile-ID"] = profile_id
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Attributes the slow queries a view runs to it and to request.school;
+    see services.slow_queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            token = getattr(request, "slow_query_attribution", None)
+            if token is not None:
+                slow_queries.clear(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        school = getattr(request, "school", None)
+        request.slow_query_attribution = slow_queries.attribute(
+            query_budget.view_name(view_func),
+            school.id if school is not None else None)
+        return None
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of views declaring a @query_budget and reports the
+    ones going over it; see services.query_budget.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            budget = getattr(request, "query_budget", None)
+            if budget is not None:
+                budget[2].uninstall()
+        if budget is not None:
+            query_budget.check(*budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, "query_budget", None)
+        if budget is None or settings.QUERY_BUDGET_MODE == query_budget.OFF:
+            return None
+        counter = query_budget.QueryCounter()
+        counter.install()
+        request.query_budget = (
+            query_budget.view_name(view_func),
+            query_budget.limit_for(budget, request),
+            counter,
+        )
+        return None
+
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class MetricsMiddleware:
+    """
+    Records every request's latency, status code and database queries per
+    view, and the requests django_ratelimit rejected, in the metrics
+    registry; see services.metrics.
+
+    It goes first, so latency includes the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = query_budget.QueryCounter()
+        counter.install()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            counter.uninstall()
+        duration = time.perf_counter() - start
+
+        # Requests no view was resolved for share one label.
+        view = getattr(request, "metrics_view", "")
+        metrics.observe("http_request_duration_seconds", duration,
+                        view=view, method=request.method)
+        metrics.increment("http_responses", view=view, method=request.method,
+                          status=str(response.status_code))
+        metrics.increment("db_queries", counter.count, view=view)
+        metrics.increment("db_query_seconds", counter.duration, view=view)
+        metrics.observe("db_queries_per_request", counter.count,
+                        buckets=QUERY_COUNT_BUCKETS, view=view)
+        if getattr(request, "limited", False):
+            metrics.increment("ratelimit_rejections", view=view)
+        metrics.publish()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = query_budget.view_name(view_func)
+        return None
@@ -15,13 +15,16 @@ DAYS = [
 
 def populate_days(apps, schema_editor):
     Day = apps.get_model("backend", "Day")
+    # Every database gets the days, shards included.
+    days = Day.objects.using(schema_editor.connection.alias)
     for name in DAYS:
-        Day.objects.get_or_create(name=name)
+        days.get_or_create(name=name)
 
 
 def remove_days(apps, schema_editor):
     Day = apps.get_model("backend", "Day")
-    Day.objects.filter(name__in=DAYS).delete()
+    Day.objects.using(schema_editor.connection.alias).filter(
+        name__in=DAYS).delete()
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_populate_days'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['school', 'payment_year', 'payment_month', '-payment_date', '-id'], name='payment_month_keyset_idx'),
+        ),
+    ]
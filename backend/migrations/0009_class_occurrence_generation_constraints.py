@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_occurrences(apps, schema_editor):
+    """
+    Manually created occurrences were never deduplicated, so merge the ones
+    sharing a class, date and start time before the constraint goes on:
+    keep one (not cancelled if possible, then the oldest), move the others'
+    attendance to it and delete them.
+    """
+    ClassOccurrence = apps.get_model("backend", "ClassOccurrence")
+    Attendance = apps.get_model("backend", "Attendance")
+    alias = schema_editor.connection.alias
+    occurrences = ClassOccurrence.objects.using(alias)
+
+    duplicates = (
+        occurrences.filter(class_model__isnull=False)
+        .values("class_model", "actual_date", "actual_start_time")
+        .annotate(copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    for group in duplicates.iterator():
+        ids = list(occurrences.filter(
+            class_model=group["class_model"],
+            actual_date=group["actual_date"],
+            actual_start_time=group["actual_start_time"],
+        ).order_by("is_cancelled", "id").values_list("id", flat=True))
+        keep, merged = ids[0], ids[1:]
+
+        attendance = Attendance.objects.using(alias)
+        checked_in = set(attendance.filter(
+            class_occurrence_id=keep).values_list("student_id_id", flat=True))
+        for attendance_id, student_id in attendance.filter(
+                class_occurrence_id__in=merged).values_list(
+                    "id", "student_id_id"):
+            if student_id is not None and student_id in checked_in:
+                # Checked in to the kept copy already.
+                attendance.filter(id=attendance_id).delete()
+                continue
+            attendance.filter(id=attendance_id).update(class_occurrence_id=keep)
+            checked_in.add(student_id)
+        occurrences.filter(id__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+    # The merge commits on its own; PostgreSQL refuses to alter a table in
+    # the transaction that deleted rows with pending foreign key checks.
+    atomic = False
+
+    dependencies = [
+        ('backend', '0008_payment_month_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_occurrences, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='classoccurrence',
+            index=models.Index(fields=['school', 'actual_date'], name='backend_cla_school__fe52cb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='classoccurrence',
+            constraint=models.UniqueConstraint(fields=('class_model', 'actual_date', 'actual_start_time'), name='unique_class_occurrence_start'),
+        ),
+    ]
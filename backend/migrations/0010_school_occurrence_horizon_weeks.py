@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:22
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_class_occurrence_generation_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='occurrence_horizon_weeks',
+            field=models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(52)]),
+        ),
+    ]
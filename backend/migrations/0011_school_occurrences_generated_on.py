@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0010_school_occurrence_horizon_weeks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='occurrences_generated_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0011_school_occurrences_generated_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='shard',
+            field=models.CharField(default='default', max_length=64),
+        ),
+    ]
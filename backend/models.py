@@ -2,10 +2,29 @@ import datetime
 
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils.timezone import now
 
 
+def belongs_to_other_school(instance, field_name):
+    """
+    Whether the object instance's foreign key field_name points to belongs
+    to another school than instance. Compares in memory when the related
+    object is loaded and reads only its school_id column otherwise.
+    """
+    field = instance._meta.get_field(field_name)
+    related_id = getattr(instance, field.attname)
+    if related_id is None:
+        return False
+    if field.is_cached(instance):
+        school_id = field.get_cached_value(instance).school_id
+    else:
+        school_id = field.related_model._base_manager.filter(
+            pk=related_id).values_list("school_id", flat=True).first()
+    return school_id != instance.school_id
+
+
 class School(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -14,6 +33,14 @@ class School(models.Model):
     phone = models.CharField(max_length=50, blank=True)
     address = models.TextField(blank=True)
     logo_url = models.URLField(blank=True)
+    # How many weeks ahead class occurrences are generated from schedules
+    occurrence_horizon_weeks = models.PositiveSmallIntegerField(
+        default=4,
+        validators=[MinValueValidator(1), MaxValueValidator(52)])
+    # Last day the scheduled occurrence generation completed for the school
+    occurrences_generated_on = models.DateField(null=True, blank=True)
+    # Database alias holding the school's data (see services.db_routing)
+    shard = models.CharField(max_length=64, default="default")
 
     @property
     def owner(self):
@@ -129,7 +156,7 @@ class Schedule(models.Model):
             self.class_time}'
 
     def clean(self):
-        if self.class_model and self.class_model.school_id != self.school_id:
+        if belongs_to_other_school(self, "class_model"):
             raise ValidationError(
                 f"Class {
                     self.class_model_id} does not belong to school {
@@ -163,11 +190,9 @@ class ClassOccurrence(models.Model):
     is_cancelled = models.BooleanField(default=False)
     notes = models.TextField(blank=True, default='')
 
-    # TODO: add indexing?
-
     @property
     def safe_class_id(self):
-        return self.class_model.id if self.class_model else None
+        return self.class_model_id
 
     @property
     def safe_class_name(self):
@@ -184,18 +209,26 @@ class ClassOccurrence(models.Model):
             "fallback_class_name",
             "actual_date",
             "actual_start_time")
+        constraints = [
+            # Lets weekly generation insert with ignore_conflicts.
+            models.UniqueConstraint(
+                fields=["class_model", "actual_date", "actual_start_time"],
+                name="unique_class_occurrence_start",
+            ),
+        ]
         indexes = [
             models.Index(fields=["school"]),
+            models.Index(fields=["school", "actual_date"]),
         ]
 
     def clean(self):
-        if self.class_model and self.class_model.school_id != self.school_id:
+        if belongs_to_other_school(self, "class_model"):
             raise ValidationError(
                 f"Class {
                     self.class_model_id} does not belong to school {
                     self.school_id}")
 
-        if self.schedule and self.schedule.school_id != self.school_id:
+        if belongs_to_other_school(self, "schedule"):
             raise ValidationError(
                 f"Schedule does not belong to school {
                     self.school_id}")
@@ -232,13 +265,17 @@ class Attendance(models.Model):
     attendance_date = models.DateField(default=datetime.date.today)
     is_showed_up = models.BooleanField(default=True)
 
+    # The id properties read foreign key columns, so they never load the
+    # related rows.
     @property
     def safe_student_id(self):
-        return self.student_id.id if self.student_id else self.fallback_student_id
+        if self.student_id_id is not None:
+            return self.student_id_id
+        return self.fallback_student_id
 
     @property
     def safe_class_id(self):
-        if self.class_occurrence:
+        if self.class_occurrence_id is not None:
             return self.class_occurrence.safe_class_id
         return self.fallback_class_id
 
@@ -246,7 +283,7 @@ class Attendance(models.Model):
     @property
     def safe_occurrence_id(self):
         # TODO: have it always present, like fallback?
-        return self.class_occurrence.id if self.class_occurrence else None
+        return self.class_occurrence_id
 
     @property
     def safe_class_name(self):
@@ -270,13 +307,13 @@ class Attendance(models.Model):
             self.attendance_date})"
 
     def clean(self):
-        if self.student_id and self.student_id.school_id != self.school_id:
+        if belongs_to_other_school(self, "student_id"):
             raise ValidationError(
                 f"Student {
                     self.student_id} does not belong to school {
                     self.school_id}")
 
-        if self.class_occurrence and self.class_occurrence.school_id != self.school_id:
+        if belongs_to_other_school(self, "class_occurrence"):
             raise ValidationError(
                 f"Class occurrence {
                     self.class_occurrence_id} does not belong to school {
@@ -284,7 +321,11 @@ class Attendance(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
+        self.fill_fallbacks()
+        super().save(*args, **kwargs)
 
+    def fill_fallbacks(self):
+        """Copy the names and ids that outlive the student and class."""
         if self.student_id:
             self.fallback_student_id = self.student_id.id
             if not self.student_first_name:
@@ -305,8 +346,6 @@ class Attendance(models.Model):
             if not self.attendance_date:
                 self.attendance_date = self.class_occurrence.actual_date
 
-        super().save(*args, **kwargs)
-
 
 class Payment(models.Model):
     id = models.AutoField(primary_key=True)
@@ -326,12 +365,12 @@ class Payment(models.Model):
     payment_year = models.IntegerField()
 
     def clean(self):
-        if self.student_id and self.student_id.school_id != self.school_id:
+        if belongs_to_other_school(self, "student_id"):
             raise ValidationError(
                 f"Student {
                     self.student_id} does not belong to school {
                     self.school_id}")
-        if self.class_id and self.class_id.school_id != self.school_id:
+        if belongs_to_other_school(self, "class_id"):
             raise ValidationError(
                 f"Class {
                     self.class_id} does not belong to school {
@@ -351,6 +390,13 @@ class Payment(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["school"]),
+            # Serves the monthly payments listing, including its keyset
+            # pagination on (payment_date, id).
+            models.Index(
+                fields=["school", "payment_year", "payment_month",
+                        "-payment_date", "-id"],
+                name="payment_month_keyset_idx",
+            ),
         ]
 
 
@@ -367,7 +413,7 @@ class Price(models.Model):
         ]
 
     def clean(self):
-        if self.class_id and self.class_id.school_id != self.school_id:
+        if belongs_to_other_school(self, "class_id"):
             raise ValidationError(
                 f"Class {
                     self.class_id} does not belong to school {
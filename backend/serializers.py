@@ -1,6 +1,8 @@
 import re
+from functools import lru_cache
 
-from rest_framework import serializers
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import relations, serializers
 
 from .models import (
     Attendance, ClassModel, ClassOccurrence, Day, MonthlyPaymentsSummary,
@@ -11,25 +13,82 @@ from .models import (
 class CaseSerializer(serializers.ModelSerializer):
     """
     The basic serializer to convert between snake_case (Django models) and CamelCase (frontend).
+
+    Pass ``fields`` to restrict the serialized output to a subset of the declared fields.
+    Key translations for the model's fields are compiled into per-class tables when the
+    class is created; other keys go through a memoized converter.
+
+    ``sparse_fields`` lists the fields clients may request with ``?fields=``
+    (all readable fields when None), and ``field_sets`` names common
+    selections, whose read plans are compiled when the app loads.
     """
 
+    # {snake_key: camelKey} and its inverse, compiled per subclass.
+    _camel_keys = {}
+    _snake_keys = {}
+
+    sparse_fields = None
+    field_sets = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        names = set(cls._declared_fields)
+        model = getattr(getattr(cls, "Meta", None), "model", None)
+        if model is not None:
+            names.update(field.name for field in model._meta.get_fields())
+        cls._camel_keys = {name: cls.snake_to_camel(name) for name in names}
+        # Only invert translations camel_to_snake would reproduce.
+        cls._snake_keys = {
+            camel: name for name, camel in cls._camel_keys.items()
+            if cls.camel_to_snake(camel) == name
+        }
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     def to_representation(self, instance):
         # From django model instance to dictionary with camelCase keys (of
         # primitive datatypes)
         data = super().to_representation(instance)
-        return {self.snake_to_camel(key): value for key, value in data.items()}
+        camel_keys = self._camel_keys
+        return {
+            camel_keys[key] if key in camel_keys else camelize(key): value
+            for key, value in data.items()
+        }
 
     def to_internal_value(self, data):
         # From dictionary of primitive datatypes (with camelCase keys) to
-        # dictionary with native values (with snake_keys)
-        data = {self.camel_to_snake(key): value for key, value in data.items()}
+        # dictionary with native values (with snake_keys). Client keys are
+        # not memoized, so unknown ones cannot grow a cache.
+        snake_keys = self._snake_keys
+        data = {
+            snake_keys[key] if key in snake_keys else self.camel_to_snake(key): value
+            for key, value in data.items()
+        }
         return super().to_internal_value(data)
 
+    @classmethod
+    def allowed_fields(cls):
+        """Snake_case names of the fields ?fields= may select."""
+        return _allowed_fields(cls)
+
+    @classmethod
+    def read_plan(cls, fields=None):
+        """The cached ReadPlan for this serializer restricted to fields."""
+        return _read_plan(cls, None if fields is None else frozenset(fields))
+
+    @classmethod
+    def fast_data(cls, queryset, fields=None):
+        """Same as cls(queryset, many=True, fields=fields).data, read with values_list()."""
+        plan = cls.read_plan(fields)
+        return plan.to_dicts(queryset.values_list(*plan.lookups))
+
     @staticmethod
     def dict_to_camel_case(dict_data):
-        return {
-            CaseSerializer.snake_to_camel(key): value for key,
-            value in dict_data.items()}
+        return {camelize(key): value for key, value in dict_data.items()}
 
     @staticmethod
     def snake_to_camel(snake_str):
@@ -45,7 +104,7 @@ class CaseSerializer(serializers.ModelSerializer):
         result = {}
         for key, value in d.items():
             if key in keys:
-                result[CaseSerializer.snake_to_camel(key)] = value
+                result[camelize(key)] = value
             else:
                 result[key] = value
         return result
@@ -53,19 +112,128 @@ class CaseSerializer(serializers.ModelSerializer):
     school = serializers.PrimaryKeyRelatedField(read_only=True)
 
 
+class ReadPlan:
+    """
+    Read-only serialization of a CaseSerializer's fields straight from
+    values_list() rows, skipping model instances and most per-field calls.
+
+    Rows must start with the columns in ``lookups``; extra trailing columns
+    are ignored. Fields whose value is already in its JSON form (text,
+    integers, booleans, related ids) are copied as they are, the others go
+    through the DRF field's to_representation, and None stays None, so the
+    output matches serializer.data.
+    """
+
+    PASSTHROUGH_FIELDS = (
+        serializers.CharField, serializers.IntegerField,
+        serializers.BooleanField,
+    )
+
+    def __init__(self, serializer):
+        model_fields = {
+            field.name for field in serializer.Meta.model._meta.concrete_fields}
+        self.lookups, self.keys, self.converters = [], [], []
+        for index, field in enumerate(serializer._readable_fields):
+            if field.source not in model_fields:
+                raise TypeError(
+                    f"{type(serializer).__name__}.{field.field_name} is not "
+                    "a model column and cannot be read from values_list()")
+            self.lookups.append(field.source)
+            self.keys.append(serializer._camel_keys.get(
+                field.field_name) or camelize(field.field_name))
+            passthrough = (
+                isinstance(field, relations.PrimaryKeyRelatedField)
+                and field.pk_field is None
+            ) or isinstance(field, self.PASSTHROUGH_FIELDS)
+            if not passthrough:
+                self.converters.append((index, field.to_representation))
+
+    def to_dicts(self, rows):
+        keys, converters = self.keys, self.converters
+        if not converters:
+            return [dict(zip(keys, row)) for row in rows]
+        data = []
+        for row in rows:
+            row = list(row)
+            for index, convert in converters:
+                value = row[index]
+                if value is not None:
+                    row[index] = convert(value)
+            data.append(dict(zip(keys, row)))
+        return data
+
+
+@lru_cache(maxsize=256)
+def _read_plan(serializer_class, fields):
+    return ReadPlan(serializer_class(fields=fields))
+
+
+@lru_cache(maxsize=None)
+def _allowed_fields(serializer_class):
+    readable = [field.field_name
+                for field in serializer_class()._readable_fields]
+    if serializer_class.sparse_fields is None:
+        return tuple(readable)
+    return tuple(name for name in readable
+                 if name in serializer_class.sparse_fields)
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def precompile_read_plans(serializer_classes=None):
+    """Build the read plans of every serializer's field_sets up front."""
+    if serializer_classes is None:
+        serializer_classes = _subclasses(CaseSerializer)
+    for serializer_class in serializer_classes:
+        allowed = set(serializer_class.allowed_fields())
+        for name, fields in serializer_class.field_sets.items():
+            unknown = set(fields) - allowed
+            if unknown:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.field_sets[{name!r}] has "
+                    f"fields that cannot be selected: {', '.join(sorted(unknown))}")
+            serializer_class.read_plan(fields)
+
+
+@lru_cache(maxsize=4096)
+def camelize(snake_str):
+    """Memoized CaseSerializer.snake_to_camel."""
+    return CaseSerializer.snake_to_camel(snake_str)
+
+
 class StudentSerializer(CaseSerializer):
+    field_sets = {
+        "roster": ("id", "first_name", "last_name"),
+    }
+
     class Meta:
         model = Student
         fields = '__all__'
 
 
 class ClassModelSerializer(CaseSerializer):
+    field_sets = {
+        "summary": ("id", "name", "duration_minutes"),
+    }
+
     class Meta:
         model = ClassModel
         fields = '__all__'
 
 
 class ClassOccurrenceSerializer(CaseSerializer):
+    field_sets = {
+        # What the check-in kiosk shows for a class.
+        "kiosk": (
+            "id", "class_model", "fallback_class_name", "actual_date",
+            "actual_start_time", "actual_duration", "is_cancelled",
+        ),
+    }
+
     class Meta:
         model = ClassOccurrence
         fields = '__all__'
@@ -110,7 +278,8 @@ class MonthlyPaymentsSummarySerializer(CaseSerializer):
 class SchoolSerializer(CaseSerializer):
     class Meta:
         model = School
-        fields = '__all__'
+        # The shard alias is deployment detail, not school data.
+        exclude = ('shard',)
 
 class InvitationSerializer(CaseSerializer):
     class Meta:
@@ -0,0 +1,109 @@
+"""
+Schedule availability computed on minute bitmaps.
+
+A week is laid out as one arbitrary-precision integer with one bit per
+minute: day ``i`` occupies bits ``[i * DAY_STRIDE, i * DAY_STRIDE + 1440)``
+and the extra bit per stride stays clear, so free runs never cross midnight.
+Shifts and ANDs on the integer run in C over the whole week at once, which
+lets every day be answered from a single pass over the free windows.
+"""
+from ..models import Schedule
+
+WEEKDAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+
+MINUTES_PER_DAY = 24 * 60
+DAY_STRIDE = MINUTES_PER_DAY + 1
+
+
+def time_to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def hhmm_to_minutes(value):
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_hhmm(value):
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def load_schedule_intervals(school_id, day=None):
+    """
+    Return {day_name: [(start_minute, end_minute), ...]} for the school's
+    schedules, fetched together with class durations in one joined query.
+    """
+    schedules = Schedule.objects.filter(school_id=school_id)
+    if day is not None:
+        schedules = schedules.filter(day=day)
+
+    intervals = {}
+    for day_name, class_time, duration in schedules.values_list(
+            "day__name", "class_time", "class_model__duration_minutes"):
+        start = time_to_minutes(class_time)
+        end = min(start + duration, MINUTES_PER_DAY)
+        intervals.setdefault(day_name, []).append((start, end))
+    return intervals
+
+
+def _span(start, end):
+    return ((1 << (end - start)) - 1) << start if end > start else 0
+
+
+def _free_windows(free):
+    # Yield (start, end) bit positions of every run of set bits in free.
+    starts = free & ~(free << 1)
+    while starts:
+        lowest = starts & -starts
+        starts ^= lowest
+        start = lowest.bit_length() - 1
+        run = free >> start
+        # run ^ (run + 1) sets the trailing ones of run plus the bit above.
+        length = (run ^ (run + 1)).bit_length() - 1
+        yield start, start + length
+
+
+def find_available_slots(
+        intervals_by_day,
+        durations,
+        step_minutes,
+        day_start_minutes,
+        day_end_minutes,
+        day_names=WEEKDAY_NAMES):
+    """
+    Return {day_name: {duration: ["HH:MM", ...]}} for every day in day_names.
+
+    Within each free window candidates start at the window start and advance
+    by step_minutes while the class still fits before the window ends.
+    """
+    window, occupied = 0, 0
+    for index, day_name in enumerate(day_names):
+        offset = index * DAY_STRIDE
+        window |= _span(day_start_minutes, day_end_minutes) << offset
+        for start, end in intervals_by_day.get(day_name, []):
+            occupied |= _span(start, end) << offset
+
+    result = {
+        day_name: {duration: [] for duration in durations}
+        for day_name in day_names
+    }
+
+    for start, end in _free_windows(window & ~occupied):
+        index = start // DAY_STRIDE
+        offset = index * DAY_STRIDE
+        slots_by_duration = result[day_names[index]]
+        for duration in durations:
+            slots_by_duration[duration].extend(
+                minutes_to_hhmm(candidate - offset)
+                for candidate in range(start, end - duration + 1, step_minutes)
+            )
+
+    return result
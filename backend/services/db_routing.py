@@ -0,0 +1,252 @@
+"""
+Database routing: tenant shards and a read replica.
+
+Tenant shards. The directory (School, User, SchoolMembership, Invitation)
+lives on settings.DATABASE_DIRECTORY_ALIAS. Every other model belongs to a
+school, and ``School.shard`` names the alias in settings.DATABASE_SHARDS
+that holds it. DatabaseRoutingMiddleware routes a request to
+``request.school``'s shard; tasks and commands use using_school() or
+using_shard(). Shards keep a copy of their schools' directory row so
+foreign keys hold, and the day table is reference data present everywhere.
+The move_school_shard command moves a school between shards.
+
+Read replica. With settings.DATABASE_REPLICA_ALIAS set, reads a view makes
+while serving GET and HEAD requests go to the replica of the default
+database. Reads go to the primary instead:
+
+- for requests with any other method, and views marked
+  ``@reads_from(db_routing.PRIMARY)`` or ``@conditional_get``, whose
+  validators name the primary's versions;
+- for the rest of a request once it has written anything;
+- for a user who wrote to the same school in the last
+  DATABASE_REPLICA_PIN_SECONDS, so they read their own writes;
+- while building shared cached payloads (primary_reads()), which would
+  otherwise store lagging replica data under a current version.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+DIRECTORY_APPS = {"admin", "auth", "contenttypes", "sessions"}
+DIRECTORY_MODELS = {
+    "backend.school", "backend.user", "backend.schoolmembership",
+    "backend.invitation",
+}
+REFERENCE_MODELS = {"backend.day"}
+
+# A move takes a school's writes offline for at most this long.
+MOVE_LOCK_SECONDS = 60 * 60
+
+
+class RequestRoute:
+    """Routing state of the request (or task) being served."""
+
+    def __init__(self, reads=None, shard=None):
+        # Alias reads go to, or None for the primary.
+        self.reads = reads
+        # Alias of the current school's data, or None for the default.
+        self.shard = shard
+        self.wrote = False
+
+
+_route = ContextVar("db_route", default=None)
+
+
+def replica_alias():
+    return settings.DATABASE_REPLICA_ALIAS
+
+
+def directory_alias():
+    return settings.DATABASE_DIRECTORY_ALIAS
+
+
+def begin_request():
+    """Start routing a request; returns the token for end_request()."""
+    return _route.set(RequestRoute())
+
+
+def end_request(token):
+    """Stop routing; returns whether the request wrote anything."""
+    route = _route.get()
+    _route.reset(token)
+    return route is not None and route.wrote
+
+
+def read_from_replica():
+    """Send the current request's reads to the replica from now on."""
+    route = _route.get()
+    if route is not None and not route.wrote:
+        route.reads = replica_alias()
+
+
+def set_shard(alias):
+    """Route the current request's tenant data to alias."""
+    route = _route.get()
+    if route is not None:
+        route.shard = alias
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block."""
+    route = _route.get()
+    if route is None:
+        yield
+        return
+    reads, route.reads = route.reads, None
+    try:
+        yield
+    finally:
+        route.reads = reads
+
+
+@contextmanager
+def using_shard(alias):
+    """Route tenant data to alias inside the block, e.g. in a task."""
+    token = _route.set(RequestRoute(shard=alias))
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def using_school(school_id):
+    return using_shard(shard_for(school_id))
+
+
+def _shard_key(school_id):
+    return f"school:{school_id}:shard"
+
+
+def shard_for(school_id):
+    """The alias holding the school's data, cached until forget_shard()."""
+    from ..models import School
+
+    key = _shard_key(school_id)
+    alias = cache.get(key)
+    if alias is None:
+        alias = School.objects.using(directory_alias()).filter(
+            id=school_id).values_list("shard", flat=True).first()
+        alias = alias or DEFAULT_DB_ALIAS
+        cache.set(key, alias, timeout=None)
+    return alias
+
+
+def forget_shard(school_id):
+    cache.delete(_shard_key(school_id))
+
+
+def shard_school_ids(school_ids=None):
+    """{shard alias: [school ids]}, all schools by default."""
+    from ..models import School
+
+    schools = School.objects.using(directory_alias()).order_by("id")
+    if school_ids is not None:
+        schools = schools.filter(id__in=school_ids)
+    by_shard = {}
+    for school_id, alias in schools.values_list("id", "shard"):
+        by_shard.setdefault(alias, []).append(school_id)
+    return by_shard
+
+
+def _move_lock_key(school_id):
+    return f"school:{school_id}:moving"
+
+
+def lock_school_writes(school_id):
+    """Take the move lock; returns False if the school is already moving."""
+    return cache.add(_move_lock_key(school_id), True,
+                     timeout=MOVE_LOCK_SECONDS)
+
+
+def unlock_school_writes(school_id):
+    cache.delete(_move_lock_key(school_id))
+
+
+def is_moving(school_id):
+    return bool(cache.get(_move_lock_key(school_id)))
+
+
+def _pin_key(school_id, user_id):
+    return f"db_pin:{school_id}:{user_id}"
+
+
+def pin_to_primary(school_id, user_id):
+    cache.set(_pin_key(school_id, user_id), True,
+              timeout=settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(school_id, user_id):
+    return bool(cache.get(_pin_key(school_id, user_id)))
+
+
+class ShardRouter:
+    """
+    Sends directory models to the directory alias and tenant models to the
+    current school's shard. Defers to ReplicaRouter when the answer is the
+    default database.
+    """
+
+    @staticmethod
+    def _alias(model, hints):
+        label = model._meta.label_lower
+        if model._meta.app_label in DIRECTORY_APPS or label in DIRECTORY_MODELS:
+            return directory_alias()
+        if label in REFERENCE_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            instance_label = instance._meta.label_lower
+            if instance_label == "backend.school":
+                return instance.shard
+            # Related lookups stay on the shard the instance came from.
+            if (instance_label not in DIRECTORY_MODELS | REFERENCE_MODELS
+                    and instance._state.db in settings.DATABASE_SHARDS):
+                return instance._state.db
+        route = _route.get()
+        return route.shard if route is not None else None
+
+    def db_for_read(self, model, **hints):
+        alias = self._alias(model, hints)
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_write(self, model, **hints):
+        alias = self._alias(model, hints)
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shards hold copies of their schools' rows and of the days.
+        aliases = {directory_alias(), *settings.DATABASE_SHARDS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if route is None or route.wrote:
+            return None
+        return route.reads
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            route.wrote = True
+            route.reads = None
+        # Instances read from the replica are still saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
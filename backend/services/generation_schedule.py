@@ -0,0 +1,70 @@
+"""
+Staggered nightly occurrence generation.
+
+The generation window (OCCURRENCE_GENERATION_WINDOW_* settings, in
+CELERY_TIMEZONE) is cut into buckets of OCCURRENCE_GENERATION_BUCKET_MINUTES
+and every school is hashed into one of them, so each bucket only generates
+its own share of the schools. Schools whose generation did not complete are
+picked up by a catch-up pass once the window is over.
+"""
+import zlib
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Q
+
+from ..models import School
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def local_now():
+    return datetime.now(ZoneInfo(settings.CELERY_TIMEZONE))
+
+
+def bucket_count():
+    return max(1, settings.OCCURRENCE_GENERATION_WINDOW_MINUTES
+               // settings.OCCURRENCE_GENERATION_BUCKET_MINUTES)
+
+
+def school_bucket(school_id, buckets):
+    # crc32 rather than hash(): it must not change between processes.
+    return zlib.crc32(str(school_id).encode()) % buckets
+
+
+def current_bucket(now):
+    """Return the bucket `now` falls in, or None outside the window."""
+    window_start = settings.OCCURRENCE_GENERATION_WINDOW_START_HOUR * 60
+    elapsed = (now.hour * 60 + now.minute - window_start) % MINUTES_PER_DAY
+    if elapsed >= settings.OCCURRENCE_GENERATION_WINDOW_MINUTES:
+        return None
+    return min(elapsed // settings.OCCURRENCE_GENERATION_BUCKET_MINUTES,
+               bucket_count() - 1)
+
+
+def pending_school_ids(today):
+    """Ids of the schools whose generation has not completed for today."""
+    return list(
+        School.objects.filter(
+            Q(occurrences_generated_on__isnull=True)
+            | Q(occurrences_generated_on__lt=today)
+        ).order_by("id").values_list("id", flat=True)
+    )
+
+
+def due_school_ids(now):
+    """Ids of the pending schools hashed into the bucket `now` falls in."""
+    bucket = current_bucket(now)
+    if bucket is None:
+        return []
+    buckets = bucket_count()
+    return [
+        school_id for school_id in pending_school_ids(now.date())
+        if school_bucket(school_id, buckets) == bucket
+    ]
+
+
+def mark_generated(school_ids, today):
+    School.objects.filter(id__in=school_ids).update(
+        occurrences_generated_on=today)
@@ -0,0 +1,67 @@
+"""
+JSON encoder backends for API responses.
+
+``stdlib`` is exactly what django.http.JsonResponse writes. ``orjson`` is
+used when the optional package is installed; it writes compact UTF-8 and
+encodes dates, times and datetimes natively in DjangoJSONEncoder's format,
+UTC as "Z", except that it keeps microseconds where Django cuts them to
+milliseconds. Only the types orjson does not know (timedeltas, decimals,
+lazy strings) go to DjangoJSONEncoder.
+Select one with the JSON_ENCODER_BACKEND setting ("auto", "orjson" or
+"stdlib"); "auto" prefers orjson.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_django_default = DjangoJSONEncoder().default
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def orjson_dumps(data):
+    return orjson.dumps(
+        data,
+        default=_django_default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+BACKENDS = {
+    "stdlib": stdlib_dumps,
+    "orjson": orjson_dumps,
+}
+
+_resolved = {}
+
+
+def get_backend_name():
+    """The backend JSON_ENCODER_BACKEND resolves to in this process."""
+    requested = getattr(settings, "JSON_ENCODER_BACKEND", "auto")
+    if requested not in _resolved:
+        if requested not in ("auto", *BACKENDS):
+            raise ValueError(f"Unknown JSON encoder backend: {requested}")
+        name = requested
+        if name == "auto":
+            name = "orjson" if orjson is not None else "stdlib"
+        elif name == "orjson" and orjson is None:
+            logger.warning("orjson is not installed; encoding JSON with the stdlib")
+            name = "stdlib"
+        _resolved[requested] = name
+    return _resolved[requested]
+
+
+def dumps(data):
+    """Encode data to JSON bytes with the configured backend."""
+    return BACKENDS[get_backend_name()](data)
@@ -0,0 +1,259 @@
+"""
+Metrics registry.
+
+Counters, gauges and histograms are keyed by metric name plus label
+values, e.g.
+``metrics.observe("response_compression_ratio", 5.2, encoding="gzip")``.
+Gauges of process state are set by @collector functions just before the
+registry is published.
+
+Every process records into its own registry. Gunicorn workers and Celery
+workers each publish a snapshot of theirs to the shared cache at most every
+settings.METRICS_PUBLISH_INTERVAL seconds; collect() merges the snapshots of
+all live processes and render() formats them for a Prometheus scrape. A
+process that stops publishing drops out after settings.METRICS_PROCESS_TIMEOUT
+seconds, which scrapers see as a counter reset.
+"""
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # One count per bucket upper bound plus one for +Inf.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, counts, count, total):
+        for i, bucket_count in enumerate(counts):
+            self.counts[i] += bucket_count
+        self.count += count
+        self.sum += total
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name, **labels):
+        return self.counters.get(self._key(name, labels), 0)
+
+    def gauge_value(self, name, **labels):
+        return self.gauges.get(self._key(name, labels))
+
+    def histogram(self, name, **labels):
+        return self.histograms.get(self._key(name, labels))
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """A picklable copy of the counters, gauges and histograms."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {
+                    key: (h.buckets, list(h.counts), h.count, h.sum)
+                    for key, h in self.histograms.items()
+                },
+            }
+
+    def merge(self, snapshot):
+        """Add another registry's snapshot to this one."""
+        with self._lock:
+            for key, value in snapshot["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            # Gauges of per-process state add up to the whole deployment's.
+            for key, value in snapshot.get("gauges", {}).items():
+                self.gauges[key] = self.gauges.get(key, 0) + value
+            for key, (buckets, counts, count, total) in (
+                    snapshot["histograms"].items()):
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(buckets)
+                elif histogram.buckets != tuple(buckets):
+                    # Recorded by a process running other code; unmergeable.
+                    continue
+                histogram.merge(counts, count, total)
+
+    def _after_fork(self):
+        # A forked worker starts counting from zero, its parent publishes
+        # what came before; the lock may have been held by another thread.
+        self._lock = threading.Lock()
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry._after_fork)
+
+increment = registry.increment
+set_gauge = registry.set_gauge
+observe = registry.observe
+
+collectors = []
+
+
+def collector(func):
+    """Register func to set its gauges before every publish."""
+    collectors.append(func)
+    return func
+
+
+# ── Sharing between processes ─────────────────────────────────────────────────
+
+INDEX_KEY = "metrics:processes"
+SLOT_KEY = "metrics:process:{}"
+
+_last_published = None
+
+
+def process_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def publish(force=False):
+    """Store this process's snapshot in its cache slot, if it is due."""
+    global _last_published
+    now = time.monotonic()
+    if (not force and _last_published is not None
+            and now - _last_published < settings.METRICS_PUBLISH_INTERVAL):
+        return
+    _last_published = now
+
+    for collect_gauges in collectors:
+        collect_gauges()
+    process = process_id()
+    cache.set(SLOT_KEY.format(process), registry.snapshot(),
+              timeout=settings.METRICS_PROCESS_TIMEOUT)
+    # Two processes joining at once may drop one of them from the index;
+    # the dropped one adds itself back on its next publish.
+    processes = cache.get(INDEX_KEY, set())
+    if process not in processes:
+        cache.set(INDEX_KEY, processes | {process}, timeout=None)
+
+
+def collect():
+    """A registry with the metrics of every live process merged."""
+    publish(force=True)
+    processes = cache.get(INDEX_KEY, set())
+    slots = cache.get_many([SLOT_KEY.format(process) for process in processes])
+
+    merged = Registry()
+    for snapshot in slots.values():
+        merged.merge(snapshot)
+
+    gone = {process for process in processes
+            if SLOT_KEY.format(process) not in slots}
+    if gone:
+        cache.set(INDEX_KEY, cache.get(INDEX_KEY, set()) - gone, timeout=None)
+    return merged
+
+
+# ── Prometheus text format ────────────────────────────────────────────────────
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + "}"
+
+
+def render(registry):
+    """The registry in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(registry.counters.items()):
+        # Counters are named without the _total suffix the format expects.
+        name = f"{name}_total"
+        declare(name, "counter")
+        lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+
+    for (name, labels), value in sorted(registry.gauges.items()):
+        declare(name, "gauge")
+        lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+
+    for (name, labels), histogram in sorted(
+            registry.histograms.items(), key=lambda item: item[0]):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(
+                (*histogram.buckets, float("inf")), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, le=_format_value(bound))}"
+                         f" {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} "
+                     f"{_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
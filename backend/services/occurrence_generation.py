@@ -0,0 +1,224 @@
+"""
+Materialization of ClassOccurrence rows from weekly schedules.
+
+Every school keeps occurrences for a rolling horizon of
+``School.occurrence_horizon_weeks`` weeks starting today. A daily task rolls
+the horizon forward, and schedule or class edits regenerate just the
+affected schedules so new classes show up immediately. With
+settings.VIRTUAL_OCCURRENCES on nothing is generated ahead of time; see
+services.virtual_occurrences.
+"""
+import logging
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Count, F
+
+from ..models import ClassOccurrence, School, Schedule
+from . import school_cache
+from .availability import WEEKDAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+SCHOOL_CHUNK_SIZE = 100
+BULK_CREATE_BATCH_SIZE = 500
+
+WEEKDAY_OFFSETS = {name.lower(): offset for offset, name in enumerate(WEEKDAY_NAMES)}
+
+
+def horizon_end(today, horizon_weeks):
+    """Last date (inclusive) of a horizon of horizon_weeks starting today."""
+    return today + timedelta(weeks=horizon_weeks, days=-1)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _count_occurrences_by_school(school_ids, start_date, end_date):
+    return dict(
+        ClassOccurrence.objects.filter(
+            school_id__in=school_ids,
+            schedule__isnull=False,
+            planned_date__range=(start_date, end_date),
+        ).values_list("school_id").annotate(Count("id"))
+    )
+
+
+def _generate(end_dates, start_date, schedule_ids=None,
+              batch_size=BULK_CREATE_BATCH_SIZE):
+    """
+    Create the missing occurrences from start_date up to end_dates[school_id]
+    (inclusive) for the given schools, optionally only for schedule_ids.
+
+    Existing occurrences are fetched in one query and diffed in memory by
+    (schedule, planned_date), so an occurrence that was moved or cancelled
+    is not generated again. The rest are bulk inserted, with the class start
+    time constraint absorbing a concurrent run and any row that already takes
+    the slot. Returns {school_id: {"created": n, "skipped": n}}.
+    """
+    school_ids = list(end_dates)
+    last_date = max(end_dates.values(), default=start_date)
+
+    existing_keys, counts_before = set(), Counter()
+    for school_id, *key in ClassOccurrence.objects.filter(
+        school_id__in=school_ids,
+        schedule__isnull=False,
+        planned_date__range=(start_date, last_date),
+    ).values_list("school_id", "schedule_id", "planned_date"):
+        existing_keys.add(tuple(key))
+        counts_before[school_id] += 1
+
+    schedules = Schedule.objects.filter(school_id__in=school_ids)
+    if schedule_ids is not None:
+        schedules = schedules.filter(id__in=schedule_ids)
+
+    to_create = []
+    scheduled_by_school = {school_id: 0 for school_id in school_ids}
+
+    for (schedule_id, school_id, class_id, class_name, duration,
+         day_name, class_time) in schedules.values_list(
+            "id", "school_id", "class_model_id", "class_model__name",
+            "class_model__duration_minutes", "day__name", "class_time"):
+        offset = WEEKDAY_OFFSETS.get(day_name.lower())
+        if offset is None:
+            logger.warning(
+                "Skipping schedule id=%s with unknown day %s",
+                schedule_id, day_name)
+            continue
+
+        occurrence_date = start_date + timedelta(
+            days=(offset - start_date.weekday()) % 7)
+        while occurrence_date <= end_dates[school_id]:
+            scheduled_by_school[school_id] += 1
+            key = (schedule_id, occurrence_date)
+            if key not in existing_keys:
+                existing_keys.add(key)
+                to_create.append(ClassOccurrence(
+                    school_id=school_id,
+                    class_model_id=class_id,
+                    fallback_class_name=class_name,
+                    schedule_id=schedule_id,
+                    planned_date=occurrence_date,
+                    actual_date=occurrence_date,
+                    planned_start_time=class_time,
+                    actual_start_time=class_time,
+                    planned_duration=duration,
+                    actual_duration=duration,
+                    is_cancelled=False,
+                ))
+            occurrence_date += timedelta(weeks=1)
+
+    if to_create:
+        ClassOccurrence.objects.bulk_create(
+            to_create, batch_size=batch_size, ignore_conflicts=True)
+        counts_after = _count_occurrences_by_school(
+            school_ids, start_date, last_date)
+    else:
+        counts_after = counts_before
+
+    summary = {}
+    for school_id in school_ids:
+        created = (counts_after.get(school_id, 0)
+                   - counts_before.get(school_id, 0))
+        summary[school_id] = {
+            "created": created,
+            "skipped": scheduled_by_school[school_id] - created,
+        }
+        if created:
+            # bulk_create does not send post_save signals.
+            school_cache.bump_version_on_commit(
+                school_id, school_cache.OCCURRENCES,
+                using=router.db_for_write(ClassOccurrence))
+
+    return summary
+
+
+def generate_horizon_occurrences(
+        school_ids=None,
+        today=None,
+        chunk_size=SCHOOL_CHUNK_SIZE,
+        batch_size=BULK_CREATE_BATCH_SIZE):
+    """
+    Roll every school's occurrence horizon forward to today, one query for
+    existing occurrences per chunk of schools.
+    Returns {school_id: {"created": n, "skipped": n}}.
+    """
+    if settings.VIRTUAL_OCCURRENCES:
+        return {}
+    today = today or date.today()
+    schools = School.objects.order_by("id")
+    if school_ids is not None:
+        schools = schools.filter(id__in=school_ids)
+    horizons = list(schools.values_list("id", "occurrence_horizon_weeks"))
+
+    summary = {}
+    for chunk in _chunks(horizons, chunk_size):
+        end_dates = {
+            school_id: horizon_end(today, horizon_weeks)
+            for school_id, horizon_weeks in chunk
+        }
+        summary.update(_generate(end_dates, today, batch_size=batch_size))
+    return summary
+
+
+def sync_schedule_occurrences(school, schedule_ids, today=None):
+    """Fill the school's horizon for just the given schedules."""
+    if settings.VIRTUAL_OCCURRENCES:
+        return {"created": 0, "skipped": 0}
+    today = today or date.today()
+    end_dates = {school.id: horizon_end(today, school.occurrence_horizon_weeks)}
+    return _generate(end_dates, today, schedule_ids=schedule_ids)[school.id]
+
+
+def refresh_class_occurrences(school, class_model, today=None):
+    """
+    Bring upcoming occurrences of the class's schedules in line with the
+    class after an edit, then fill the horizon for those schedules.
+
+    Occurrences that were cancelled, moved or resized by hand are left as
+    they are.
+    """
+    today = today or date.today()
+    updated = ClassOccurrence.objects.filter(
+        school=school,
+        schedule__class_model=class_model,
+        actual_date__gte=today,
+        is_cancelled=False,
+        actual_date=F("planned_date"),
+        actual_start_time=F("planned_start_time"),
+        actual_duration=F("planned_duration"),
+    ).exclude(
+        planned_duration=class_model.duration_minutes,
+    ).update(
+        planned_duration=class_model.duration_minutes,
+        actual_duration=class_model.duration_minutes,
+    )
+    if updated:
+        school_cache.bump_version_on_commit(
+            school.id, school_cache.OCCURRENCES,
+            using=router.db_for_write(ClassOccurrence))
+
+    schedule_ids = list(
+        Schedule.objects.filter(class_model=class_model)
+        .values_list("id", flat=True)
+    )
+    return sync_schedule_occurrences(school, schedule_ids, today=today)
+
+
+def remove_future_occurrences(schedule_ids, today=None):
+    """
+    Delete the upcoming, uncancelled occurrences of the given schedules that
+    nobody has checked in to. Returns the number of occurrences deleted.
+    """
+    today = today or date.today()
+    deleted, _ = ClassOccurrence.objects.filter(
+        schedule_id__in=schedule_ids,
+        actual_date__gte=today,
+        is_cancelled=False,
+        attendance__isnull=True,
+    ).delete()
+    return deleted
@@ -0,0 +1,161 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries an X-Profile-Token header issued to
+the school's owners and admins (POST /backend/profiles/), or at random at
+settings.PROFILING_SAMPLE_RATE. ProfilingMiddleware runs it under cProfile
+with a log of its database queries, and saves the profile to
+settings.PROFILING_DIR: ``<id>.prof`` holds the raw stats for pstats or
+snakeviz, ``<id>.json`` the request, the query timeline and the most
+expensive functions. Only the newest settings.PROFILING_MAX_PROFILES are
+kept. Owners and admins list their school's profiles at /backend/profiles/.
+"""
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+from .query_budget import QueryCounter
+
+HEADER = "X-Profile-Token"
+TOKEN_SALT = "backend.profiling"
+# Functions kept in the JSON record, by cumulative time.
+TOP_FUNCTIONS = 30
+
+PROFILE_ID_RE = re.compile(r"^\d+-[0-9a-f]{8}$")
+
+
+def issue_token(school_id):
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(school_id))
+
+
+def token_is_valid(token, school_id):
+    try:
+        value = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == str(school_id)
+
+
+def trigger(request):
+    """Why the request is to be profiled: "token", "sample" or None."""
+    school = getattr(request, "school", None)
+    if school is None:
+        return None
+    token = request.headers.get(HEADER)
+    if token and token_is_valid(token, school.id):
+        return "token"
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class QueryLog(QueryCounter):
+    """QueryCounter that also keeps when each query ran and for how long."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = time.perf_counter()
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            # Parameters are left out, they may hold personal data.
+            self.queries.append({
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "database": context["connection"].alias,
+                "sql": sql,
+            })
+
+
+def _directory():
+    return Path(settings.PROFILING_DIR)
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler).stats
+    functions = [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in stats.items()
+    ]
+    functions.sort(key=lambda function: function["cumulative_ms"], reverse=True)
+    return functions[:limit]
+
+
+def save(profiler, query_log, info):
+    """Store a finished profile and return its id."""
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    record = {
+        "id": profile_id,
+        **info,
+        "query_count": query_log.count,
+        "query_ms": round(query_log.duration * 1000, 3),
+        "queries": query_log.queries,
+        "functions": top_functions(profiler),
+    }
+    # Written aside and renamed, so readers never see half a file.
+    partial = directory / f".{profile_id}.json"
+    partial.write_text(json.dumps(record, default=str))
+    os.replace(partial, directory / f"{profile_id}.json")
+
+    prune()
+    return profile_id
+
+
+def prune():
+    """Delete all but the newest settings.PROFILING_MAX_PROFILES profiles."""
+    records = sorted(_directory().glob("*.json"))
+    for path in records[:max(0, len(records) - settings.PROFILING_MAX_PROFILES)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # Pruned by another process meanwhile.
+        return None
+
+
+def list_profiles(school_id):
+    """Summaries of the school's stored profiles, newest first."""
+    summaries = []
+    for path in sorted(_directory().glob("*.json"), reverse=True):
+        record = _read(path)
+        if record is not None and record["school_id"] == school_id:
+            record.pop("queries")
+            record.pop("functions")
+            summaries.append(record)
+    return summaries
+
+
+def load(profile_id, school_id):
+    """The school's full profile record, or None."""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    record = _read(_directory() / f"{profile_id}.json")
+    if record is None or record["school_id"] != school_id:
+        return None
+    return record
@@ -0,0 +1,79 @@
+"""
+Per-endpoint query budgets.
+
+Views declare the most queries one request may run with
+``@query_budget(n)``, or with a callable of the request for endpoints whose
+work grows with the payload. Budgets do not depend on how many rows a
+school has: every listing is expected to run a constant number of queries.
+QueryBudgetMiddleware counts the queries each view runs on every database
+and, depending on settings.QUERY_BUDGET_MODE, logs ("log") or raises
+QueryBudgetExceeded ("raise") when a view goes over; "off" skips counting.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+LOG = "log"
+RAISE = "raise"
+
+# {view name: budget} of every view declaring one.
+registry = {}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def view_name(view_func):
+    return f"{view_func.__module__}.{view_func.__name__}"
+
+
+def limit_for(budget, request):
+    return budget(request) if callable(budget) else budget
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.statements.append(sql)
+
+    def install(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def check(name, limit, counter):
+    """Report a view that ran more than limit queries."""
+    if counter.count <= limit:
+        return
+    metrics.increment("query_budget_exceeded", view=name)
+    message = (
+        f"{name} ran {counter.count} queries, over its budget of {limit}:\n"
+        + "\n".join(counter.statements))
+    if settings.QUERY_BUDGET_MODE == RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
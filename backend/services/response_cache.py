@@ -0,0 +1,147 @@
+"""
+Server-side cache of tenant-scoped GET responses.
+
+Entries are keyed by (endpoint, school, role, normalized query, versions of
+the school_cache resources the endpoint reads), so a write never deletes
+anything: it bumps a version and later requests simply build new keys.
+
+Lookups go through two tiers: a per-process LRU bounded by bytes, then the
+shared Django cache. A shared hit is copied into the local tier. Hits,
+misses, the age of served entries and the local tier's memory use go to
+the metrics registry; stats() reports them for this process.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, school_cache
+
+LOCAL = "local"
+SHARED = "shared"
+MISS = "miss"
+
+AGE_BUCKETS = (1, 10, 60, 300, 900, 3600, 6 * 3600, 24 * 3600)
+
+
+class LocalCache:
+    """Thread-safe LRU of (body, content_type, stored_at) bounded by bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[0])
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted[0])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+local_cache = LocalCache(settings.RESPONSE_CACHE_LOCAL_MAX_BYTES)
+
+
+def normalized_query(query_dict):
+    """The query string with keys and values sorted."""
+    return urlencode(sorted(
+        (key, value)
+        for key, values in query_dict.lists()
+        for value in values
+    ))
+
+
+def make_key(endpoint, school_id, role, query, resources):
+    versions = ".".join(
+        str(school_cache.get_version(school_id, resource))
+        for resource in resources)
+    query_hash = hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+    return f"response:{endpoint}:{school_id}:{role}:{versions}:{query_hash}"
+
+
+def lookup(key, endpoint):
+    """Return (body, content_type) for key, or None on a miss."""
+    entry, tier = local_cache.get(key), LOCAL
+    if entry is None:
+        entry, tier = cache.get(key), SHARED
+        if entry is not None:
+            local_cache.set(key, entry)
+    if entry is None:
+        metrics.increment("response_cache_requests", endpoint=endpoint,
+                          tier=MISS)
+        return None
+
+    body, content_type, stored_at = entry
+    metrics.increment("response_cache_requests", endpoint=endpoint, tier=tier)
+    # Entries are never served past a write, so their age is how long the
+    # payload has gone without changing.
+    metrics.observe("response_cache_age_seconds", time.time() - stored_at,
+                    buckets=AGE_BUCKETS, endpoint=endpoint)
+    return body, content_type
+
+
+def store(key, body, content_type):
+    entry = (body, content_type, time.time())
+    local_cache.set(key, entry)
+    cache.set(key, entry, timeout=school_cache.PAYLOAD_TIMEOUT_SECONDS)
+
+
+@metrics.collector
+def record_local_tier():
+    metrics.set_gauge("response_cache_local_entries", len(local_cache))
+    metrics.set_gauge("response_cache_local_bytes", local_cache.bytes)
+    metrics.set_gauge("response_cache_local_max_bytes", local_cache.max_bytes)
+
+
+def stats():
+    """Hit rates per endpoint and the local tier's memory use."""
+    requests = {}
+    for (name, labels), value in list(metrics.registry.counters.items()):
+        if name != "response_cache_requests":
+            continue
+        labels = dict(labels)
+        counts = requests.setdefault(
+            labels["endpoint"], {LOCAL: 0, SHARED: 0, MISS: 0})
+        counts[labels["tier"]] += value
+
+    endpoints = {}
+    for endpoint, counts in requests.items():
+        total = sum(counts.values())
+        endpoints[endpoint] = {
+            **counts,
+            "hit_rate": (counts[LOCAL] + counts[SHARED]) / total,
+        }
+    return {
+        "endpoints": endpoints,
+        "local_entries": len(local_cache),
+        "local_bytes": local_cache.bytes,
+        "local_max_bytes": local_cache.max_bytes,
+    }
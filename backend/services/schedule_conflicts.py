@@ -0,0 +1,120 @@
+"""
+Overlap checks for weekly schedules.
+
+Each (school, day) gets an index of its schedules sorted by start minute,
+with a segment tree holding the latest end minute of every range of them.
+A lookup bisects for the schedules starting before the new class ends, then
+descends only into ranges that end after it starts, so it costs
+O((k + 1) log n) for k conflicts. The index is rebuilt from the database on
+every check, which costs a query and an O(n log n) sort. It is not cached:
+checks guard writes and must see the current schedules and class durations.
+"""
+from bisect import bisect_left
+
+from ..models import Schedule
+from .availability import MINUTES_PER_DAY, minutes_to_hhmm, time_to_minutes
+
+
+class IntervalIndex:
+    def __init__(self, entries):
+        # entries: iterable of (start_minute, end_minute, schedule dict)
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.starts = [start for start, _, _ in entries]
+        self.ends = [end for _, end, _ in entries]
+        self.schedules = [schedule for _, _, schedule in entries]
+        # max_ends[node] is the latest end under node; leaves start at size.
+        self.size = 1
+        while self.size < len(entries):
+            self.size *= 2
+        self.max_ends = [-1] * (2 * self.size)
+        self.max_ends[self.size:self.size + len(entries)] = self.ends
+        for node in range(self.size - 1, 0, -1):
+            self.max_ends[node] = max(
+                self.max_ends[2 * node], self.max_ends[2 * node + 1])
+
+    def overlapping(self, start, end, exclude_ids=()):
+        """Return the schedules overlapping [start, end), earliest first."""
+        conflicts = []
+        # Only schedules starting before `end` can overlap.
+        candidates = bisect_left(self.starts, end)
+
+        def visit(node, low, high):
+            # node covers the schedules in [low, high).
+            if low >= candidates or self.max_ends[node] <= start:
+                return
+            if node >= self.size:
+                schedule = self.schedules[low]
+                if schedule["schedule_id"] not in exclude_ids:
+                    conflicts.append(schedule)
+                return
+            middle = (low + high) // 2
+            visit(2 * node, low, middle)
+            visit(2 * node + 1, middle, high)
+
+        visit(1, 0, self.size)
+        return conflicts
+
+
+def build_day_indexes(school_id, day=None, duration_overrides=None):
+    """
+    Return {day_id: IntervalIndex} for the school's schedules, loaded in one
+    joined query. duration_overrides maps class ids to durations to use
+    instead of the stored ones, to validate a duration change before saving.
+    """
+    duration_overrides = duration_overrides or {}
+    schedules = Schedule.objects.filter(school_id=school_id)
+    if day is not None:
+        schedules = schedules.filter(day=day)
+
+    entries_by_day = {}
+    for (schedule_id, day_id, day_name, class_time, class_id, class_name,
+         duration) in schedules.values_list(
+            "id", "day_id", "day__name", "class_time", "class_model_id",
+            "class_model__name", "class_model__duration_minutes"):
+        duration = duration_overrides.get(class_id, duration)
+        start = time_to_minutes(class_time)
+        end = min(start + duration, MINUTES_PER_DAY)
+        entries_by_day.setdefault(day_id, []).append((start, end, {
+            "schedule_id": schedule_id,
+            "class_id": class_id,
+            "class_name": class_name,
+            "day": day_name,
+            "class_time": minutes_to_hhmm(start),
+            "end_time": minutes_to_hhmm(end),
+        }))
+
+    return {
+        day_id: IntervalIndex(entries)
+        for day_id, entries in entries_by_day.items()
+    }
+
+
+def find_new_schedule_conflicts(school_id, day, class_time, duration):
+    """Return the schedules a new class at (day, class_time) would overlap."""
+    index = build_day_indexes(school_id, day=day).get(day.id)
+    if index is None:
+        return []
+    start = time_to_minutes(class_time)
+    return index.overlapping(start, min(start + duration, MINUTES_PER_DAY))
+
+
+def find_duration_change_conflicts(school_id, class_id, duration):
+    """
+    Return the schedules that would overlap one of the class's schedules if
+    its duration became `duration`, including its own schedules.
+    """
+    indexes = build_day_indexes(
+        school_id, duration_overrides={class_id: duration})
+
+    conflicts, seen_ids = [], set()
+    for index in indexes.values():
+        for start, end, schedule in zip(
+                index.starts, index.ends, index.schedules):
+            if schedule["class_id"] != class_id:
+                continue
+            for conflict in index.overlapping(
+                    start, end, exclude_ids={schedule["schedule_id"]}):
+                if conflict["schedule_id"] not in seen_ids:
+                    seen_ids.add(conflict["schedule_id"])
+                    conflicts.append(conflict)
+    return conflicts
@@ -0,0 +1,96 @@
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import db_routing
+
+logger = logging.getLogger(__name__)
+
+# Cached payloads live for a day at most; invalidation never relies on expiry.
+PAYLOAD_TIMEOUT_SECONDS = 60 * 60 * 24
+
+PRICES = "prices"
+SCHEDULES = "schedules"
+OCCURRENCES = "occurrences"
+CLASSES = "classes"
+STUDENTS = "students"
+MEMBERSHIPS = "memberships"
+
+
+def _version_key(school_id, resource):
+    return f"school:{school_id}:{resource}:version"
+
+
+def _modified_key(school_id, resource):
+    return f"school:{school_id}:{resource}:modified"
+
+
+def _initial_version():
+    # Seed counters from the clock so a counter evicted from the cache never
+    # restarts at a value that still has payloads stored under it.
+    return int(time.time() * 1000)
+
+
+def get_version(school_id, resource):
+    key = _version_key(school_id, resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(school_id, resource):
+    key = _version_key(school_id, resource)
+    cache.set(_modified_key(school_id, resource), time.time(), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # No counter yet: nothing can be cached under it, so just seed one.
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def bump_version_on_commit(school_id, resource, using=None):
+    """
+    Bump the version once the write on the using database commits (at once
+    outside a transaction). Bumping earlier lets a concurrent read rebuild
+    the payload from uncommitted-away data and store it under the new
+    version.
+    """
+    transaction.on_commit(
+        lambda: bump_version(school_id, resource), using=using)
+
+
+def get_last_modified(school_id, resource):
+    """Unix time of the resource's last bump (or of first use if unknown)."""
+    key = _modified_key(school_id, resource)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, time.time(), timeout=None)
+        modified = cache.get(key)
+    return modified
+
+
+def versioned_key(school_id, resource, *parts):
+    version = get_version(school_id, resource)
+    suffix = ":".join(str(part) for part in parts)
+    return f"school:{school_id}:{resource}:v{version}:{suffix}"
+
+
+def get_or_build(school_id, resource, build, *parts,
+                 timeout=PAYLOAD_TIMEOUT_SECONDS):
+    """
+    Return the cached payload for (school, resource, *parts) at the school's
+    current version of that resource, building and storing it on a miss.
+    """
+    key = versioned_key(school_id, resource, *parts)
+    payload = cache.get(key)
+    if payload is None:
+        logger.debug("Building cached payload %s", key)
+        with db_routing.primary_reads():
+            payload = build()
+        cache.set(key, payload, timeout=timeout)
+    return payload
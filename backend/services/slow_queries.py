@@ -0,0 +1,225 @@
+"""
+Slow-query log.
+
+Every database connection gets SlowQueryLogger as an execute wrapper. Queries
+taking longer than settings.SLOW_QUERY_THRESHOLD_MS (None turns the log off)
+are logged and kept in a ring buffer of the last
+settings.SLOW_QUERY_BUFFER_SIZE, with:
+
+- the view or Celery task that ran them and the school, as set by
+  SlowQueryMiddleware and the task signals;
+- their parameters, redacted down to their types;
+- the database's EXPLAIN plan for SELECTs, captured at most once per query
+  fingerprint every settings.SLOW_QUERY_EXPLAIN_INTERVAL seconds.
+
+Fingerprints identify a query regardless of its parameters and IN list
+lengths; top_fingerprints() ranks them by total time. The buffer and totals
+are per process, like the local tier of the response cache.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# (view or task name, school id) the current queries are run for.
+_source = ContextVar("slow_query_source", default=(None, None))
+
+IN_LIST_RE = re.compile(r"IN \((?:%s(?:, )?)+\)")
+NUMBER_RE = re.compile(r"\b\d+\b")
+SPACE_RE = re.compile(r"\s+")
+
+
+def attribute(name, school_id):
+    """Attribute the queries that follow; returns the token for clear()."""
+    return _source.set((name, school_id))
+
+
+def clear(token):
+    _source.reset(token)
+
+
+def normalize(sql):
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, bool):
+        return value
+    return f"<{type(value).__name__}>"
+
+
+def redact(params, many=False):
+    if params is None:
+        return None
+    if many:
+        return f"<{len(params)} rows>"
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+
+def explain(connection, sql, params):
+    """The database's plan for a SELECT, or None."""
+    if not sql.lstrip()[:6].upper() == "SELECT":
+        return None
+    # A backend cursor skips the execute wrappers, so the plan is neither
+    # logged itself nor counted against the view's query budget.
+    savepoint = connection.in_atomic_block
+    cursor = connection.create_cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(
+                f"{connection.ops.explain_query_prefix()} {sql}", params)
+            rows = cursor.fetchall()
+        except DatabaseError:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return None
+        finally:
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        # {(school id, fingerprint): totals}
+        self.totals = {}
+        # {fingerprint: (time explained, plan)}
+        self.plans = {}
+
+    def plan_for(self, key, connection, sql, params):
+        explained = self.plans.get(key)
+        now = time.monotonic()
+        if (explained is not None
+                and now - explained[0] < settings.SLOW_QUERY_EXPLAIN_INTERVAL):
+            return explained[1]
+        plan = explain(connection, sql, params)
+        with self._lock:
+            self.plans[key] = (now, plan)
+        return plan
+
+    def record(self, connection, sql, params, many, duration):
+        view, school_id = _source.get()
+        key = fingerprint(sql)
+        duration_ms = round(duration * 1000, 3)
+        record = {
+            "at": time.time(),
+            "duration_ms": duration_ms,
+            "database": connection.alias,
+            "view": view,
+            "school_id": school_id,
+            "fingerprint": key,
+            "sql": sql,
+            "params": redact(params, many),
+            "plan": None if many else self.plan_for(key, connection, sql, params),
+        }
+
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.get((school_id, key))
+            if totals is None:
+                if len(self.totals) >= settings.SLOW_QUERY_MAX_FINGERPRINTS:
+                    # Make room by forgetting the cheapest fingerprint.
+                    del self.totals[min(
+                        self.totals, key=lambda k: self.totals[k]["total_ms"])]
+                totals = self.totals[(school_id, key)] = {
+                    "fingerprint": key, "sql": normalize(sql), "count": 0,
+                    "total_ms": 0.0, "max_ms": 0.0, "views": set(),
+                }
+            totals["count"] += 1
+            totals["total_ms"] += duration_ms
+            totals["max_ms"] = max(totals["max_ms"], duration_ms)
+            if view is not None:
+                totals["views"].add(view)
+
+        metrics.increment("slow_queries", view=view or "")
+        logger.warning(
+            "Slow query (%.1f ms) in %s for school %s: %s; params %s",
+            duration_ms, view, school_id, sql, record["params"])
+
+    def recent(self, school_id=None):
+        """Buffered records, newest first, optionally of one school."""
+        with self._lock:
+            records = list(self.records)
+        return [record for record in reversed(records)
+                if school_id is None or record["school_id"] == school_id]
+
+    def top_fingerprints(self, limit=20, school_id=None):
+        """Fingerprints by total time, optionally of one school's queries."""
+        merged = {}
+        with self._lock:
+            for (totals_school_id, key), totals in self.totals.items():
+                if school_id is not None and totals_school_id != school_id:
+                    continue
+                entry = merged.setdefault(key, {
+                    "fingerprint": key, "sql": totals["sql"], "count": 0,
+                    "total_ms": 0.0, "max_ms": 0.0, "views": set(),
+                })
+                entry["count"] += totals["count"]
+                entry["total_ms"] += totals["total_ms"]
+                entry["max_ms"] = max(entry["max_ms"], totals["max_ms"])
+                entry["views"] |= totals["views"]
+        top = sorted(merged.values(), key=lambda entry: entry["total_ms"],
+                     reverse=True)[:limit]
+        for entry in top:
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["views"] = sorted(entry["views"])
+        return top
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.totals.clear()
+            self.plans.clear()
+
+
+log = SlowQueryLog()
+
+
+class SlowQueryLogger:
+    """Execute wrapper passing the queries over the threshold to the log."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is not None and duration * 1000 >= threshold:
+            try:
+                log.record(self.connection, sql, params, many, duration)
+            except Exception:
+                logger.exception("Could not record a slow query")
+        return result
+
+
+def install(connection):
+    if not any(isinstance(wrapper, SlowQueryLogger)
+               for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryLogger(connection))
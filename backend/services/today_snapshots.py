@@ -0,0 +1,99 @@
+"""
+Per-(school, date) snapshots of the "today" endpoints polled by every kiosk
+and teacher device, stored as the JSON bytes of the response body.
+
+Snapshot keys embed the school's occurrence and schedule versions, so any
+write to either resource makes the next poll rebuild, and a beat task warms
+them before the studio opens.
+"""
+from django.db.models import Q
+
+from ..models import ClassModel, ClassOccurrence, Day, Schedule
+from ..serializers import ClassModelSerializer, ClassOccurrenceSerializer
+from . import db_routing, json_encoding, school_cache, virtual_occurrences
+
+
+def to_json_bytes(data):
+    # Same encoder as make_success_json_response.
+    return json_encoding.dumps(data)
+
+
+def serialize_occurrences(occurrences, virtual=(), fields=None):
+    """Serialize materialized occurrences followed by virtual ones."""
+    data = ClassOccurrenceSerializer.fast_data(occurrences, fields=fields)
+    if virtual:
+        virtual_data = ClassOccurrenceSerializer(
+            virtual, many=True, fields=fields).data
+        if fields is None or "id" in fields:
+            for item, occurrence in zip(virtual_data, virtual):
+                item["id"] = occurrence.virtual_id
+        data.extend(virtual_data)
+    return data
+
+
+def build_occurrences_snapshot(school_id, day, fields=None):
+    occurrences = ClassOccurrence.objects.filter(
+        school_id=school_id,
+    ).filter(
+        Q(planned_date=day) | Q(actual_date=day)
+    )
+
+    virtual = []
+    if virtual_occurrences.is_enabled():
+        virtual = virtual_occurrences.synthesize(school_id, day, day)
+
+    return to_json_bytes(
+        {"response": serialize_occurrences(occurrences, virtual, fields)})
+
+
+def build_classes_snapshot(school_id, day):
+    day_object = Day.objects.filter(name=day.strftime("%A")).first()
+    if not day_object:
+        return to_json_bytes({"response": []})
+
+    scheduled = Schedule.objects.filter(
+        school_id=school_id,
+        day=day_object,
+    ).values("class_model")
+
+    classes = ClassModel.objects.filter(
+        id__in=scheduled,
+        school_id=school_id,
+    )
+
+    return to_json_bytes(
+        {"response": ClassModelSerializer.fast_data(classes)})
+
+
+def occurrences_snapshot(school_id, day, fields=None):
+    """
+    JSON bytes of today_class_occurrences for the school on day, limited to
+    fields when given.
+    """
+    # Virtual occurrences come from schedules, so schedule writes count too.
+    return school_cache.get_or_build(
+        school_id,
+        school_cache.OCCURRENCES,
+        lambda: build_occurrences_snapshot(school_id, day, fields),
+        "today_occurrences", day.isoformat(),
+        school_cache.get_version(school_id, school_cache.SCHEDULES),
+        "all" if fields is None else ",".join(sorted(fields)),
+    )
+
+
+def classes_snapshot(school_id, day):
+    """JSON bytes of today_classes_list for the school on day."""
+    return school_cache.get_or_build(
+        school_id,
+        school_cache.SCHEDULES,
+        lambda: build_classes_snapshot(school_id, day),
+        "today_classes", day.isoformat(),
+    )
+
+
+def warm(school_ids, day):
+    """Build the snapshots of the given schools that are not cached yet."""
+    for school_id in school_ids:
+        with db_routing.using_school(school_id):
+            occurrences_snapshot(school_id, day)
+            classes_snapshot(school_id, day)
@@ -5,6 +5,8 @@ import jwt
 from django.conf import settings
 from jwt import PyJWKClient
 
+from . import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,9 +15,19 @@ def _jwks_client():
     return PyJWKClient(settings.CLERK_JWKS_URL)
 
 
+def _record_jwks_lookup(client):
+    # PyJWKClient refetches the key set once its cached copy expires.
+    cached = (client.jwk_set_cache is not None
+              and client.jwk_set_cache.get() is not None)
+    metrics.increment("auth_cache_requests", cache="jwks",
+                      result="hit" if cached else "miss")
+
+
 def verify_clerk_token(jwt_token):
     try:
-        signing_key = _jwks_client().get_signing_key_from_jwt(jwt_token).key
+        client = _jwks_client()
+        _record_jwks_lookup(client)
+        signing_key = client.get_signing_key_from_jwt(jwt_token).key
 
         decoded_token = jwt.decode(
             jwt_token,
@@ -0,0 +1,162 @@
+"""
+Virtual class occurrences.
+
+With settings.VIRTUAL_OCCURRENCES on, occurrences are no longer generated
+ahead of time. Reads synthesize the ones a date is missing from the school's
+schedules, each with a stable virtual id ``v<schedule_id>-<YYYYMMDD>``, and a
+virtual occurrence only gets a row once a check-in, edit or cancellation
+references it.
+"""
+import re
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+
+from ..models import ClassOccurrence, Schedule
+from .occurrence_generation import WEEKDAY_OFFSETS
+
+VIRTUAL_ID_RE = re.compile(r"^v(\d+)-(\d{8})$")
+
+
+def is_enabled():
+    return settings.VIRTUAL_OCCURRENCES
+
+
+def make_virtual_id(schedule_id, occurrence_date):
+    return f"v{schedule_id}-{occurrence_date:%Y%m%d}"
+
+
+def parse_virtual_id(value):
+    """Return (schedule_id, date) for a virtual id, None for anything else."""
+    match = VIRTUAL_ID_RE.match(str(value))
+    if match is None:
+        return None
+    try:
+        occurrence_date = datetime.strptime(match[2], "%Y%m%d").date()
+    except ValueError:
+        return None
+    return int(match[1]), occurrence_date
+
+
+def synthesize(school_id, start_date, end_date, class_id=None):
+    """
+    Return unsaved ClassOccurrence instances for the scheduled classes from
+    start_date to end_date (inclusive) that have no row yet, ordered by date
+    and time. Each carries its id in a ``virtual_id`` attribute.
+    """
+    schedules = Schedule.objects.filter(school_id=school_id)
+    if class_id is not None:
+        schedules = schedules.filter(class_model_id=class_id)
+    schedule_rows = list(schedules.values_list(
+        "id", "class_model_id", "class_model__name",
+        "class_model__duration_minutes", "day__name", "class_time"))
+    if not schedule_rows:
+        return []
+
+    # A schedule's occurrence is materialized if a row was planned from it
+    # for that date, or if a row already takes the class's slot.
+    materialized_schedules, taken_slots = set(), set()
+    for (schedule_id, class_model_id, planned_date, planned_start_time,
+         actual_date, actual_start_time) in ClassOccurrence.objects.filter(
+            Q(planned_date__range=(start_date, end_date))
+            | Q(actual_date__range=(start_date, end_date)),
+            school_id=school_id,
+    ).values_list(
+            "schedule_id", "class_model_id", "planned_date",
+            "planned_start_time", "actual_date", "actual_start_time"):
+        materialized_schedules.add((schedule_id, planned_date))
+        taken_slots.add((class_model_id, planned_date, planned_start_time))
+        taken_slots.add((class_model_id, actual_date, actual_start_time))
+
+    occurrences = []
+    for (schedule_id, class_model_id, class_name, duration, day_name,
+         class_time) in schedule_rows:
+        offset = WEEKDAY_OFFSETS.get(day_name.lower())
+        if offset is None:
+            continue
+        occurrence_date = start_date + timedelta(
+            days=(offset - start_date.weekday()) % 7)
+        while occurrence_date <= end_date:
+            if ((schedule_id, occurrence_date) not in materialized_schedules
+                    and (class_model_id, occurrence_date, class_time)
+                    not in taken_slots):
+                occurrence = ClassOccurrence(
+                    school_id=school_id,
+                    class_model_id=class_model_id,
+                    fallback_class_name=class_name,
+                    schedule_id=schedule_id,
+                    planned_date=occurrence_date,
+                    actual_date=occurrence_date,
+                    planned_start_time=class_time,
+                    actual_start_time=class_time,
+                    planned_duration=duration,
+                    actual_duration=duration,
+                    is_cancelled=False,
+                )
+                occurrence.virtual_id = make_virtual_id(
+                    schedule_id, occurrence_date)
+                occurrences.append(occurrence)
+            occurrence_date += timedelta(weeks=1)
+
+    occurrences.sort(key=lambda occ: (occ.actual_date, occ.actual_start_time))
+    return occurrences
+
+
+def materialize(school, occurrence_id):
+    """
+    Return the ClassOccurrence behind occurrence_id, creating the row of a
+    virtual occurrence on first use. Raises ClassOccurrence.DoesNotExist, or
+    IntegrityError if another occurrence already takes the class's slot.
+    """
+    parsed = parse_virtual_id(occurrence_id)
+    if parsed is None:
+        return ClassOccurrence.objects.get(id=occurrence_id, school=school)
+
+    schedule_id, occurrence_date = parsed
+    existing = ClassOccurrence.objects.filter(
+        school=school, schedule_id=schedule_id, planned_date=occurrence_date,
+    ).first()
+    if existing is not None:
+        return existing
+
+    schedule = Schedule.objects.select_related("class_model", "day").filter(
+        id=schedule_id, school=school).first()
+    if (schedule is None or WEEKDAY_OFFSETS.get(schedule.day.name.lower())
+            != occurrence_date.weekday()):
+        raise ClassOccurrence.DoesNotExist(
+            f"No scheduled class for {occurrence_id}")
+
+    class_model = schedule.class_model
+    try:
+        with transaction.atomic(using=router.db_for_write(ClassOccurrence)):
+            return ClassOccurrence.objects.create(
+                school=school,
+                class_model=class_model,
+                fallback_class_name=class_model.name,
+                schedule=schedule,
+                planned_date=occurrence_date,
+                actual_date=occurrence_date,
+                planned_start_time=schedule.class_time,
+                actual_start_time=schedule.class_time,
+                planned_duration=class_model.duration_minutes,
+                actual_duration=class_model.duration_minutes,
+            )
+    except IntegrityError:
+        # Materialized concurrently, unless another row took the slot.
+        existing = ClassOccurrence.objects.filter(
+            school=school, schedule=schedule, planned_date=occurrence_date,
+        ).first()
+        if existing is None:
+            raise
+        return existing
+
+
+def resolve_ids(school, occurrence_ids):
+    """Replace the virtual ids in occurrence_ids with materialized row ids."""
+    return [
+        materialize(school, occurrence_id).id
+        if parse_virtual_id(occurrence_id) else occurrence_id
+        for occurrence_id in occurrence_ids
+    ]
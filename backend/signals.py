@@ -0,0 +1,142 @@
+import time
+
+from celery.signals import task_postrun, task_prerun
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    ClassModel, ClassOccurrence, Price, Schedule, School, SchoolMembership,
+    Student, User,
+)
+from .services import db_routing, metrics, school_cache, slow_queries
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+@receiver(post_save, sender=ClassModel)
+@receiver(post_delete, sender=ClassModel)
+def invalidate_prices(sender, instance, using, **kwargs):
+    # The price table embeds class names, so class renames and deletes
+    # invalidate it as well.
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.PRICES, using=using)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_save, sender=ClassModel)
+@receiver(post_delete, sender=ClassModel)
+def invalidate_schedules(sender, instance, using, **kwargs):
+    # Schedule availability depends on class durations.
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.SCHEDULES, using=using)
+
+
+@receiver(post_save, sender=ClassOccurrence)
+@receiver(post_delete, sender=ClassOccurrence)
+def invalidate_occurrences(sender, instance, using, **kwargs):
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.OCCURRENCES, using=using)
+
+
+@receiver(post_save, sender=ClassModel)
+@receiver(post_delete, sender=ClassModel)
+def invalidate_classes(sender, instance, using, **kwargs):
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.CLASSES, using=using)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_students(sender, instance, using, **kwargs):
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.STUDENTS, using=using)
+
+
+@receiver(post_save, sender=SchoolMembership)
+@receiver(post_delete, sender=SchoolMembership)
+def invalidate_memberships(sender, instance, using, **kwargs):
+    school_cache.bump_version_on_commit(
+        instance.school_id, school_cache.MEMBERSHIPS, using=using)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_memberships(sender, instance, created, using,
+                                update_fields=None, **kwargs):
+    # Membership listings show the member's name and email.
+    if created or (update_fields is not None and not {
+            "first_name", "last_name", "email"} & set(update_fields)):
+        return
+    for school_id in SchoolMembership.objects.filter(
+            user=instance).values_list("school_id", flat=True):
+        school_cache.bump_version_on_commit(
+            school_id, school_cache.MEMBERSHIPS, using=using)
+
+
+@receiver(post_save, sender=School)
+def sync_school_copy(sender, instance, using, **kwargs):
+    # Shards keep a copy of their schools' directory rows for foreign keys.
+    if using != db_routing.directory_alias() or instance.shard == using:
+        return
+    School.objects.using(instance.shard).update_or_create(
+        pk=instance.pk,
+        defaults={
+            field.attname: getattr(instance, field.attname)
+            for field in School._meta.concrete_fields if not field.primary_key
+        },
+    )
+
+
+@receiver(post_delete, sender=School)
+def delete_school_copy(sender, instance, using, **kwargs):
+    # Deleting the copy cascades to the school's data on its shard.
+    if using != db_routing.directory_alias() or instance.shard == using:
+        return
+    School.objects.using(instance.shard).filter(pk=instance.pk).delete()
+    db_routing.forget_shard(instance.pk)
+
+
+@receiver(connection_created)
+def log_slow_queries(sender, connection, **kwargs):
+    slow_queries.install(connection)
+
+
+# {task id: slow query attribution token}
+_task_attributions = {}
+
+
+@task_prerun.connect
+def attribute_task_queries(task_id, task, **kwargs):
+    _task_attributions[task_id] = slow_queries.attribute(
+        f"task {task.name}", None)
+
+
+@task_postrun.connect
+def end_task_attribution(task_id, **kwargs):
+    token = _task_attributions.pop(task_id, None)
+    if token is not None:
+        slow_queries.clear(token)
+
+
+TASK_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+# {task id: perf_counter() when it started}
+_task_starts = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id, task, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is None:
+        return
+    metrics.observe("celery_task_duration_seconds", time.perf_counter() - start,
+                    buckets=TASK_DURATION_BUCKETS, task=task.name,
+                    state=state or "")
+    # Worker processes serve no scrapes; the web processes read this.
+    metrics.publish()
@@ -1,82 +1,172 @@
 import logging
-from datetime import date, timedelta
+from datetime import date
 
-from celery import shared_task
+from celery import chord, group, shared_task
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
 
-from .models import ClassOccurrence, Schedule
+from .models import School
+from .services import db_routing, generation_schedule, today_snapshots
+from .services.occurrence_generation import generate_horizon_occurrences
 
 logger = logging.getLogger(__name__)
 
+# Schools handled by one generation subtask; each subtask still chunks its
+# own queries by occurrence_generation.SCHOOL_CHUNK_SIZE.
+SCHOOLS_PER_SUBTASK = 50
+
+
+def occurrence_generation_chord(today=None, school_ids=None):
+    """
+    Build the chord that rolls the class occurrence horizon of the given
+    schools (all by default) forward to today.
+
+    The schools are split into batches generated by independent subtasks so
+    the work spreads across workers; the callback aggregates their summaries
+    into {school_id: {"created": n, "skipped": n}}. Returns None when there
+    is nothing to generate.
+    """
+
+    if settings.VIRTUAL_OCCURRENCES:
+        return None
+    # Batches never span shards.
+    school_ids_by_shard = db_routing.shard_school_ids(school_ids)
+    if not school_ids_by_shard:
+        return None
+
+    # Every subtask generates up to the same day, even if some only start
+    # after midnight.
+    today = (today or date.today()).isoformat()
+    header = group(
+        generate_school_occurrences.s(
+            shard_school_ids[i:i + SCHOOLS_PER_SUBTASK], today, shard=shard)
+        for shard, shard_school_ids in school_ids_by_shard.items()
+        for i in range(0, len(shard_school_ids), SCHOOLS_PER_SUBTASK)
+    )
+    return chord(header, summarize_class_occurrences.s())
+
 
 @shared_task
 def create_class_occurrences():
     """
-    Create ClassOccurrence entries for all schedules for the upcoming week.
+    Fan class occurrence generation out across the workers.
+    Returns the id of the chord callback's result.
     """
 
-    # Get the next Monday (weekdays start from 1)
-    today = date.today()
-    days_until_next_monday = (8 - today.isoweekday()) % 7
-    next_monday_date = today + timedelta(days=days_until_next_monday)
+    generation = occurrence_generation_chord()
+    if generation is None:
+        logger.info("No class occurrences to generate")
+        return None
+    return generation.apply_async().id
+
 
+@shared_task
+def generate_due_class_occurrences():
+    """
+    Generate occurrences for the schools hashed into the current bucket of
+    the nightly generation window.
+    """
+
+    if settings.VIRTUAL_OCCURRENCES:
+        return None
+    now = generation_schedule.local_now()
+    school_ids = generation_schedule.due_school_ids(now)
+    if not school_ids:
+        return None
     logger.info(
-        f"Creating class occurrence. The next Mondays will be {next_monday_date}")
-
-    weekday_map = {
-        "monday": 1,
-        "tuesday": 2,
-        "wednesday": 3,
-        "thursday": 4,
-        "friday": 5,
-        "saturday": 6,
-        "sunday": 7,
-    }
-
-    schedules = Schedule.objects.select_related(
-        "class_model", "day", "school").all()
-
-    occurrences_to_create = []
-
-    for schedule in schedules:
-        try:
-            weekday_num = weekday_map[schedule.day.name.lower()]
-            occurrence_date = next_monday_date + timedelta(days=weekday_num - 1)
-
-            exist = ClassOccurrence.objects.filter(
-                class_model=schedule.class_model,
-                actual_date=occurrence_date,
-                actual_start_time=schedule.class_time,
-            ).exists()
-
-            if exist:
-                logger.debug(
-                    f"Skipping scheduling class {
-                        schedule.class_model} for {occurrence_date} {
-                        schedule.class_time} because of duplication.")
-                continue
-
-            occurrence = ClassOccurrence(
-                school=schedule.school,
-                class_model=schedule.class_model,
-                fallback_class_name=schedule.class_model.name,
-                schedule=schedule,
-                planned_date=occurrence_date,
-                actual_date=occurrence_date,
-                planned_start_time=schedule.class_time,
-                actual_start_time=schedule.class_time,
-                planned_duration=schedule.class_model.duration_minutes,
-                actual_duration=schedule.class_model.duration_minutes,
-                is_cancelled=False,
-            )
-
-            occurrences_to_create.append(occurrence)
-        except Exception:
-            logger.exception("Failed to process schedule id=%s", schedule.id)
-
-    if occurrences_to_create:
-        ClassOccurrence.objects.bulk_create(occurrences_to_create)
+        "Generating class occurrences for %s schools in bucket %s",
+        len(school_ids), generation_schedule.current_bucket(now))
+    return occurrence_generation_chord(
+        today=now.date(), school_ids=school_ids).apply_async().id
+
+
+@shared_task
+def catch_up_class_occurrences():
+    """
+    Generate occurrences for every school whose generation has not
+    completed today.
+    """
+
+    if settings.VIRTUAL_OCCURRENCES:
+        return None
+    today = generation_schedule.local_now().date()
+    school_ids = generation_schedule.pending_school_ids(today)
+    if not school_ids:
+        return None
+    logger.warning(
+        "Catching up class occurrence generation for %s schools",
+        len(school_ids))
+    return occurrence_generation_chord(
+        today=today, school_ids=school_ids).apply_async().id
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def generate_school_occurrences(school_ids, today, shard=None):
+    """
+    Generate the occurrence horizon of a batch of schools on the same shard.
+
+    Safe to retry: existing occurrences are skipped and the unique constraint
+    on (class_model, actual_date, actual_start_time) absorbs races.
+    """
+
+    today = date.fromisoformat(today)
+    # Rows written to a school's old shard during or after a move would be
+    # lost; such schools are left pending for the catch-up pass.
+    moved = [
+        school_id for school_id in school_ids
+        if db_routing.is_moving(school_id)
+        or db_routing.shard_for(school_id) != (shard or DEFAULT_DB_ALIAS)
+    ]
+    if moved:
+        logger.warning(
+            "Skipping occurrence generation for schools being moved off "
+            "%s: %s", shard, moved)
+        school_ids = [school_id for school_id in school_ids
+                      if school_id not in moved]
+    with db_routing.using_shard(shard):
+        summary = generate_horizon_occurrences(
+            school_ids=school_ids, today=today)
+    generation_schedule.mark_generated(school_ids, today)
+    # JSON results only have string keys.
+    return {str(school_id): counts for school_id, counts in summary.items()}
+
+
+@shared_task
+def summarize_class_occurrences(results):
+    """
+    Merge the per-batch summaries of create_class_occurrences.
+    """
+
+    summary = {}
+    for batch_summary in results:
+        summary.update(batch_summary)
+
+    for school_id, counts in summary.items():
         logger.info(
-            f"Created {
-                len(occurrences_to_create)} new class occurrences.")
+            "School id=%s: created %s class occurrences, skipped %s",
+            school_id, counts["created"], counts["skipped"])
+
+    total_created = sum(counts["created"] for counts in summary.values())
+    if total_created:
+        logger.info(f"Created {total_created} new class occurrences.")
     else:
         logger.info("No new class occurrences to create")
+
+    return summary
+
+
+@shared_task
+def warm_today_snapshots():
+    """
+    Build every school's snapshots of today's classes and occurrences ahead
+    of the first kiosk polls.
+    """
+
+    school_ids = list(School.objects.order_by("id").values_list("id", flat=True))
+    today_snapshots.warm(school_ids, date.today())
+    logger.info("Warmed today's snapshots for %s schools", len(school_ids))
+    return len(school_ids)
@@ -3,9 +3,11 @@ import json
 from datetime import time
 
 from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase
 from django.urls import reverse
 
 from ..models import ClassModel, Day, Schedule
+from ..services.schedule_conflicts import IntervalIndex
 from .test_utils import BaseTestCase
 
 
@@ -223,3 +225,147 @@ class SchedulesTestCase(BaseTestCase):
                     class_time=time(10, 0, 0),
                     school=self.school,
                 )
+
+
+class ScheduleConflictsTestCase(BaseTestCase):
+    """Tests for overlap validation on schedule creation and class edits."""
+
+    def setUp(self):
+        super().setUp()
+        self.schedules_url = reverse("schedules")
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        self.class_two = ClassModel.objects.create(
+            name="Heavy sabre", duration_minutes=60, school=self.school)
+        self.class_three = ClassModel.objects.create(
+            name="Epee", duration_minutes=30, school=self.school)
+        self.monday, _ = Day.objects.get_or_create(name="Monday")
+        self.tuesday, _ = Day.objects.get_or_create(name="Tuesday")
+        self.schedule_one = Schedule.objects.create(
+            class_model=self.class_one, day=self.monday,
+            class_time=time(10, 0), school=self.school)
+
+    def post_schedule(self, class_model, day, class_time):
+        return self.client.post(
+            self.schedules_url,
+            json.dumps({
+                "classId": class_model.id,
+                "day": day.name,
+                "classTime": class_time,
+            }),
+            content_type="application/json",
+        )
+
+    def test_overlapping_schedule_is_rejected(self):
+        response = self.post_schedule(self.class_two, self.monday, "10:30")
+
+        self.error_response_helper(
+            response, 400, "Schedule conflicts with existing classes")
+        conflicts = json.loads(response.content)["conflicts"]
+        self.assertEqual(conflicts, [{
+            "scheduleId": self.schedule_one.id,
+            "classId": self.class_one.id,
+            "className": "Foil",
+            "day": "Monday",
+            "classTime": "10:00",
+            "endTime": "11:00",
+        }])
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_all_overlapping_schedules_are_reported(self):
+        schedule_two = Schedule.objects.create(
+            class_model=self.class_three, day=self.monday,
+            class_time=time(11, 0), school=self.school)
+
+        long_class = ClassModel.objects.create(
+            name="Sparring", duration_minutes=120, school=self.school)
+        response = self.post_schedule(long_class, self.monday, "09:30")
+
+        conflicts = json.loads(response.content)["conflicts"]
+        self.assertEqual(
+            [c["scheduleId"] for c in conflicts],
+            [self.schedule_one.id, schedule_two.id])
+
+    def test_back_to_back_and_other_day_schedules_are_allowed(self):
+        response = self.post_schedule(self.class_two, self.monday, "11:00")
+        self.positive_response_helper(
+            response, 200, "Schedule was created successfully")
+
+        response = self.post_schedule(self.class_two, self.tuesday, "10:30")
+        self.positive_response_helper(
+            response, 200, "Schedule was created successfully")
+
+    def test_duration_edit_that_causes_overlap_is_rejected(self):
+        schedule_two = Schedule.objects.create(
+            class_model=self.class_two, day=self.monday,
+            class_time=time(11, 0), school=self.school)
+
+        response = self.client.put(
+            reverse("edit_class", args=[self.class_one.id]),
+            json.dumps({"durationMinutes": 90}),
+            content_type="application/json",
+        )
+
+        self.error_response_helper(
+            response, 400, "Schedule conflicts with existing classes")
+        conflicts = json.loads(response.content)["conflicts"]
+        self.assertEqual(
+            [c["scheduleId"] for c in conflicts], [schedule_two.id])
+        self.class_one.refresh_from_db()
+        self.assertEqual(self.class_one.duration_minutes, 60)
+
+    def test_duration_edit_without_overlap_is_saved(self):
+        Schedule.objects.create(
+            class_model=self.class_two, day=self.monday,
+            class_time=time(11, 30), school=self.school)
+
+        response = self.client.put(
+            reverse("edit_class", args=[self.class_one.id]),
+            json.dumps({"durationMinutes": 90}),
+            content_type="application/json",
+        )
+
+        self.positive_response_helper(
+            response, 200, "Class was updated successfully")
+        self.class_one.refresh_from_db()
+        self.assertEqual(self.class_one.duration_minutes, 90)
+
+
+    def test_invalid_duration_edit_is_rejected(self):
+        for duration, message in (
+                ("long", "Invalid durationMinutes format"),
+                (0, "Class duration must be positive")):
+            response = self.client.put(
+                reverse("edit_class", args=[self.class_one.id]),
+                json.dumps({"durationMinutes": duration}),
+                content_type="application/json",
+            )
+            self.error_response_helper(response, 400, message)
+        self.class_one.refresh_from_db()
+        self.assertEqual(self.class_one.duration_minutes, 60)
+
+class IntervalIndexTestCase(SimpleTestCase):
+    """Tests for the overlap lookup of schedule_conflicts.IntervalIndex."""
+
+    def test_matches_a_linear_scan(self):
+        # A long morning class keeps the latest end high for every later
+        # start; short classes around it must still be skipped correctly.
+        intervals = [(480, 1200)] + [
+            (start, start + 30) for start in range(500, 1200, 45)]
+        index = IntervalIndex(
+            (start, end, {"schedule_id": i})
+            for i, (start, end) in enumerate(intervals))
+
+        for start in range(450, 1260, 15):
+            end = start + 40
+            expected = sorted(
+                (interval_start, i)
+                for i, (interval_start, interval_end) in enumerate(intervals)
+                if interval_start < end and interval_end > start)
+            self.assertEqual(
+                [schedule["schedule_id"]
+                 for schedule in index.overlapping(start, end)],
+                [i for _, i in expected])
+
+    def test_empty_index(self):
+        self.assertEqual(IntervalIndex([]).overlapping(0, 60), [])
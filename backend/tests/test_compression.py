@@ -0,0 +1,122 @@
+"""Tests for the response compression middleware."""
+import gzip
+import json
+from unittest import skipIf
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .. import middleware
+from ..middleware import CompressionMiddleware, accepted_encodings
+from ..models import Student
+from ..services import metrics
+from .test_utils import BaseTestCase
+
+LARGE_BODY = {"response": [{"firstName": f"Student {i}"} for i in range(200)]}
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    """Unit tests for CompressionMiddleware."""
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.factory = RequestFactory()
+
+    def process(self, response, accept_encoding="gzip, deflate"):
+        request = self.factory.get(
+            "/backend/students/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=1.0, br;q=0, identity"),
+            {"gzip", "identity"})
+        self.assertEqual(accepted_encodings(""), set())
+
+    def test_compresses_large_json(self):
+        original = JsonResponse(LARGE_BODY)
+        raw = original.content
+
+        response = self.process(original)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), raw)
+
+        ratio = metrics.registry.histogram(
+            "response_compression_ratio", encoding="gzip")
+        self.assertEqual(ratio.count, 1)
+        self.assertGreater(ratio.sum, 5)
+        self.assertEqual(
+            metrics.registry.counter_value(
+                "response_compression_input_bytes", encoding="gzip"),
+            len(raw))
+        self.assertEqual(metrics.registry.histogram(
+            "response_compression_cpu_seconds", encoding="gzip").count, 1)
+
+    def test_skips_small_responses(self):
+        response = self.process(JsonResponse({"message": "Success"}))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(json.loads(response.content), {"message": "Success"})
+
+    def test_skips_clients_without_gzip(self):
+        response = self.process(JsonResponse(LARGE_BODY), accept_encoding="")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+        response = self.process(
+            JsonResponse(LARGE_BODY), accept_encoding="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_skips_binary_content(self):
+        response = self.process(
+            HttpResponse(b"\0" * 4096, content_type="image/png"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_weakens_strong_etags(self):
+        original = JsonResponse(LARGE_BODY)
+        original["ETag"] = '"abc"'
+
+        self.assertEqual(self.process(original)["ETag"], 'W/"abc"')
+
+    def test_compresses_streamed_responses(self):
+        chunks = [json.dumps({"row": i}).encode() + b"\n" for i in range(50)]
+        response = self.process(StreamingHttpResponse(
+            iter(chunks), content_type="application/json"))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), b"".join(chunks))
+        self.assertEqual(metrics.registry.histogram(
+            "response_compression_ratio", encoding="gzip").count, 1)
+
+    @skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_prefers_brotli(self):
+        original = JsonResponse(LARGE_BODY)
+        raw = original.content
+
+        response = self.process(original, accept_encoding="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content), raw)
+
+
+class CompressedEndpointTestCase(BaseTestCase):
+    """Compression applied to a real list endpoint."""
+
+    def test_list_students_is_compressed(self):
+        Student.objects.bulk_create([
+            Student(first_name=f"Student{i}", last_name="Doe", school=self.school)
+            for i in range(100)
+        ])
+
+        response = self.client.get(
+            reverse("students"), HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        students = json.loads(gzip.decompress(response.content))["response"]
+        self.assertEqual(len(students), 100)
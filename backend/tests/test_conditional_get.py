@@ -0,0 +1,86 @@
+"""Tests for ETag/Last-Modified revalidation of the list endpoints."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ClassModel, Student
+from .test_utils import BaseTestCase
+
+
+class ConditionalGetTestCase(BaseTestCase):
+    """Tests for ConditionalGetMiddleware and @conditional_get."""
+
+    def setUp(self):
+        super().setUp()
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+
+    def test_validators_are_set(self):
+        response = self.client.get(reverse("classes"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("X-School-ID", response["Vary"])
+
+    def test_matching_etag_gets_304_without_queries(self):
+        etag = self.client.get(reverse("students"))["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse("students"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        self.assertFalse([q for q in ctx.captured_queries
+                          if "backend_student" in q["sql"]])
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(reverse("prices"))["Last-Modified"]
+        response = self.client.get(
+            reverse("prices"), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get(reverse("classes"))["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.class_one.name = "Epee"
+            self.class_one.save()
+
+        response = self.client.get(reverse("classes"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_other_resources_do_not_change_etag(self):
+        etag = self.client.get(reverse("students"))["ETag"]
+        self.class_one.name = "Epee"
+        self.class_one.save()
+
+        response = self.client.get(
+            reverse("students"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_string_changes_etag(self):
+        first = self.client.get(reverse("list_memberships"))["ETag"]
+        second = self.client.get(
+            reverse("list_memberships"), {"page": 2})["ETag"]
+        self.assertNotEqual(first, second)
+
+    def test_forbidden_role_is_not_revalidated(self):
+        etag = self.client.get(reverse("classes"))["ETag"]
+        self.membership.role = "kiosk"
+        self.membership.save()
+
+        response = self.client.get(reverse("classes"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+    def test_writes_are_not_conditional(self):
+        response = self.client.post(
+            reverse("students"),
+            data={"firstName": "Bo", "lastName": "Kim"},
+            content_type="application/json",
+        )
+        self.assertNotIn("ETag", response)
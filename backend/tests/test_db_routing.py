@@ -0,0 +1,109 @@
+"""Tests for primary/replica routing, on two SQLite databases."""
+import json
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from ..models import ClassModel, Payment, School, Student
+from ..services import db_routing
+from .test_utils import BaseTestCase
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class ReplicaRoutingTestCase(BaseTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        super().setUp()
+        today = now()
+        self.student = Student.objects.create(
+            first_name="Ann", last_name="Primary", school=self.school)
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        Payment.objects.create(
+            school=self.school, student_id=self.student,
+            class_id=self.class_one, student_name="Primary", amount=20,
+            payment_month=today.month, payment_year=today.year)
+        # The replica has not caught up with Ann yet.
+        School.objects.using("replica").create(
+            id=self.school.id, name=self.school.name,
+            clerk_org_id=self.school.clerk_org_id)
+        student = Student.objects.using("replica").create(
+            id=self.student.id, first_name="Ann", last_name="Replica",
+            school_id=self.school.id)
+        class_model = ClassModel.objects.using("replica").create(
+            id=self.class_one.id, name="Foil", school_id=self.school.id)
+        Payment.objects.using("replica").create(
+            school_id=self.school.id, student_id=student,
+            class_id=class_model, student_name="Replica", amount=20,
+            payment_month=today.month, payment_year=today.year)
+
+    def list_payments(self):
+        with CaptureQueriesContext(connections["replica"]) as ctx:
+            response = self.client.get(reverse("payments"))
+        self.assertEqual(response.status_code, 200)
+        names = [p["studentName"]
+                 for p in json.loads(response.content)["response"]]
+        return names, len(ctx.captured_queries)
+
+    def test_get_reads_from_replica(self):
+        self.assertEqual(self.list_payments(), (["Replica"], 1))
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_routing_is_off_without_replica(self):
+        self.assertEqual(self.list_payments(), (["Primary"], 0))
+
+    def test_writer_is_pinned_to_primary(self):
+        today = now()
+        response = self.client.post(
+            reverse("payments"),
+            data={"paymentData": {
+                "studentId": self.student.id, "classId": self.class_one.id,
+                "studentName": "Kim", "amount": 20,
+                "month": today.month, "year": today.year,
+            }},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Payment.objects.using("replica").count(), 1)
+
+        names, replica_queries = self.list_payments()
+        self.assertEqual(sorted(names), ["Kim", "Primary"])
+        self.assertEqual(replica_queries, 0)
+
+    def test_conditional_views_read_from_primary(self):
+        # Their ETags name the primary's version, so must their bodies.
+        with CaptureQueriesContext(connections["replica"]) as ctx:
+            response = self.client.get(reverse("students"))
+        names = [s["lastName"] for s in json.loads(response.content)["response"]]
+        self.assertEqual(names, ["Primary"])
+        self.assertEqual(ctx.captured_queries, [])
+
+    def test_view_override(self):
+        with CaptureQueriesContext(connections["replica"]) as ctx:
+            response = self.client.get(reverse("attended_students"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ctx.captured_queries, [])
+
+    def test_cached_responses_are_built_from_primary(self):
+        response = self.client.get(reverse("classes"))
+        names = [c["name"] for c in json.loads(response.content)["response"]]
+        self.assertEqual(names, ["Foil"])
+
+    def test_reads_after_a_write_use_primary(self):
+        router = db_routing.ReplicaRouter()
+        token = db_routing.begin_request()
+        try:
+            db_routing.read_from_replica()
+            self.assertEqual(router.db_for_read(Student), "replica")
+            with db_routing.primary_reads():
+                self.assertIsNone(router.db_for_read(Student))
+            self.assertEqual(router.db_for_read(Student), "replica")
+
+            self.assertEqual(router.db_for_write(Student), "default")
+            self.assertIsNone(router.db_for_read(Student))
+        finally:
+            self.assertTrue(db_routing.end_request(token))
@@ -0,0 +1,118 @@
+"""Round-trip tests for the JSON encoder backends."""
+import json
+import re
+import uuid
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.http import JsonResponse
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from ..services import json_encoding
+from ..views.helpers import make_error_json_response, make_success_json_response
+
+PAYLOADS = [
+    {"message": "Success"},
+    {"response": []},
+    {
+        "date": date(2025, 7, 7),
+        "time": time(10, 0),
+        "timeWithMicroseconds": time(10, 0, 5, 123456),
+        "datetimeUtc": datetime(2025, 7, 1, 12, 30, 15, 123456,
+                                tzinfo=dt_timezone.utc),
+        "datetimeOffset": datetime(2025, 7, 1, 12, 30,
+                                   tzinfo=dt_timezone(timedelta(hours=-7))),
+        "datetimeNaive": datetime(2025, 7, 1, 12, 30),
+        "duration": timedelta(minutes=90),
+        "decimal": Decimal("12.50"),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "lazy": gettext_lazy("Student"),
+    },
+    {
+        "response": [
+            {"id": 1, "firstName": "Zoë", "lastName": "Ødegaard",
+             "amount": 12.5, "isCancelled": False, "notes": None},
+            {"id": 2, "firstName": "小明", "lastName": "\"quoted\"\n",
+             "amount": 100, "isCancelled": True, "notes": ""},
+        ],
+        "nested": {"2025-07-07": {"3": {"students": {"5": True}}}},
+    },
+]
+
+
+class JSONEncodingTestCase(SimpleTestCase):
+    """Both backends must decode to what JsonResponse would have sent."""
+
+    def reference(self, payload):
+        return JsonResponse(payload).content
+
+    def test_stdlib_backend_is_byte_identical_to_json_response(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(
+                    json_encoding.stdlib_dumps(payload), self.reference(payload))
+
+    @skipIf(json_encoding.orjson is None, "orjson is not installed")
+    def test_orjson_backend_round_trips(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                # orjson keeps the microseconds Django cuts to milliseconds.
+                content = re.sub(
+                    rb"(\.\d{3})\d{3}(?!\d)",
+                    rb"\1", json_encoding.orjson_dumps(payload))
+                self.assertEqual(
+                    json.loads(content), json.loads(self.reference(payload)))
+
+    @skipIf(json_encoding.orjson is None, "orjson is not installed")
+    def test_orjson_encodes_dates_natively(self):
+        payload = {key: value for key, value in PAYLOADS[2].items()
+                   if isinstance(value, (date, time))}
+        with mock.patch.object(
+                json_encoding, "_django_default",
+                side_effect=AssertionError("passed to DjangoJSONEncoder")):
+            content = json_encoding.orjson_dumps(payload)
+
+        self.assertEqual(json.loads(content), {
+            "date": "2025-07-07",
+            "time": "10:00:00",
+            "timeWithMicroseconds": "10:00:05.123456",
+            "datetimeUtc": "2025-07-01T12:30:15.123456Z",
+            "datetimeOffset": "2025-07-01T12:30:00-07:00",
+            "datetimeNaive": "2025-07-01T12:30:00",
+        })
+
+    @override_settings(JSON_ENCODER_BACKEND="stdlib")
+    def test_helpers_match_json_response(self):
+        response = make_success_json_response(200, response_body=PAYLOADS[2])
+        self.assertEqual(response.content, self.reference(PAYLOADS[2]))
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        response = make_error_json_response(
+            "Invalid", 400, details={"conflicts": [{"day": "Monday"}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.content,
+            self.reference({"error": "Invalid", "conflicts": [{"day": "Monday"}]}))
+
+    def test_backend_selection(self):
+        with override_settings(JSON_ENCODER_BACKEND="stdlib"):
+            self.assertEqual(json_encoding.get_backend_name(), "stdlib")
+        with override_settings(JSON_ENCODER_BACKEND="auto"):
+            self.assertEqual(
+                json_encoding.get_backend_name(),
+                "stdlib" if json_encoding.orjson is None else "orjson")
+        with override_settings(JSON_ENCODER_BACKEND="unknown"):
+            with self.assertRaises(ValueError):
+                json_encoding.get_backend_name()
+
+    @skipIf(json_encoding.orjson is not None, "orjson is installed")
+    def test_missing_orjson_falls_back_to_stdlib(self):
+        json_encoding._resolved.clear()
+        with override_settings(JSON_ENCODER_BACKEND="orjson"), \
+                self.assertLogs(json_encoding.logger, "WARNING"):
+            self.assertEqual(json_encoding.get_backend_name(), "stdlib")
+            self.assertEqual(
+                json_encoding.dumps(PAYLOADS[2]), self.reference(PAYLOADS[2]))
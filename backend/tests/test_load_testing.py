@@ -0,0 +1,58 @@
+"""Tests for the seed_schools and loadtest commands."""
+from datetime import date
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from ..models import (
+    Attendance, ClassOccurrence, Payment, Schedule, School, SchoolMembership,
+    Student,
+)
+from .test_utils import BaseTestCase
+
+
+class LoadTestingTestCase(BaseTestCase):
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command(
+            "seed_schools", "--students", "12", "--classes", "7",
+            "--years", "0.1", "--attendance", "4", *args, stdout=out)
+        return School.objects.get(clerk_org_id__startswith="seed_")
+
+    def test_seed_creates_a_school(self):
+        school = self.seed()
+
+        self.assertEqual(Student.objects.filter(school=school).count(), 12)
+        self.assertEqual(Schedule.objects.filter(school=school).count(), 14)
+        self.assertEqual(
+            SchoolMembership.objects.filter(school=school).count(), 3)
+        past = ClassOccurrence.objects.filter(
+            school=school, actual_date__lt=date.today())
+        self.assertTrue(past.exists())
+        self.assertTrue(ClassOccurrence.objects.filter(
+            school=school, actual_date__gte=date.today()).exists())
+        self.assertEqual(
+            Attendance.objects.filter(school=school).count(), 4 * past.count())
+        self.assertTrue(Payment.objects.filter(school=school).exists())
+        # The test school is left alone.
+        self.assertFalse(Student.objects.filter(school=self.school).exists())
+
+    def test_loadtest_reports_every_scenario(self):
+        self.seed()
+        out = StringIO()
+        call_command("loadtest", "--iterations", "1", "--rush-size", "5",
+                     stdout=out)
+        report = out.getvalue()
+
+        for endpoint in ("POST check_in", "PUT confirm", "GET payments",
+                         "task generate_school_occurrences"):
+            self.assertIn(endpoint, report)
+        check_in = next(line for line in report.splitlines()
+                        if line.startswith("POST check_in"))
+        # Five requests, none failed.
+        self.assertEqual(check_in.split()[2:4], ["5", "0"])
+
+    def test_loadtest_needs_seeded_schools(self):
+        with self.assertRaisesMessage(CommandError, "No seeded schools"):
+            call_command("loadtest", stdout=StringIO())
@@ -0,0 +1,208 @@
+"""Tests for the metrics registry, its recording and the scrape endpoint."""
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import MetricsMiddleware
+from ..models import Student
+from ..services import metrics, verify_token
+from ..tasks import warm_today_snapshots
+from .test_utils import BaseTestCase
+
+
+def limited_view(request):
+    return HttpResponse(status=429)
+
+
+class RegistryTestCase(TestCase):
+    """Tests for merging and rendering registries."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_render(self):
+        registry = metrics.Registry()
+        registry.increment("http_responses", view="a.b", status="200")
+        registry.increment("http_responses", view="a.b", status="200")
+        registry.increment("db_query_seconds", 0.25, view='say "hi"\n')
+        registry.set_gauge("cache_bytes", 512, tier="local")
+        for value in (0.5, 1, 20):
+            registry.observe("latency", value, buckets=(1, 10), view="a.b")
+
+        self.assertEqual(metrics.render(registry).splitlines(), [
+            "# TYPE db_query_seconds_total counter",
+            'db_query_seconds_total{view="say \\"hi\\"\\n"} 0.25',
+            "# TYPE http_responses_total counter",
+            'http_responses_total{status="200",view="a.b"} 2',
+            "# TYPE cache_bytes gauge",
+            'cache_bytes{tier="local"} 512',
+            "# TYPE latency histogram",
+            'latency_bucket{view="a.b",le="1"} 2',
+            'latency_bucket{view="a.b",le="10"} 2',
+            'latency_bucket{view="a.b",le="+Inf"} 3',
+            'latency_sum{view="a.b"} 21.5',
+            'latency_count{view="a.b"} 3',
+        ])
+
+    def test_merge(self):
+        first, second = metrics.Registry(), metrics.Registry()
+        first.increment("requests", view="a")
+        second.increment("requests", 2, view="a")
+        second.increment("requests", view="b")
+        first.set_gauge("cache_bytes", 100)
+        second.set_gauge("cache_bytes", 200)
+        first.observe("latency", 0.5, buckets=(1,))
+        second.observe("latency", 5, buckets=(1,))
+
+        merged = metrics.Registry()
+        merged.merge(first.snapshot())
+        merged.merge(second.snapshot())
+
+        self.assertEqual(merged.counter_value("requests", view="a"), 3)
+        self.assertEqual(merged.counter_value("requests", view="b"), 1)
+        self.assertEqual(merged.gauge_value("cache_bytes"), 300)
+        latency = merged.histogram("latency")
+        self.assertEqual(latency.counts, [1, 1])
+        self.assertEqual(latency.sum, 5.5)
+
+    def test_collect_merges_processes(self):
+        other = metrics.Registry()
+        other.increment("slow_queries", 3, view="")
+        cache.set(metrics.SLOT_KEY.format("worker:2"), other.snapshot())
+        cache.set(metrics.INDEX_KEY, {"worker:2", "worker:3"})
+        with patch.object(metrics, "registry", metrics.Registry()) as own:
+            own.increment("slow_queries", view="")
+            merged = metrics.collect()
+
+        self.assertEqual(merged.counter_value("slow_queries", view=""), 4)
+        # worker:3 has no slot any more, so it is dropped from the index.
+        self.assertEqual(cache.get(metrics.INDEX_KEY),
+                         {"worker:2", metrics.process_id()})
+
+    @override_settings(METRICS_PUBLISH_INTERVAL=60)
+    def test_publish_is_throttled(self):
+        slot = metrics.SLOT_KEY.format(metrics.process_id())
+        with patch.object(metrics, "registry", metrics.Registry()) as own:
+            metrics.publish(force=True)
+            own.increment("requests")
+            metrics.publish()
+            self.assertEqual(cache.get(slot)["counters"], {})
+            metrics.publish(force=True)
+        self.assertEqual(cache.get(slot)["counters"], {("requests", ()): 1})
+
+    def test_collectors_run_before_publishing(self):
+        with patch.object(metrics, "registry", metrics.Registry()), \
+                patch.object(metrics, "collectors", []):
+            metrics.collector(lambda: metrics.registry.set_gauge("workers", 4))
+            merged = metrics.collect()
+        self.assertEqual(merged.gauge_value("workers"), 4)
+
+    def test_fork_starts_from_zero(self):
+        registry = metrics.Registry()
+        registry.increment("requests")
+        registry._after_fork()
+        self.assertEqual(registry.counter_value("requests"), 0)
+
+
+class MetricsRecordingTestCase(BaseTestCase):
+    """Tests for what requests and Celery tasks record."""
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_requests(self):
+        Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+        self.client.get(reverse("students"))
+
+        view = "backend.views.students.students_view"
+        self.assertEqual(metrics.registry.counter_value(
+            "http_responses", view=view, method="GET", status="200"), 1)
+        self.assertEqual(metrics.registry.histogram(
+            "http_request_duration_seconds", view=view, method="GET").count, 1)
+        # The membership lookup and the students query.
+        self.assertGreaterEqual(
+            metrics.registry.counter_value("db_queries", view=view), 2)
+        self.assertGreater(
+            metrics.registry.counter_value("db_query_seconds", view=view), 0)
+
+    def test_unresolved_requests(self):
+        self.client.get("/backend/nowhere/")
+        self.assertEqual(metrics.registry.counter_value(
+            "http_responses", view="", method="GET", status="404"), 1)
+
+    def test_rate_limit_rejections(self):
+        request = RequestFactory().post("/")
+        request.limited = True
+
+        def get_response(request):
+            middleware.process_view(request, limited_view, (), {})
+            return limited_view(request)
+
+        middleware = MetricsMiddleware(get_response)
+        middleware(request)
+        self.assertEqual(metrics.registry.counter_value(
+            "ratelimit_rejections",
+            view="backend.tests.test_metrics.limited_view"), 1)
+
+    def test_task_durations(self):
+        warm_today_snapshots.delay()
+        duration = metrics.registry.histogram(
+            "celery_task_duration_seconds",
+            task="backend.tasks.warm_today_snapshots", state="SUCCESS")
+        self.assertEqual(duration.count, 1)
+
+
+class AuthCacheTestCase(TestCase):
+    """Tests for the JWKS cache hits and misses of token checks."""
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def test_jwks_cache(self):
+        client = MagicMock()
+        client.jwk_set_cache.get.side_effect = [None, object()]
+        client.get_signing_key_from_jwt.side_effect = ValueError("bad token")
+        with patch.object(verify_token, "_jwks_client", return_value=client), \
+                self.assertLogs("backend.services.verify_token"):
+            verify_token.verify_clerk_token("token")
+            verify_token.verify_clerk_token("token")
+
+        for result in ("hit", "miss"):
+            self.assertEqual(metrics.registry.counter_value(
+                "auth_cache_requests", cache="jwks", result=result), 1)
+
+
+class MetricsEndpointTestCase(TestCase):
+    """Tests for GET /backend/metrics/."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_scrape(self):
+        self.client.get(reverse("health"))
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        self.assertIn(
+            'http_responses_total{method="GET",status="200",'
+            'view="backend.views.health.health"} 1',
+            response.content.decode())
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_wrong_token(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer guess")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_hidden_without_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
@@ -0,0 +1,374 @@
+"""Tests for class occurrence generation from schedules."""
+import json
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import (
+    Attendance, ClassModel, ClassOccurrence, Day, School, Schedule, Student,
+)
+from ..services import generation_schedule
+from ..services.occurrence_generation import (
+    generate_horizon_occurrences, horizon_end,
+)
+from ..tasks import (
+    catch_up_class_occurrences, create_class_occurrences,
+    generate_due_class_occurrences, generate_school_occurrences,
+    occurrence_generation_chord,
+)
+from .test_utils import BaseTestCase
+
+
+class OccurrenceGenerationTestCase(BaseTestCase):
+    """Tests for backend.tasks.create_class_occurrences and its generator."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date(2025, 7, 7)
+        self.monday, _ = Day.objects.get_or_create(name="Monday")
+        self.wednesday, _ = Day.objects.get_or_create(name="Wednesday")
+        School.objects.filter(id=self.school.id).update(
+            occurrence_horizon_weeks=1)
+        self.other_school = School.objects.create(
+            name="Other School", clerk_org_id="other_org",
+            occurrence_horizon_weeks=3)
+
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        self.class_two = ClassModel.objects.create(
+            name="Epee", duration_minutes=90, school=self.other_school)
+        self.schedule_one = Schedule.objects.create(
+            class_model=self.class_one, day=self.monday,
+            class_time=time(10, 0), school=self.school)
+        self.schedule_two = Schedule.objects.create(
+            class_model=self.class_one, day=self.wednesday,
+            class_time=time(18, 0), school=self.school)
+        self.schedule_three = Schedule.objects.create(
+            class_model=self.class_two, day=self.monday,
+            class_time=time(10, 0), school=self.other_school)
+
+    def test_horizon_end(self):
+        self.assertEqual(horizon_end(self.today, 1), date(2025, 7, 13))
+        self.assertEqual(horizon_end(self.today, 4), date(2025, 8, 3))
+
+    def test_creates_occurrences_for_each_school_horizon(self):
+        summary = generate_horizon_occurrences(today=self.today)
+
+        self.assertEqual(summary[self.school.id], {"created": 2, "skipped": 0})
+        self.assertEqual(
+            summary[self.other_school.id], {"created": 3, "skipped": 0})
+        self.assertEqual(
+            sorted(ClassOccurrence.objects.filter(
+                school=self.other_school).values_list(
+                    "actual_date", flat=True)),
+            [date(2025, 7, 7), date(2025, 7, 14), date(2025, 7, 21)])
+
+        occurrence = ClassOccurrence.objects.get(schedule=self.schedule_two)
+        self.assertEqual(occurrence.school, self.school)
+        self.assertEqual(occurrence.fallback_class_name, "Foil")
+        self.assertEqual(occurrence.planned_date, date(2025, 7, 9))
+        self.assertEqual(occurrence.actual_start_time, time(18, 0))
+        self.assertEqual(occurrence.actual_duration, 60)
+
+    def test_horizon_starts_mid_week(self):
+        summary = generate_horizon_occurrences(today=date(2025, 7, 8))
+
+        self.assertEqual(summary[self.school.id], {"created": 2, "skipped": 0})
+        self.assertEqual(
+            ClassOccurrence.objects.get(schedule=self.schedule_one).actual_date,
+            date(2025, 7, 14))
+
+    def test_existing_occurrences_are_skipped(self):
+        ClassOccurrence.objects.create(
+            school=self.school,
+            class_model=self.class_one,
+            planned_date=self.today,
+            actual_date=self.today,
+            planned_start_time=time(10, 0),
+            actual_start_time=time(10, 0),
+            planned_duration=60,
+            actual_duration=60,
+        )
+
+        summary = generate_horizon_occurrences(today=self.today)
+
+        self.assertEqual(summary[self.school.id], {"created": 1, "skipped": 1})
+        self.assertEqual(
+            ClassOccurrence.objects.filter(school=self.school).count(), 2)
+
+    def test_generation_is_idempotent(self):
+        generate_horizon_occurrences(today=self.today)
+        summary = generate_horizon_occurrences(today=self.today)
+
+        self.assertEqual(summary[self.school.id], {"created": 0, "skipped": 2})
+        self.assertEqual(ClassOccurrence.objects.count(), 5)
+
+    def test_query_count_does_not_grow_with_schedules(self):
+        def count_queries():
+            ClassOccurrence.objects.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                generate_horizon_occurrences(today=self.today)
+            return len(ctx.captured_queries)
+
+        baseline = count_queries()
+        for hour in range(12, 17):
+            Schedule.objects.create(
+                class_model=self.class_one, day=self.monday,
+                class_time=time(hour, 0), school=self.school)
+
+        self.assertEqual(count_queries(), baseline)
+
+    def test_task_generates_every_school(self):
+        create_class_occurrences.delay()
+
+        self.assertEqual(
+            set(ClassOccurrence.objects.values_list("school_id", flat=True)),
+            {self.school.id, self.other_school.id})
+
+    def test_chord_fans_out_one_subtask_per_batch(self):
+        with mock.patch("backend.tasks.SCHOOLS_PER_SUBTASK", 1), \
+                mock.patch(
+                    "backend.tasks.generate_horizon_occurrences",
+                    wraps=generate_horizon_occurrences) as generate:
+            summary = occurrence_generation_chord(
+                today=self.today).apply_async().get()
+
+        self.assertEqual(
+            [call.kwargs["school_ids"] for call in generate.call_args_list],
+            [[self.school.id], [self.other_school.id]])
+        self.assertEqual(summary, {
+            str(self.school.id): {"created": 2, "skipped": 0},
+            str(self.other_school.id): {"created": 3, "skipped": 0},
+        })
+
+    def test_subtask_is_retried_on_database_errors(self):
+        with mock.patch(
+                "backend.tasks.generate_horizon_occurrences",
+                side_effect=[
+                    OperationalError("deadlock"),
+                    {self.school.id: {"created": 2, "skipped": 0}},
+                ]) as generate:
+            # Without throw=False eager apply() raises the Retry instead of
+            # running the retry inline.
+            summary = generate_school_occurrences.apply(
+                args=([self.school.id], self.today.isoformat()),
+                throw=False).get()
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(
+            summary, {str(self.school.id): {"created": 2, "skipped": 0}})
+
+    def test_subtask_can_be_rerun(self):
+        args = ([self.school.id], self.today.isoformat())
+        generate_school_occurrences.apply(args=args)
+        summary = generate_school_occurrences.apply(args=args).get()
+
+        self.assertEqual(
+            summary, {str(self.school.id): {"created": 0, "skipped": 2}})
+        self.assertEqual(
+            ClassOccurrence.objects.filter(school=self.school).count(), 2)
+
+    def test_management_command_prints_summary(self):
+        out = StringIO()
+        call_command("create_occurrences", stdout=out)
+
+        self.assertIn(f"School {self.school.id}: created", out.getvalue())
+        self.assertTrue(ClassOccurrence.objects.exists())
+
+
+class IncrementalOccurrenceGenerationTestCase(BaseTestCase):
+    """Tests for occurrence regeneration triggered by schedule edits."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.day, _ = Day.objects.get_or_create(
+            name=self.today.strftime("%A"))
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+
+    def create_schedule(self):
+        response = self.client.post(
+            reverse("schedules"),
+            json.dumps({
+                "classId": self.class_one.id,
+                "day": self.day.name,
+                "classTime": "18:00",
+            }),
+            content_type="application/json",
+        )
+        self.positive_response_helper(
+            response, 200, "Schedule was created successfully")
+        return Schedule.objects.get(id=json.loads(response.content)["scheduleId"])
+
+    def test_new_schedule_gets_occurrences_for_the_horizon(self):
+        schedule = self.create_schedule()
+
+        dates = sorted(ClassOccurrence.objects.filter(
+            schedule=schedule).values_list("actual_date", flat=True))
+        self.assertEqual(
+            dates, [self.today + timedelta(weeks=i) for i in range(4)])
+
+    def test_deleted_schedule_cleans_up_upcoming_occurrences(self):
+        schedule = self.create_schedule()
+        occurrences = list(ClassOccurrence.objects.filter(
+            schedule=schedule).order_by("actual_date"))
+        cancelled, attended = occurrences[1], occurrences[2]
+        cancelled.is_cancelled = True
+        cancelled.save()
+        student = Student.objects.create(
+            first_name="John", last_name="Doe", school=self.school)
+        Attendance.objects.create(
+            student_id=student, class_occurrence=attended,
+            attendance_date=attended.actual_date, school=self.school)
+
+        response = self.client.delete(
+            reverse("delete_schedule", args=[schedule.id]))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            set(ClassOccurrence.objects.values_list("id", flat=True)),
+            {cancelled.id, attended.id})
+
+    def test_deleted_occurrence_is_not_regenerated(self):
+        schedule = self.create_schedule()
+        deleted = ClassOccurrence.objects.filter(schedule=schedule).first()
+
+        response = self.client.delete(
+            reverse("delete_occurrence", args=[deleted.id]))
+        self.assertEqual(response.status_code, 200)
+        generate_horizon_occurrences(today=self.today)
+
+        self.assertEqual(
+            ClassOccurrence.objects.filter(schedule=schedule).count(), 4)
+        deleted.refresh_from_db()
+        self.assertTrue(deleted.is_cancelled)
+
+    def test_moved_occurrence_is_not_regenerated(self):
+        schedule = self.create_schedule()
+        moved = ClassOccurrence.objects.filter(schedule=schedule).first()
+        new_date = moved.planned_date + timedelta(days=1)
+
+        response = self.client.patch(
+            reverse("edit_occurrence", args=[moved.id]),
+            json.dumps({"actualDate": new_date.isoformat()}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        generate_horizon_occurrences(today=self.today)
+
+        self.assertEqual(
+            ClassOccurrence.objects.filter(schedule=schedule).count(), 4)
+        self.assertFalse(ClassOccurrence.objects.filter(
+            actual_date=moved.planned_date).exists())
+
+    def test_class_edit_updates_untouched_upcoming_occurrences(self):
+        schedule = self.create_schedule()
+        moved = ClassOccurrence.objects.filter(
+            schedule=schedule).order_by("actual_date").last()
+        moved.actual_start_time = time(19, 0)
+        moved.save()
+
+        response = self.client.put(
+            reverse("edit_class", args=[self.class_one.id]),
+            json.dumps({"durationMinutes": 45}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        durations = dict(ClassOccurrence.objects.filter(
+            schedule=schedule).values_list("id", "actual_duration"))
+        self.assertEqual(durations.pop(moved.id), 60)
+        self.assertEqual(set(durations.values()), {45})
+
+    def test_longer_school_horizon_is_filled_immediately(self):
+        schedule = self.create_schedule()
+
+        response = self.client.patch(
+            reverse("edit_school", args=[self.school.id]),
+            json.dumps({"occurrenceHorizonWeeks": 6}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            ClassOccurrence.objects.filter(schedule=schedule).count(), 6)
+
+
+@override_settings(
+    OCCURRENCE_GENERATION_WINDOW_START_HOUR=23,
+    OCCURRENCE_GENERATION_WINDOW_MINUTES=120,
+    OCCURRENCE_GENERATION_BUCKET_MINUTES=30,
+)
+class StaggeredGenerationTestCase(BaseTestCase):
+    """Tests for spreading the nightly generation over a window."""
+
+    def setUp(self):
+        super().setUp()
+        self.day, _ = Day.objects.get_or_create(name="Monday")
+        for index in range(7):
+            school = School.objects.create(
+                name=f"School {index}", clerk_org_id=f"org_{index}")
+            class_model = ClassModel.objects.create(
+                name="Foil", duration_minutes=60, school=school)
+            Schedule.objects.create(
+                class_model=class_model, day=self.day,
+                class_time=time(10, 0), school=school)
+        self.school_ids = list(
+            School.objects.order_by("id").values_list("id", flat=True))
+        # BaseTestCase's school has no schedules, so it never gets any.
+        self.scheduled_ids = set(self.school_ids) - {self.school.id}
+
+    def at(self, hour, minute, day=7):
+        return datetime(2025, 7, day, hour, minute)
+
+    def test_current_bucket_wraps_midnight(self):
+        self.assertEqual(generation_schedule.current_bucket(self.at(23, 0)), 0)
+        self.assertEqual(generation_schedule.current_bucket(self.at(23, 45)), 1)
+        self.assertEqual(generation_schedule.current_bucket(self.at(0, 30)), 3)
+        self.assertIsNone(generation_schedule.current_bucket(self.at(1, 0)))
+        self.assertIsNone(generation_schedule.current_bucket(self.at(12, 0)))
+
+    def test_every_school_is_due_in_exactly_one_bucket(self):
+        due = []
+        for hour, minute in [(23, 0), (23, 30), (0, 0), (0, 30)]:
+            due.extend(generation_schedule.due_school_ids(
+                self.at(hour, minute)))
+
+        self.assertCountEqual(due, self.school_ids)
+        self.assertEqual(
+            generation_schedule.school_bucket(self.school_ids[0], 4),
+            generation_schedule.school_bucket(self.school_ids[0], 4))
+
+    def test_due_task_generates_only_its_bucket(self):
+        now = self.at(23, 30)
+        due = generation_schedule.due_school_ids(now)
+        with mock.patch.object(
+                generation_schedule, "local_now", return_value=now):
+            generate_due_class_occurrences.delay()
+
+        self.assertCountEqual(
+            set(ClassOccurrence.objects.values_list("school_id", flat=True)),
+            self.scheduled_ids & set(due))
+        self.assertCountEqual(
+            generation_schedule.pending_school_ids(now.date()),
+            set(self.school_ids) - set(due))
+
+    def test_catch_up_generates_unfinished_schools(self):
+        finished = self.school_ids[:3]
+        generation_schedule.mark_generated(finished, date(2025, 7, 7))
+        now = self.at(1, 0)
+        with mock.patch.object(
+                generation_schedule, "local_now", return_value=now):
+            catch_up_class_occurrences.delay()
+
+        self.assertCountEqual(
+            set(ClassOccurrence.objects.values_list("school_id", flat=True)),
+            self.scheduled_ids - set(finished))
+        self.assertEqual(generation_schedule.pending_school_ids(now.date()), [])
@@ -1,6 +1,6 @@
 """Tests for payment functionality."""
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from django.urls import reverse
 from django.utils.timezone import now
@@ -364,3 +364,112 @@ class PaymentTestCase(BaseTestCase):
             payment_year=another_payment_year
         )
         self.assertEqual(payment_record_for_another_month.count(), 1)
+
+
+class PaymentListingTestCase(BaseTestCase):
+    """Tests for the payments listing (GET /payments/)."""
+
+    def setUp(self):
+        super().setUp()
+        self.payments_url = reverse("payments")
+        self.student_one = Student.objects.create(
+            first_name="John", last_name="Testovich", school=self.school)
+        self.student_two = Student.objects.create(
+            first_name="Jane", last_name="Testovna", school=self.school)
+        self.class_one = ClassModel.objects.create(
+            name="Foil", school=self.school)
+        self.class_two = ClassModel.objects.create(
+            name="Epee", school=self.school)
+
+        base_date = datetime(2025, 7, 1, 10, 0, tzinfo=timezone.utc)
+        self.payments = []
+        for i in range(7):
+            self.payments.append(Payment.objects.create(
+                school=self.school,
+                student_id=self.student_one if i % 2 else self.student_two,
+                class_id=self.class_one if i < 4 else self.class_two,
+                amount=10.0 + i,
+                # Two payments share each timestamp to exercise the id
+                # tie-breaker of the cursor.
+                payment_date=base_date + timedelta(days=i // 2),
+                payment_month=7,
+                payment_year=2025,
+            ))
+
+    def get_listing(self, params):
+        params = {"month": 7, "year": 2025, **params}
+        response = self.client.get(self.payments_url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_unpaginated_listing_returns_whole_month(self):
+        response_data = self.get_listing({})
+
+        self.assertEqual(len(response_data["response"]), 7)
+        self.assertNotIn("nextCursor", response_data)
+
+    def test_pages_follow_payment_date_and_id_descending(self):
+        expected_ids = [
+            p.id for p in sorted(
+                self.payments,
+                key=lambda p: (p.payment_date, p.id),
+                reverse=True)]
+
+        seen_ids = []
+        params = {"limit": 3}
+        while True:
+            response_data = self.get_listing(params)
+            page = response_data["response"]
+            self.assertLessEqual(len(page), 3)
+            seen_ids.extend(row["id"] for row in page)
+            if not response_data["nextCursor"]:
+                break
+            params = {"limit": 3, "cursor": response_data["nextCursor"]}
+
+        self.assertEqual(seen_ids, expected_ids)
+
+    def test_filter_by_student_and_class(self):
+        response_data = self.get_listing({
+            "student_id": self.student_one.id,
+            "class_id": self.class_one.id,
+        })
+
+        expected_ids = {
+            p.id for p in self.payments
+            if p.student_id == self.student_one and p.class_id == self.class_one
+        }
+        self.assertEqual(
+            {row["id"] for row in response_data["response"]}, expected_ids)
+
+    def test_fields_limit_serialized_columns(self):
+        response_data = self.get_listing(
+            {"fields": "id,amount,studentName", "limit": 2})
+
+        for row in response_data["response"]:
+            self.assertEqual(set(row), {"id", "amount", "studentName"})
+        self.assertIsNotNone(response_data["nextCursor"])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(
+            self.payments_url, {"month": 7, "year": 2025, "fields": "secret"})
+
+        self.error_response_helper(response, 400, "Unknown fields: secret")
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(
+            self.payments_url, {"month": 7, "year": 2025, "cursor": "nope"})
+
+        self.error_response_helper(response, 400, "Invalid cursor")
+
+    def test_invalid_limit_is_rejected(self):
+        response = self.client.get(
+            self.payments_url, {"month": 7, "year": 2025, "limit": 0})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_id_filters_are_rejected(self):
+        for param in ("student_id", "class_id"):
+            response = self.client.get(
+                self.payments_url, {"month": 7, "year": 2025, param: "abc"})
+
+            self.error_response_helper(response, 400, f"Invalid {param}")
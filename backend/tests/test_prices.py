@@ -1,6 +1,12 @@
 """Tests for price management functionality."""
 import json
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ClassModel, Price
+from ..services import school_cache
 from .test_utils import BaseTestCase
 
 
@@ -9,8 +15,129 @@ class PricesTestCase(BaseTestCase):
 
     def setUp(self):
         super().setUp()
-        self.prices_url = "/api/prices/"
+        self.prices_url = reverse("prices")
+        self.class_one = ClassModel.objects.create(
+            name="Foil", school=self.school)
+        self.class_two = ClassModel.objects.create(
+            name="Epee", school=self.school)
+        self.price_one = Price.objects.create(
+            class_id=self.class_one, amount=20.0, school=self.school)
+        self.price_two = Price.objects.create(
+            class_id=self.class_two, amount=25.0, school=self.school)
+
+    def get_price_table(self):
+        response = self.client.get(self.prices_url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["response"]
+
+    def count_price_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_price_table()
+        return len([q for q in ctx.captured_queries
+                    if "backend_price" in q["sql"]])
+
+    def test_get_prices_returns_table_keyed_by_class(self):
+        table = self.get_price_table()
+
+        self.assertEqual(table, {
+            str(self.class_one.id): {
+                "className": "Foil",
+                "amount": 20.0,
+                "priceId": self.price_one.id,
+            },
+            str(self.class_two.id): {
+                "className": "Epee",
+                "amount": 25.0,
+                "priceId": self.price_two.id,
+            },
+        })
+
+    def test_get_prices_uses_single_query_regardless_of_size(self):
+        for i in range(5):
+            class_model = ClassModel.objects.create(
+                name=f"Class {i}", school=self.school)
+            Price.objects.create(
+                class_id=class_model, amount=10.0, school=self.school)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_price_table()
+
+        price_queries = [q for q in ctx.captured_queries
+                         if "backend_price" in q["sql"]]
+        class_queries = [q for q in ctx.captured_queries
+                         if q["sql"].startswith('SELECT "backend_classmodel"')]
+        self.assertEqual(len(price_queries), 1)
+        self.assertEqual(len(class_queries), 0)
+
+    def test_repeated_get_is_served_from_cache(self):
+        self.assertEqual(self.count_price_queries(), 1)
+        self.assertEqual(self.count_price_queries(), 0)
+
+    def test_create_price_invalidates_table(self):
+        self.get_price_table()
+        class_three = ClassModel.objects.create(
+            name="Sabre", school=self.school)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.prices_url,
+                json.dumps({"classId": class_three.id, "amount": 30}),
+                content_type="application/json",
+            )
+        self.positive_response_helper(
+            response, 200, "Price was created successfully")
+
+        table = self.get_price_table()
+        self.assertEqual(table[str(class_three.id)]["amount"], 30)
+
+    def test_edit_price_invalidates_table(self):
+        self.get_price_table()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("edit_price", args=[self.price_one.id]),
+                json.dumps({"amount": 22.5}),
+                content_type="application/json",
+            )
+        self.positive_response_helper(
+            response, 200, "Price was updated successfully")
+
+        table = self.get_price_table()
+        self.assertEqual(table[str(self.class_one.id)]["amount"], 22.5)
+
+    def test_class_rename_invalidates_table(self):
+        self.get_price_table()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse("edit_class", args=[self.class_one.id]),
+                json.dumps({"name": "Foil advanced"}),
+                content_type="application/json",
+            )
+
+        table = self.get_price_table()
+        self.assertEqual(
+            table[str(self.class_one.id)]["className"], "Foil advanced")
+
+    def test_class_delete_invalidates_table(self):
+        self.get_price_table()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("delete_class", args=[self.class_two.id]))
+
+        table = self.get_price_table()
+        self.assertNotIn(str(self.class_two.id), table)
+        self.assertIn(str(self.class_one.id), table)
 
-    # TODO: Add tests for price creation, retrieval, update, delete
-    # TODO: Test price filtering by class, date ranges, etc.
-    pass
+    def test_version_is_bumped_on_commit(self):
+        version = school_cache.get_version(self.school.id, school_cache.PRICES)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.price_one.amount = 21
+            self.price_one.save()
+            # A read before the commit must not see the new version.
+            self.assertEqual(school_cache.get_version(
+                self.school.id, school_cache.PRICES), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(school_cache.get_version(
+            self.school.id, school_cache.PRICES), version)
@@ -0,0 +1,110 @@
+"""Tests for on-demand request profiling."""
+import json
+import pstats
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import School
+from ..services import profiling
+from .test_utils import BaseTestCase
+
+
+class ProfilingTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(PROFILING_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def token(self):
+        response = self.client.post(reverse("profiles"))
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.content)["token"]
+
+    def list_profiles(self):
+        response = self.client.get(reverse("profiles"))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["profiles"]
+
+    def test_token_request_is_profiled(self):
+        response = self.client.get(
+            reverse("attendances"), HTTP_X_PROFILE_TOKEN=self.token())
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-ID"]
+
+        [summary] = self.list_profiles()
+        self.assertEqual(summary["id"], profile_id)
+        self.assertEqual(summary["view"], "attendances")
+        self.assertEqual(summary["trigger"], "token")
+        self.assertEqual(summary["schoolId"], self.school.id)
+        self.assertGreaterEqual(summary["queryCount"], 1)
+        self.assertNotIn("queries", summary)
+
+        response = self.client.get(reverse("profile_detail", args=[profile_id]))
+        detail = json.loads(response.content)
+        self.assertEqual(len(detail["queries"]), summary["queryCount"])
+        self.assertIn("backend_attendance", detail["queries"][0]["sql"])
+        self.assertTrue(detail["functions"])
+        pstats.Stats(str(self.directory / f"{profile_id}.prof"))
+
+    def test_requests_without_token_are_not_profiled(self):
+        response = self.client.get(reverse("attendances"))
+        self.assertNotIn("X-Profile-ID", response)
+        response = self.client.get(
+            reverse("attendances"), HTTP_X_PROFILE_TOKEN="forged")
+        self.assertNotIn("X-Profile-ID", response)
+        self.assertEqual(self.list_profiles(), [])
+
+    def test_token_is_bound_to_school(self):
+        other = School.objects.create(name="Other", clerk_org_id="other_org")
+        token = profiling.issue_token(other.id)
+        self.assertFalse(profiling.token_is_valid(token, self.school.id))
+        self.assertTrue(profiling.token_is_valid(token, other.id))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        response = self.client.get(reverse("students"))
+        self.assertIn("X-Profile-ID", response)
+        self.assertEqual(self.list_profiles()[0]["trigger"], "sample")
+
+    @override_settings(PROFILING_MAX_PROFILES=2)
+    def test_store_keeps_newest_profiles(self):
+        token = self.token()
+        profile_ids = [
+            self.client.get(
+                reverse("students"), HTTP_X_PROFILE_TOKEN=token)["X-Profile-ID"]
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            [summary["id"] for summary in self.list_profiles()],
+            profile_ids[:0:-1])
+        self.assertEqual(len(list(self.directory.glob("*.prof"))), 2)
+
+    def test_profiles_are_for_owners_and_admins(self):
+        self.client.get(reverse("students"), HTTP_X_PROFILE_TOKEN=self.token())
+        self.membership.role = "teacher"
+        self.membership.save()
+        self.assertEqual(self.client.get(reverse("profiles")).status_code, 403)
+        self.assertEqual(self.client.post(reverse("profiles")).status_code, 403)
+
+    def test_other_schools_profiles_are_hidden(self):
+        profile_id = self.client.get(
+            reverse("students"), HTTP_X_PROFILE_TOKEN=self.token()
+        )["X-Profile-ID"]
+        other = School.objects.create(name="Other", clerk_org_id="other_org")
+        self.membership.school = other
+        self.membership.save()
+        self.client.defaults["HTTP_X_SCHOOL_ID"] = other.id
+
+        self.assertEqual(self.list_profiles(), [])
+        response = self.client.get(reverse("profile_detail", args=[profile_id]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("profile_detail", args=["..%2Fx"]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,205 @@
+"""Tests that list endpoints run a constant number of queries."""
+import json
+from datetime import date, time
+
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..decorators import query_budget
+from ..middleware import QueryBudgetMiddleware
+from ..models import (
+    Attendance, ClassModel, ClassOccurrence, Day, Payment, Price, Schedule,
+    School, SchoolMembership, Student, User,
+)
+from ..services import query_budget as budgets
+from ..services import response_cache
+from .test_utils import BaseTestCase
+
+SCALES = (1, 10, 40)
+
+
+class QueryBudgetScaleTestCase(BaseTestCase):
+    """Query counts must not grow with the number of rows a school has."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.day, _ = Day.objects.get_or_create(name=self.today.strftime("%A"))
+        self.seeded = 0
+
+    def seed(self, total):
+        """Grow every table of the school to total rows."""
+        for i in range(self.seeded, total):
+            class_model = ClassModel.objects.create(
+                name=f"Class {i}", duration_minutes=30, school=self.school)
+            Price.objects.create(
+                school=self.school, class_id=class_model, amount=10 + i)
+            start = time(6 + i // 4, (i % 4) * 15)
+            Schedule.objects.create(
+                class_model=class_model, day=self.day, class_time=start,
+                school=self.school)
+            occurrence = ClassOccurrence.objects.create(
+                school=self.school, class_model=class_model,
+                planned_date=self.today, actual_date=self.today,
+                planned_start_time=start, actual_start_time=start,
+                planned_duration=30, actual_duration=30)
+            student = Student.objects.create(
+                first_name="Student", last_name=str(i), school=self.school)
+            Attendance.objects.create(
+                school=self.school, student_id=student,
+                class_occurrence=occurrence, attendance_date=self.today)
+            Payment.objects.create(
+                school=self.school, student_id=student, class_id=class_model,
+                amount=20, payment_month=self.today.month,
+                payment_year=self.today.year)
+            user = User.objects.create(
+                username=f"member{i}", clerk_user_id=f"clerk_member_{i}")
+            SchoolMembership.objects.create(
+                user=user, school=self.school, role="teacher")
+        self.seeded = total
+
+    def count_queries(self, method, url_name, data=()):
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            if method == "get":
+                response = self.client.get(reverse(url_name), dict(data))
+            else:
+                response = getattr(self.client, method)(
+                    reverse(url_name), json.dumps(data),
+                    content_type="application/json")
+        self.assertLess(response.status_code, 300, response.content)
+        return len(ctx.captured_queries)
+
+    def assert_constant(self, *requests):
+        """Run each (method, url name, data) request at every scale."""
+        counts = {request: [] for request in requests}
+        for total in SCALES:
+            self.seed(total)
+            for request in requests:
+                # Measure the database, not the caches in front of it.
+                cache.clear()
+                response_cache.local_cache.clear()
+                counts[request].append(self.count_queries(*request))
+        for request, request_counts in counts.items():
+            self.assertEqual(
+                len(set(request_counts)), 1, f"{request}: {request_counts}")
+
+    def test_lists(self):
+        self.assert_constant(*(
+            ("get", url_name) for url_name in (
+                "students", "classes", "schedules", "prices",
+                "list_memberships", "attendances", "attended_students",
+                "class_occurrences", "today_class_occurrences",
+                "today_classes_list", "payments", "payment_summary",
+            )
+        ))
+
+    def test_pages_and_slots(self):
+        self.assert_constant(
+            ("get", "payments", (("limit", 5),)),
+            ("get", "available_time_slots",
+             (("day", self.day.name), ("duration", 30))),
+            ("get", "available_week_slots", (("duration", 30),)),
+        )
+
+    def test_confirm(self):
+        def confirm_all():
+            return {
+                "date": self.today.isoformat(),
+                "confirmationList": [
+                    {str(a.student_id_id): {str(a.class_occurrence_id): False}}
+                    for a in Attendance.objects.filter(school=self.school)
+                ],
+            }
+
+        counts = []
+        for total in SCALES:
+            self.seed(total)
+            Attendance.objects.update(is_showed_up=True)
+            counts.append(self.count_queries("put", "confirm", confirm_all()))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_check_in(self):
+        counts = []
+        for total in SCALES:
+            self.seed(total)
+            student = Student.objects.create(
+                first_name="New", last_name=str(total), school=self.school)
+            occurrence_ids = list(ClassOccurrence.objects.filter(
+                school=self.school).values_list("id", flat=True))
+            counts.append(self.count_queries("post", "check_in", {
+                "checkInData": {
+                    "studentId": student.id,
+                    "classOccurrencesList": occurrence_ids,
+                    "todayDate": self.today.isoformat(),
+                },
+            }))
+            self.assertEqual(
+                Attendance.objects.filter(student_id=student).count(),
+                len(occurrence_ids))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+
+@query_budget(1)
+def two_queries(request):
+    School.objects.count()
+    School.objects.count()
+    return HttpResponse()
+
+
+@query_budget(lambda request: int(request.GET["budget"]))
+def one_query(request):
+    School.objects.count()
+    return HttpResponse()
+
+
+class QueryBudgetMiddlewareTestCase(TestCase):
+    """Tests for QueryBudgetMiddleware on views outside the URLconf."""
+
+    def call(self, view, path="/"):
+        request = RequestFactory().get(path)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(request)
+
+    def test_views_are_registered(self):
+        self.assertEqual(budgets.registry[budgets.view_name(two_queries)], 1)
+        self.assertEqual(
+            budgets.registry["backend.views.attendance.attendance_list"], 1)
+
+    @override_settings(QUERY_BUDGET_MODE=budgets.RAISE)
+    def test_raise_mode(self):
+        with self.assertRaisesMessage(
+                budgets.QueryBudgetExceeded, "ran 2 queries, over its budget of 1"):
+            self.call(two_queries)
+        self.assertEqual(self.call(one_query, "/?budget=1").status_code, 200)
+        with self.assertRaises(budgets.QueryBudgetExceeded):
+            self.call(one_query, "/?budget=0")
+
+    @override_settings(QUERY_BUDGET_MODE=budgets.LOG)
+    def test_log_mode(self):
+        with self.assertLogs("backend.services.query_budget", "WARNING") as logs:
+            response = self.call(two_queries)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("two_queries ran 2 queries", logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE=budgets.OFF)
+    def test_off_mode(self):
+        with self.assertNoLogs("backend.services.query_budget"):
+            self.call(two_queries)
+
+    @override_settings(QUERY_BUDGET_MODE=budgets.RAISE)
+    def test_counter_is_removed(self):
+        with self.assertRaises(budgets.QueryBudgetExceeded):
+            self.call(two_queries)
+        for connection in connections.all():
+            self.assertFalse(any(
+                isinstance(wrapper, budgets.QueryCounter)
+                for wrapper in connection.execute_wrappers))
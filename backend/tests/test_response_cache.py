@@ -0,0 +1,110 @@
+"""Tests for the server-side response cache of list endpoints."""
+import json
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ClassModel
+from ..services import metrics, response_cache
+from ..services.response_cache import LocalCache
+from .test_utils import BaseTestCase
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def test_evicts_least_recently_used_over_budget(self):
+        local = LocalCache(max_bytes=10)
+        local.set("a", (b"1234", "text/plain", 0))
+        local.set("b", (b"1234", "text/plain", 0))
+        local.get("a")
+        local.set("c", (b"1234", "text/plain", 0))
+
+        self.assertIsNotNone(local.get("a"))
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.bytes, 8)
+
+    def test_skips_entries_larger_than_budget(self):
+        local = LocalCache(max_bytes=3)
+        local.set("a", (b"1234", "text/plain", 0))
+        self.assertEqual(len(local), 0)
+
+
+class ResponseCacheTestCase(BaseTestCase):
+    """Tests for @cached_response on classes, schedules and prices."""
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+
+    def get(self, url_name, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        queries = [q for q in ctx.captured_queries
+                   if "backend_classmodel" in q["sql"]]
+        return json.loads(response.content)["response"], queries
+
+    def test_second_request_is_served_from_cache(self):
+        first, queries = self.get("classes")
+        self.assertTrue(queries)
+
+        second, queries = self.get("classes")
+        self.assertEqual(second, first)
+        self.assertEqual(queries, [])
+
+    def test_shared_tier_fills_local_tier(self):
+        self.get("classes")
+        # Another process: its local tier is empty.
+        response_cache.local_cache.clear()
+
+        _, queries = self.get("classes")
+        self.assertEqual(queries, [])
+        self.assertEqual(len(response_cache.local_cache), 1)
+
+        stats = response_cache.stats()["endpoints"]["classes"]
+        self.assertEqual(
+            (stats["miss"], stats["shared"], stats["local"]), (1, 1, 0))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_write_invalidates_through_version(self):
+        self.get("classes")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.class_one.name = "Epee"
+            self.class_one.save()
+
+        classes, _ = self.get("classes")
+        self.assertEqual([cls["name"] for cls in classes], ["Epee"])
+
+    def test_query_params_are_normalized(self):
+        self.get("schedules", class_id=self.class_one.id, page=1)
+        self.client.get(
+            f"{reverse('schedules')}?page=1&class_id={self.class_one.id}")
+        stats = response_cache.stats()["endpoints"]["schedules"]
+        self.assertEqual((stats["miss"], stats["local"]), (1, 1))
+
+    def test_errors_are_not_cached(self):
+        self.membership.role = "kiosk"
+        self.membership.save()
+        self.assertEqual(self.client.get(reverse("prices")).status_code, 403)
+        self.assertEqual(response_cache.stats()["endpoints"], {})
+
+    def test_reports_memory_and_age(self):
+        self.get("prices")
+        self.get("prices")
+        stats = response_cache.stats()
+        self.assertEqual(stats["local_entries"], 1)
+        self.assertGreater(stats["local_bytes"], 0)
+        self.assertEqual(
+            metrics.registry.histogram(
+                "response_cache_age_seconds", endpoint="prices").count, 1)
+
+    def test_memory_is_published(self):
+        self.get("prices")
+        rendered = metrics.render(metrics.collect())
+        self.assertIn("response_cache_local_entries 1\n", rendered)
+        self.assertIn(
+            f"response_cache_local_bytes {response_cache.local_cache.bytes}\n",
+            rendered)
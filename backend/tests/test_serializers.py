@@ -0,0 +1,149 @@
+"""Tests for CaseSerializer key translation and the fast read path."""
+import json
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import serializers
+from ..models import ClassModel, ClassOccurrence, Day, Payment, Schedule, Student
+from ..serializers import (
+    CaseSerializer, ClassModelSerializer, ClassOccurrenceSerializer,
+    PaymentSerializer, ScheduleSerializer, StudentSerializer, camelize,
+)
+from .test_utils import BaseTestCase
+
+
+class CaseSerializerKeysTestCase(SimpleTestCase):
+    """Compiled key tables must translate exactly like the per-key converters."""
+
+    def serializer_classes(self):
+        return [
+            value for value in vars(serializers).values()
+            if isinstance(value, type) and issubclass(value, CaseSerializer)
+            and value is not CaseSerializer
+        ]
+
+    def test_tables_match_converters(self):
+        for serializer_class in self.serializer_classes():
+            with self.subTest(serializer=serializer_class.__name__):
+                for snake, camel in serializer_class._camel_keys.items():
+                    self.assertEqual(camel, CaseSerializer.snake_to_camel(snake))
+                for camel, snake in serializer_class._snake_keys.items():
+                    self.assertEqual(snake, CaseSerializer.camel_to_snake(camel))
+                self.assertIn(
+                    "school", serializer_class._camel_keys)
+
+    def test_to_internal_value_translates_unknown_keys(self):
+        serializer = StudentSerializer(data={
+            "firstName": "John",
+            "lastName": "Doe",
+            "isLiabilityFormSent": True,
+        })
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["first_name"], "John")
+        self.assertTrue(serializer.validated_data["is_liability_form_sent"])
+
+    def test_dict_to_camel_case_is_memoized(self):
+        camelize.cache_clear()
+        for _ in range(3):
+            data = CaseSerializer.dict_to_camel_case({"student_id": 1})
+
+        self.assertEqual(data, {"studentId": 1})
+        self.assertEqual(camelize.cache_info().hits, 2)
+
+    def test_camelize_selected_keys(self):
+        self.assertEqual(
+            CaseSerializer.camelize_selected_keys(
+                {"first_name": "John", "last_name": "Doe"}, ["first_name"]),
+            {"firstName": "John", "last_name": "Doe"})
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_serializers", rows=10, repeat=1, stdout=out)
+
+        self.assertIn("StudentSerializer (10 rows)", out.getvalue())
+        self.assertIn("ClassOccurrenceSerializer (10 rows)", out.getvalue())
+        self.assertIn("to_internal_value: per-key", out.getvalue())
+
+
+class FastDataTestCase(BaseTestCase):
+    """fast_data must produce exactly what the DRF serializers produce."""
+
+    def setUp(self):
+        super().setUp()
+        day, _ = Day.objects.get_or_create(name="Monday")
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        student = Student.objects.create(
+            first_name="John", last_name="Doe", school=self.school,
+            emergency_contacts="Jane")
+        Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+        schedule = Schedule.objects.create(
+            class_model=self.class_one, day=day, class_time=time(18, 30),
+            school=self.school)
+        ClassOccurrence.objects.create(
+            school=self.school, class_model=self.class_one, schedule=schedule,
+            planned_date=date(2025, 7, 7), actual_date=date(2025, 7, 8),
+            planned_start_time=time(18, 30), actual_start_time=time(19, 0),
+            planned_duration=60, actual_duration=45, notes="Moved")
+        ClassOccurrence.objects.create(
+            school=self.school, fallback_class_name="Open mat",
+            planned_date=date(2025, 7, 9), actual_date=date(2025, 7, 9),
+            planned_start_time=time(8, 0), actual_start_time=time(8, 0),
+            planned_duration=90, actual_duration=90)
+        Payment.objects.create(
+            school=self.school, student_id=student, class_id=self.class_one,
+            student_name="John Doe", class_name="Foil", amount=12.5,
+            payment_date=datetime(2025, 7, 1, 12, 30, 15, 123456,
+                                   tzinfo=dt_timezone.utc),
+            payment_month=7, payment_year=2025)
+        Payment.objects.create(
+            school=self.school, amount=100, payment_month=7,
+            payment_year=2025)
+
+    def test_matches_drf_output(self):
+        for serializer_class, model in [
+                (StudentSerializer, Student),
+                (ClassModelSerializer, ClassModel),
+                (ScheduleSerializer, Schedule),
+                (ClassOccurrenceSerializer, ClassOccurrence),
+                (PaymentSerializer, Payment)]:
+            with self.subTest(serializer=serializer_class.__name__):
+                queryset = model.objects.filter(school=self.school).order_by("id")
+                self.assertEqual(
+                    json.dumps(serializer_class.fast_data(queryset)),
+                    json.dumps(serializer_class(queryset, many=True).data))
+
+    def test_matches_drf_output_for_field_subsets(self):
+        queryset = Payment.objects.filter(school=self.school).order_by("id")
+        fields = ["amount", "payment_date", "student_id"]
+
+        self.assertEqual(
+            PaymentSerializer.fast_data(queryset, fields=fields),
+            PaymentSerializer(queryset, many=True, fields=fields).data)
+        self.assertIs(
+            PaymentSerializer.read_plan(fields),
+            PaymentSerializer.read_plan(reversed(fields)))
+
+    def test_reads_one_query_without_joins(self):
+        queryset = Payment.objects.filter(school=self.school)
+        with CaptureQueriesContext(connection) as ctx:
+            PaymentSerializer.fast_data(queryset)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn("JOIN", ctx.captured_queries[0]["sql"])
+
+    def test_benchmark_command_with_school(self):
+        out = StringIO()
+        call_command(
+            "benchmark_serializers", rows=10, repeat=1,
+            school=self.school.id, stdout=out)
+
+        self.assertIn("PaymentSerializer queryset (2 rows)", out.getvalue())
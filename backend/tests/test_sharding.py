@@ -0,0 +1,200 @@
+"""Tests for tenant shards, on two SQLite databases."""
+import json
+from io import StringIO
+from unittest import mock
+from datetime import date, time
+
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import (
+    Attendance, ClassModel, ClassOccurrence, Day, Payment, Schedule, School,
+    SchoolMembership, Student,
+)
+from ..services import db_routing
+from ..tasks import generate_school_occurrences
+from .test_utils import BaseTestCase
+
+
+@override_settings(DATABASE_SHARDS=["default", "shard_1"])
+class ShardingTestCase(BaseTestCase):
+    databases = {"default", "shard_1"}
+
+    def setUp(self):
+        super().setUp()
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        self.student = Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+        schedule = Schedule.objects.create(
+            class_model=self.class_one, day=Day.objects.get(name="Monday"),
+            class_time=time(10, 0), school=self.school)
+        occurrence = ClassOccurrence.objects.create(
+            school=self.school, class_model=self.class_one, schedule=schedule,
+            planned_date=date(2026, 10, 19), actual_date=date(2026, 10, 19),
+            planned_start_time=time(10, 0), actual_start_time=time(10, 0),
+            planned_duration=60, actual_duration=60)
+        Attendance.objects.create(
+            school=self.school, student_id=self.student,
+            class_occurrence=occurrence)
+        Payment.objects.create(
+            school=self.school, student_id=self.student,
+            class_id=self.class_one, amount=20, payment_month=10,
+            payment_year=2026)
+
+    def move(self, *args):
+        call_command(
+            "move_school_shard", self.school.id, "shard_1", *args,
+            stdout=StringIO())
+
+    def counts(self, alias):
+        return [
+            model.objects.using(alias).filter(school=self.school).count()
+            for model in (ClassModel, Student, Schedule, ClassOccurrence,
+                          Attendance, Payment)
+        ]
+
+    def test_move_copies_and_removes_data(self):
+        self.move("--batch-size", "1")
+
+        self.assertEqual(self.counts("shard_1"), [1] * 6)
+        self.assertEqual(
+            Student.objects.using("shard_1").get(school=self.school).id,
+            self.student.id)
+        self.assertEqual(self.counts("default"), [0] * 6)
+        self.assertEqual(School.objects.get(id=self.school.id).shard, "shard_1")
+        self.assertTrue(
+            School.objects.using("shard_1").filter(id=self.school.id).exists())
+        # The directory stays where it was.
+        self.assertFalse(SchoolMembership.objects.using("shard_1").exists())
+
+    def test_keep_source(self):
+        self.move("--keep-source")
+        self.assertEqual(self.counts("default"), [1] * 6)
+        self.assertEqual(self.counts("shard_1"), [1] * 6)
+
+    def test_requests_follow_the_school(self):
+        self.move()
+
+        with CaptureQueriesContext(connections["shard_1"]) as ctx:
+            response = self.client.get(reverse("students"))
+        students = json.loads(response.content)["response"]
+        self.assertEqual([s["id"] for s in students], [self.student.id])
+        self.assertTrue(ctx.captured_queries)
+
+        response = self.client.post(
+            reverse("students"),
+            data={"firstName": "Bo", "lastName": "Kim"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Student.objects.using("shard_1").filter(last_name="Kim").count(), 1)
+        self.assertFalse(Student.objects.using("default").exists())
+
+    def take_student_id(self):
+        other = School.objects.using("shard_1").create(
+            id=self.school.id + 1, name="Other", clerk_org_id="other_org")
+        return Student.objects.using("shard_1").create(
+            id=self.student.id, first_name="Cy", last_name="Taken",
+            school=other)
+
+    def test_move_onto_taken_ids_is_refused(self):
+        self.take_student_id()
+
+        with self.assertRaisesMessage(CommandError, "--renumber"):
+            self.move()
+
+        self.assertEqual(self.counts("default"), [1] * 6)
+        self.assertEqual(self.counts("shard_1"), [0] * 6)
+        self.assertEqual(School.objects.get(id=self.school.id).shard, "default")
+        self.assertFalse(db_routing.is_moving(self.school.id))
+
+    def test_move_onto_a_populated_shard_renumbers_rows(self):
+        taken = self.take_student_id()
+
+        self.move("--renumber")
+
+        self.assertEqual(self.counts("shard_1"), [1] * 6)
+        self.assertEqual(self.counts("default"), [0] * 6)
+        student = Student.objects.using("shard_1").get(school=self.school)
+        self.assertNotEqual(student.id, taken.id)
+        attendance = Attendance.objects.using("shard_1").get(school=self.school)
+        self.assertEqual(attendance.student_id_id, student.id)
+        occurrence = attendance.class_occurrence
+        self.assertEqual(occurrence.school_id, self.school.id)
+        self.assertEqual(occurrence.schedule.class_model_id,
+                         occurrence.class_model_id)
+        payment = Payment.objects.using("shard_1").get(school=self.school)
+        self.assertEqual(
+            (payment.student_id_id, payment.class_id_id),
+            (student.id, occurrence.class_model_id))
+        self.assertFalse(db_routing.is_moving(self.school.id))
+
+    def test_schedule_create_rolls_back_on_the_shard(self):
+        self.move()
+        with mock.patch(
+                "backend.services.occurrence_generation"
+                ".sync_schedule_occurrences",
+                side_effect=RuntimeError("generation failed")), \
+                self.assertLogs("backend.views.schedules"):
+            response = self.client.post(
+                reverse("schedules"),
+                json.dumps({
+                    "classId": self.class_one.id,
+                    "day": "Tuesday",
+                    "classTime": "18:00",
+                }),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(
+            Schedule.objects.using("shard_1").filter(school=self.school).count(),
+            1)
+
+    def test_generation_skips_moving_schools(self):
+        db_routing.lock_school_writes(self.school.id)
+        with self.assertLogs("backend.tasks", "WARNING"):
+            summary = generate_school_occurrences.apply(
+                args=([self.school.id], date(2026, 10, 19).isoformat()),
+                kwargs={"shard": "default"}).get()
+        self.assertEqual(summary, {})
+        db_routing.unlock_school_writes(self.school.id)
+
+        # A subtask queued before the move still names the old shard.
+        self.move()
+        with self.assertLogs("backend.tasks", "WARNING"):
+            summary = generate_school_occurrences.apply(
+                args=([self.school.id], date(2026, 10, 19).isoformat()),
+                kwargs={"shard": "default"}).get()
+        self.assertEqual(summary, {})
+        self.assertFalse(ClassOccurrence.objects.using("default").exists())
+
+    def test_writes_are_refused_while_moving(self):
+        db_routing.lock_school_writes(self.school.id)
+        response = self.client.post(
+            reverse("students"),
+            data={"firstName": "Bo", "lastName": "Kim"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.client.get(reverse("students")).status_code, 200)
+
+    def test_school_edits_reach_the_copy(self):
+        self.move()
+        school = School.objects.get(id=self.school.id)
+        school.name = "Renamed"
+        school.save()
+        self.assertEqual(
+            School.objects.using("shard_1").get(id=school.id).name, "Renamed")
+
+    def test_shard_is_not_exposed(self):
+        self.move()
+        response = self.client.get(
+            reverse("school_detail", args=[self.school.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("shard", json.loads(response.content)["response"])
@@ -0,0 +1,113 @@
+"""Tests for the slow-query log."""
+import json
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import School, Student
+from ..services import slow_queries
+from ..tasks import warm_today_snapshots
+from .test_utils import BaseTestCase
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryLogTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Every query is slow here; keep them out of the test output.
+        cls.quiet_patch = patch.object(slow_queries.logger, "disabled", True)
+        cls.quiet_patch.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.quiet_patch.stop()
+
+    def setUp(self):
+        super().setUp()
+        Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+        slow_queries.log.reset()
+        self.addCleanup(slow_queries.log.reset)
+
+    def student_queries(self, records):
+        return [record for record in records
+                if "backend_student" in record["sql"]]
+
+    def test_records_view_school_and_plan(self):
+        with patch.object(slow_queries.logger, "disabled", False), \
+                self.assertLogs("backend.services.slow_queries", "WARNING") as logs:
+            self.client.get(reverse("students"))
+        self.assertTrue(any("students_view" in line for line in logs.output))
+
+        [record] = self.student_queries(slow_queries.log.recent())
+        self.assertEqual(record["view"], "backend.views.students.students_view")
+        self.assertEqual(record["school_id"], self.school.id)
+        self.assertEqual(record["database"], "default")
+        self.assertEqual(record["params"], ["<int>"])
+        self.assertIn("backend_student", record["plan"])
+
+    def test_params_are_redacted(self):
+        Student.objects.filter(last_name="Secret", id__in=[1, 2, 3]).count()
+        record = self.student_queries(slow_queries.log.recent())[0]
+        self.assertNotIn("Secret", json.dumps(record))
+        self.assertEqual(sorted(record["params"]), ["<int>"] * 3 + ["<str>"])
+
+    def test_fingerprints_ignore_parameters(self):
+        for ids in ([1], [1, 2], [1, 2, 3]):
+            list(Student.objects.filter(id__in=ids))
+        [top] = [entry for entry in slow_queries.log.top_fingerprints()
+                 if "backend_student" in entry["sql"]]
+        self.assertEqual(top["count"], 3)
+        self.assertIn("IN (...)", top["sql"])
+        self.assertGreaterEqual(top["total_ms"], top["max_ms"])
+
+    @override_settings(SLOW_QUERY_EXPLAIN_INTERVAL=60)
+    def test_plans_are_captured_once_per_interval(self):
+        with self.assertNumQueries(2):
+            Student.objects.count()
+            Student.objects.count()
+        records = self.student_queries(slow_queries.log.recent())
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["plan"], records[1]["plan"])
+
+    def test_plans_inside_a_transaction(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM backend_student WHERE id = %s", [1])
+        [record] = self.student_queries(slow_queries.log.recent())
+        self.assertIsNotNone(record["plan"])
+        self.assertTrue(Student.objects.exists())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_threshold_off(self):
+        Student.objects.count()
+        self.assertEqual(slow_queries.log.recent(), [])
+
+    def test_tasks_are_attributed(self):
+        warm_today_snapshots.delay()
+        views = {record["view"] for record in slow_queries.log.recent()}
+        self.assertIn("task backend.tasks.warm_today_snapshots", views)
+
+    def test_endpoint_shows_own_school(self):
+        self.client.get(reverse("students"))
+        other = School.objects.create(name="Other", clerk_org_id="other_org")
+        token = slow_queries.attribute("elsewhere", other.id)
+        Student.objects.count()
+        slow_queries.clear(token)
+
+        response = self.client.get(reverse("slow_queries"))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertTrue(body["recent"])
+        self.assertTrue(all(
+            record["schoolId"] == self.school.id for record in body["recent"]))
+        self.assertNotIn("elsewhere", json.dumps(body))
+        self.assertTrue(body["top"])
+
+        self.membership.role = "teacher"
+        self.membership.save()
+        self.assertEqual(self.client.get(reverse("slow_queries")).status_code, 403)
@@ -0,0 +1,114 @@
+"""Tests for ?fields= on the list endpoints."""
+import json
+from datetime import date, time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ClassModel, ClassOccurrence, Student
+from ..serializers import (
+    ClassOccurrenceSerializer, StudentSerializer, _read_plan,
+    precompile_read_plans,
+)
+from ..views.helpers import parse_fields_param
+from .test_utils import BaseTestCase
+
+
+class FieldsParamTestCase(SimpleTestCase):
+    def test_field_set_name(self):
+        self.assertEqual(
+            parse_fields_param("roster", StudentSerializer),
+            ["id", "first_name", "last_name"])
+
+    def test_camel_case_fields(self):
+        self.assertEqual(
+            parse_fields_param("id, isLiabilityFormSent", StudentSerializer),
+            ["id", "is_liability_form_sent"])
+
+    def test_sparse_fields_limit_allow_list(self):
+        class LimitedSerializer(StudentSerializer):
+            sparse_fields = ("id", "first_name")
+
+        self.assertEqual(parse_fields_param("id", LimitedSerializer), ["id"])
+        with self.assertRaisesMessage(ValueError, "Unknown fields: lastName"):
+            parse_fields_param("id,lastName", LimitedSerializer)
+
+    def test_field_sets_are_precompiled(self):
+        _read_plan.cache_clear()
+        precompile_read_plans([ClassOccurrenceSerializer])
+        hits = _read_plan.cache_info().hits
+        ClassOccurrenceSerializer.read_plan(
+            reversed(ClassOccurrenceSerializer.field_sets["kiosk"]))
+        self.assertEqual(_read_plan.cache_info().hits, hits + 1)
+
+    def test_bad_field_set_is_rejected(self):
+        class BrokenSerializer(StudentSerializer):
+            field_sets = {"broken": ("id", "secret")}
+
+        with self.assertRaises(ImproperlyConfigured):
+            precompile_read_plans([BrokenSerializer])
+
+
+class SparseFieldsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        Student.objects.create(
+            first_name="Ann", last_name="Lee", school=self.school)
+        today = date.today()
+        ClassOccurrence.objects.create(
+            school=self.school,
+            class_model=self.class_one,
+            planned_date=today,
+            actual_date=today,
+            planned_start_time=time(10, 0),
+            actual_start_time=time(10, 0),
+            planned_duration=60,
+            actual_duration=60,
+            notes="Bring masks",
+        )
+
+    def get(self, url_name, fields):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name), {"fields": fields})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content), ctx.captured_queries
+
+    def test_fields_limit_keys_and_columns(self):
+        data, queries = self.get("class_occurrences", "id,actualStartTime")
+        self.assertEqual(
+            [set(row) for row in data["response"]], [{"id", "actualStartTime"}])
+        sql = " ".join(q["sql"] for q in queries
+                       if "backend_classoccurrence" in q["sql"])
+        self.assertNotIn("notes", sql)
+
+    def test_field_set(self):
+        data, _ = self.get("today_class_occurrences", "kiosk")
+        self.assertEqual(set(data["response"][0]), {
+            "id", "classModel", "fallbackClassName", "actualDate",
+            "actualStartTime", "actualDuration", "isCancelled",
+        })
+
+        full, _ = self.get("today_class_occurrences", "")
+        self.assertIn("notes", full["response"][0])
+
+    def test_list_endpoints(self):
+        data, _ = self.get("students", "firstName")
+        self.assertEqual(data["response"], [{"firstName": "Ann"}])
+
+        data, _ = self.get("classes", "summary")
+        self.assertEqual(data["response"], [{
+            "id": self.class_one.id, "name": "Foil", "durationMinutes": 60,
+        }])
+
+        data, _ = self.get("list_memberships", "email,role")
+        self.assertEqual(
+            data["members"], [{"email": "test@example.com", "role": "owner"}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse("schedules"), {"fields": "secret"})
+        self.error_response_helper(response, 400, "Unknown fields: secret")
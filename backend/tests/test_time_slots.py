@@ -1,10 +1,13 @@
 """Tests for available time slots calculation."""
 import json
+from datetime import date, timedelta
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.utils.dateparse import parse_time
+from django.utils.dateparse import parse_date, parse_time
 
-from ..models import ClassModel, Day, Schedule
+from ..models import ClassModel, ClassOccurrence, Day, Schedule
 from .test_utils import BaseTestCase
 
 
@@ -111,3 +114,285 @@ class TimeSlotsTestCase(BaseTestCase):
 
         for slot in self.available_slots_day_two:
             self.assertIn(slot, returned_slots)
+
+    def test_overlapping_schedules_block_their_union(self):
+        overlapping_class = ClassModel.objects.create(
+            name="Epee", duration_minutes=60, school=self.school
+        )
+        Schedule.objects.create(
+            class_model=overlapping_class,
+            day=self.day_two,
+            class_time=parse_time("10:30:00"),
+            school=self.school,
+        )
+
+        response = self.client.get(
+            self.slots_url, {
+                "day": self.day_two_name, "duration": self.new_class_duration})
+        returned_slots = json.loads(response.content)["availableSlots"]
+
+        self.assertNotIn("11:00", returned_slots)
+        self.assertEqual(returned_slots[3], "11:30")
+
+    def test_schedules_loaded_in_one_query(self):
+        for i in range(5):
+            class_model = ClassModel.objects.create(
+                name=f"Class {i}", duration_minutes=30, school=self.school)
+            Schedule.objects.create(
+                class_model=class_model,
+                day=self.day_two,
+                class_time=parse_time(f"{17 + i // 2}:{30 * (i % 2):02d}"),
+                school=self.school,
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(
+                self.slots_url, {
+                    "day": self.day_two_name, "duration": 30})
+
+        schedule_queries = [q for q in ctx.captured_queries
+                            if "backend_schedule" in q["sql"]]
+        class_queries = [q for q in ctx.captured_queries
+                         if q["sql"].startswith('SELECT "backend_classmodel"')]
+        self.assertEqual(len(schedule_queries), 1)
+        # Only the school's class durations, not one query per schedule.
+        self.assertEqual(len(class_queries), 1)
+
+
+class WeekSlotsTestCase(BaseTestCase):
+    """Tests for the week view (GET /available_week_slots/)."""
+
+    def setUp(self):
+        super().setUp()
+        self.week_slots_url = reverse("available_week_slots")
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school
+        )
+        self.tuesday, _ = Day.objects.get_or_create(name="Tuesday")
+        Schedule.objects.create(
+            class_model=self.class_one,
+            day=self.tuesday,
+            class_time=parse_time("10:00:00"),
+            school=self.school,
+        )
+
+    def test_week_view_answers_all_days_and_durations(self):
+        response = self.client.get(
+            self.week_slots_url, {"duration": "60,90"})
+        self.positive_response_helper(
+            response, 200, "Available time slots for the week")
+
+        week = json.loads(response.content)["availableSlots"]
+        self.assertEqual(list(week), [
+            "Monday", "Tuesday", "Wednesday", "Thursday",
+            "Friday", "Saturday", "Sunday"])
+        self.assertEqual(len(week["Monday"]["60"]), 25)
+        self.assertEqual(week["Tuesday"]["60"][:4],
+                         ["08:00", "08:30", "09:00", "11:00"])
+        self.assertEqual(week["Tuesday"]["90"][:3],
+                         ["08:00", "08:30", "11:00"])
+
+    def test_week_view_accepts_repeated_duration_params(self):
+        response = self.client.get(
+            self.week_slots_url + "?duration=30&duration=120")
+
+        week = json.loads(response.content)["availableSlots"]
+        self.assertEqual(set(week["Sunday"]), {"30", "120"})
+
+    def test_short_gap_between_classes_is_not_bridged(self):
+        # A 10-minute class at 12:40 leaves 11:00-12:40 and 12:50-21:00 free.
+        short_class = ClassModel.objects.create(
+            name="Warm-up", duration_minutes=10, school=self.school
+        )
+        Schedule.objects.create(
+            class_model=short_class,
+            day=self.tuesday,
+            class_time=parse_time("12:40:00"),
+            school=self.school,
+        )
+
+        response = self.client.get(self.week_slots_url, {"duration": 60})
+
+        tuesday = json.loads(response.content)["availableSlots"]["Tuesday"]["60"]
+        self.assertIn("11:30", tuesday)
+        self.assertNotIn("12:00", tuesday)
+        self.assertIn("12:50", tuesday)
+        self.assertEqual(tuesday, sorted(tuesday))
+
+    def schedule_queries(self, duration):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.week_slots_url, {"duration": duration})
+        return [q for q in ctx.captured_queries
+                if "backend_schedule" in q["sql"]]
+
+    def test_week_view_caches_class_durations_only(self):
+        self.schedule_queries(60)
+        self.assertEqual(self.schedule_queries(60), [])
+
+        # 45 minutes is no class's duration, so it is never cached.
+        self.schedule_queries(45)
+        self.assertEqual(len(self.schedule_queries(45)), 1)
+
+    def test_week_view_requires_duration(self):
+        response = self.client.get(self.week_slots_url)
+
+        self.error_response_helper(
+            response, 400, "Class duration was not provided")
+
+    def test_week_view_rejects_non_positive_duration(self):
+        response = self.client.get(self.week_slots_url, {"duration": "60,0"})
+
+        self.error_response_helper(
+            response, 400, "Class duration must be positive")
+
+
+class AvailabilityCacheTestCase(BaseTestCase):
+    """Tests for caching of availability results by school data version."""
+
+    def setUp(self):
+        super().setUp()
+        self.slots_url = reverse("available_time_slots")
+        self.occurrence_time_url = reverse("available_occurrence_time")
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school
+        )
+        self.monday, _ = Day.objects.get_or_create(name="Monday")
+        self.schedule = Schedule.objects.create(
+            class_model=self.class_one,
+            day=self.monday,
+            class_time=parse_time("10:00:00"),
+            school=self.school,
+        )
+        # Intervals are only cached for dates inside the horizon.
+        today = date.today()
+        self.date = (today + timedelta(days=-today.weekday() % 7)).isoformat()
+        self.occurrence = ClassOccurrence.objects.create(
+            school=self.school,
+            class_model=self.class_one,
+            planned_date=parse_date(self.date),
+            actual_date=parse_date(self.date),
+            planned_start_time=parse_time("10:00:00"),
+            actual_start_time=parse_time("10:00:00"),
+            planned_duration=60,
+            actual_duration=60,
+        )
+
+    def get_slots(self, duration=60):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                self.slots_url, {"day": "Monday", "duration": duration})
+        schedule_queries = [q for q in ctx.captured_queries
+                            if "backend_schedule" in q["sql"]]
+        return json.loads(response.content)["availableSlots"], schedule_queries
+
+    def get_intervals(self, occurrence_date=None, duration=60):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                self.occurrence_time_url,
+                {"date": occurrence_date or self.date, "duration": duration})
+        occurrence_queries = [q for q in ctx.captured_queries
+                              if "backend_classoccurrence" in q["sql"]]
+        return (json.loads(response.content)["availableIntervals"],
+                occurrence_queries)
+
+    def test_repeated_slot_checks_are_served_from_cache(self):
+        first, queries = self.get_slots()
+        self.assertEqual(len(queries), 1)
+
+        second, queries = self.get_slots()
+        self.assertEqual(second, first)
+        self.assertEqual(queries, [])
+
+    def test_ad_hoc_slot_checks_are_not_cached(self):
+        self.get_slots(duration=45)
+        _, queries = self.get_slots(duration=45)
+        self.assertEqual(len(queries), 1)
+
+    def test_new_schedule_invalidates_slots(self):
+        self.get_slots()
+        other_class = ClassModel.objects.create(
+            name="Epee", duration_minutes=60, school=self.school)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("schedules"),
+                json.dumps({
+                    "classId": other_class.id, "day": "Monday",
+                    "classTime": "12:00"}),
+                content_type="application/json",
+            )
+
+        slots, _ = self.get_slots()
+        self.assertNotIn("12:00", slots)
+
+    def test_deleted_schedule_invalidates_slots(self):
+        self.get_slots()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse("delete_schedule", args=[self.schedule.id]))
+
+        slots, _ = self.get_slots()
+        self.assertIn("10:00", slots)
+
+    def test_class_duration_edit_invalidates_slots(self):
+        slots, _ = self.get_slots()
+        self.assertIn("11:00", slots)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse("edit_class", args=[self.class_one.id]),
+                json.dumps({"durationMinutes": 90}),
+                content_type="application/json",
+            )
+
+        slots, _ = self.get_slots()
+        self.assertNotIn("11:00", slots)
+        self.assertIn("11:30", slots)
+
+    def test_repeated_interval_checks_are_served_from_cache(self):
+        first, queries = self.get_intervals()
+        self.assertEqual(len(queries), 1)
+
+        second, queries = self.get_intervals()
+        self.assertEqual(second, first)
+        self.assertEqual(queries, [])
+
+    def test_ad_hoc_interval_checks_are_not_cached(self):
+        for occurrence_date, duration in (("2020-01-06", 60), (self.date, 45)):
+            self.get_intervals(occurrence_date, duration)
+            _, queries = self.get_intervals(occurrence_date, duration)
+            self.assertEqual(len(queries), 1)
+
+    def test_occurrence_writes_invalidate_intervals(self):
+        intervals, _ = self.get_intervals()
+        self.assertEqual(intervals[1][0], "11:00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse("edit_occurrence", args=[self.occurrence.id]),
+                json.dumps({"actualDuration": 90}),
+                content_type="application/json",
+            )
+        intervals, _ = self.get_intervals()
+        self.assertEqual(intervals[1][0], "11:30")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("class_occurrences"),
+                json.dumps({
+                    "fallbackClassName": "Open gym",
+                    "plannedDate": self.date,
+                    "plannedStartTime": "08:00",
+                    "plannedDuration": 60,
+                }),
+                content_type="application/json",
+            )
+        intervals, _ = self.get_intervals()
+        self.assertEqual(intervals[0][0], "09:00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse("delete_occurrence", args=[self.occurrence.id]))
+        intervals, _ = self.get_intervals()
+        self.assertEqual(intervals, [["09:00", "20:00"]])
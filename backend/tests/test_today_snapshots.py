@@ -0,0 +1,101 @@
+"""Tests for the cached snapshots of today's classes and occurrences."""
+import json
+from datetime import date, time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ClassModel, ClassOccurrence, Day, Schedule
+from ..tasks import warm_today_snapshots
+from .test_utils import BaseTestCase
+
+
+class TodaySnapshotsTestCase(BaseTestCase):
+    """Tests for today_class_occurrences and today_classes_list caching."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.day, _ = Day.objects.get_or_create(
+            name=self.today.strftime("%A"))
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        Schedule.objects.create(
+            class_model=self.class_one, day=self.day,
+            class_time=time(10, 0), school=self.school)
+        self.occurrence = self.create_occurrence(time(10, 0))
+
+    def create_occurrence(self, start_time):
+        return ClassOccurrence.objects.create(
+            school=self.school,
+            class_model=self.class_one,
+            planned_date=self.today,
+            actual_date=self.today,
+            planned_start_time=start_time,
+            actual_start_time=start_time,
+            planned_duration=60,
+            actual_duration=60,
+        )
+
+    def get(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        queries = [q for q in ctx.captured_queries
+                   if "backend_classoccurrence" in q["sql"]
+                   or "backend_schedule" in q["sql"]]
+        return json.loads(response.content)["response"], queries
+
+    def test_occurrences_are_served_from_snapshot(self):
+        first, queries = self.get("today_class_occurrences")
+        self.assertEqual([occ["id"] for occ in first], [self.occurrence.id])
+        self.assertTrue(queries)
+
+        second, queries = self.get("today_class_occurrences")
+        self.assertEqual(second, first)
+        self.assertEqual(queries, [])
+
+    def test_occurrence_write_invalidates_snapshot(self):
+        self.get("today_class_occurrences")
+        with self.captureOnCommitCallbacks(execute=True):
+            other = self.create_occurrence(time(12, 0))
+
+        occurrences, _ = self.get("today_class_occurrences")
+        self.assertEqual(
+            {occ["id"] for occ in occurrences}, {self.occurrence.id, other.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.occurrence.is_cancelled = True
+            self.occurrence.save()
+        occurrences, _ = self.get("today_class_occurrences")
+        self.assertIn(True, [occ["isCancelled"] for occ in occurrences])
+
+    def test_classes_are_served_from_snapshot(self):
+        first, _ = self.get("today_classes_list")
+        self.assertEqual([cls["id"] for cls in first], [self.class_one.id])
+
+        second, queries = self.get("today_classes_list")
+        self.assertEqual(second, first)
+        self.assertEqual(queries, [])
+
+    def test_schedule_write_invalidates_classes_snapshot(self):
+        self.get("today_classes_list")
+        with self.captureOnCommitCallbacks(execute=True):
+            other_class = ClassModel.objects.create(
+                name="Epee", duration_minutes=60, school=self.school)
+            Schedule.objects.create(
+                class_model=other_class, day=self.day,
+                class_time=time(12, 0), school=self.school)
+
+        classes, _ = self.get("today_classes_list")
+        self.assertEqual(
+            {cls["id"] for cls in classes}, {self.class_one.id, other_class.id})
+
+    def test_warm_task_prebuilds_snapshots(self):
+        warm_today_snapshots.delay()
+
+        for url_name in ("today_class_occurrences", "today_classes_list"):
+            _, queries = self.get(url_name)
+            self.assertEqual(queries, [])
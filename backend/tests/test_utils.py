@@ -2,9 +2,11 @@
 import json
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from backend.models import School, SchoolMembership, User
+from backend.services import response_cache
 from backend.services.user_sync import sync_clerk_user
 
 FAKE_CLERK_PAYLOAD = {
@@ -34,6 +36,10 @@ class BaseTestCase(TestCase):
 
     def setUp(self):
         super().setUp()
+        # Versioned caches are keyed by school id, which the test database
+        # reuses between tests.
+        cache.clear()
+        response_cache.local_cache.clear()
         self.client.defaults["HTTP_AUTHORIZATION"] = "Bearer test-token"
 
         sync_clerk_user(
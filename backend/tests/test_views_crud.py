@@ -2,11 +2,13 @@
 import json
 from datetime import time
 
+from django.urls import reverse
 from django.utils.timezone import now
 
 from ..models import (
     ClassModel, ClassOccurrence, Day, Payment, Schedule, Student,
 )
+from ..views.occurrences import DUPLICATE_OCCURRENCE_ERROR
 from .test_utils import BaseTestCase
 
 
@@ -61,7 +63,38 @@ class ClassOccurrenceCRUDTestCase(BaseTestCase):
 
     # TODO: Add tests for PUT/PATCH /class_occurrences/<id>/
     # TODO: Add tests for DELETE /class_occurrences/<id>/
-    pass
+
+    def post_open_gym(self):
+        return self.client.post(
+            reverse("class_occurrences"),
+            json.dumps({
+                "fallbackClassName": "Open gym",
+                "plannedDate": now().date().isoformat(),
+                "plannedStartTime": "08:00",
+            }),
+            content_type="application/json",
+        )
+
+    def test_duplicate_occurrence_is_rejected(self):
+        self.assertEqual(self.post_open_gym().status_code, 200)
+        self.error_response_helper(
+            self.post_open_gym(), 400, DUPLICATE_OCCURRENCE_ERROR)
+
+    def test_moving_onto_another_occurrence_is_rejected(self):
+        other = ClassOccurrence.objects.create(
+            school=self.school, class_model=self.class_model,
+            planned_date=now().date(), actual_date=now().date(),
+            planned_start_time=time(12, 0), actual_start_time=time(12, 0),
+            planned_duration=60, actual_duration=60)
+
+        response = self.client.patch(
+            reverse("edit_occurrence", args=[other.id]),
+            json.dumps({"actualStartTime": "10:00"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertEqual(other.actual_start_time, time(12, 0))
 
 
 class ScheduleCRUDTestCase(BaseTestCase):
@@ -0,0 +1,199 @@
+"""Tests for virtual class occurrences synthesized from schedules."""
+import json
+from datetime import date, time, timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import Attendance, ClassModel, ClassOccurrence, Day, Schedule, Student
+from ..services.virtual_occurrences import make_virtual_id, parse_virtual_id
+from ..views.helpers import DUPLICATE_OCCURRENCE_ERROR
+from .test_utils import BaseTestCase
+
+
+@override_settings(VIRTUAL_OCCURRENCES=True)
+class VirtualOccurrencesTestCase(BaseTestCase):
+    """Tests for reading and materializing virtual occurrences."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.day, _ = Day.objects.get_or_create(
+            name=self.today.strftime("%A"))
+        self.class_one = ClassModel.objects.create(
+            name="Foil", duration_minutes=60, school=self.school)
+        response = self.client.post(
+            reverse("schedules"),
+            json.dumps({
+                "classId": self.class_one.id,
+                "day": self.day.name,
+                "classTime": "10:00",
+            }),
+            content_type="application/json",
+        )
+        self.schedule = Schedule.objects.get(
+            id=json.loads(response.content)["scheduleId"])
+        self.virtual_id = make_virtual_id(self.schedule.id, self.today)
+        self.student = Student.objects.create(
+            first_name="John", last_name="Doe", school=self.school)
+
+    def get_today(self):
+        response = self.client.get(reverse("today_class_occurrences"))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["response"]
+
+    def test_virtual_id_round_trip(self):
+        self.assertEqual(
+            parse_virtual_id(make_virtual_id(12, date(2025, 7, 7))),
+            (12, date(2025, 7, 7)))
+        self.assertIsNone(parse_virtual_id(12))
+        self.assertIsNone(parse_virtual_id("v12-20251341"))
+
+    def test_schedules_are_not_materialized(self):
+        self.assertFalse(ClassOccurrence.objects.exists())
+
+    def test_today_lists_virtual_occurrence(self):
+        occurrences = self.get_today()
+
+        self.assertEqual(len(occurrences), 1)
+        self.assertEqual(occurrences[0]["id"], self.virtual_id)
+        self.assertEqual(occurrences[0]["classModel"], self.class_one.id)
+        self.assertEqual(occurrences[0]["schedule"], self.schedule.id)
+        self.assertEqual(occurrences[0]["actualDate"], self.today.isoformat())
+        self.assertEqual(occurrences[0]["actualStartTime"], "10:00:00")
+        self.assertEqual(occurrences[0]["actualDuration"], 60)
+        self.assertFalse(occurrences[0]["isCancelled"])
+
+    def test_class_occurrences_window(self):
+        response = self.client.get(reverse("class_occurrences"), {
+            "start_date": self.today.isoformat(),
+            "end_date": (self.today + timedelta(days=20)).isoformat(),
+        })
+
+        self.assertEqual(
+            [occ["id"] for occ in json.loads(response.content)["response"]],
+            [make_virtual_id(self.schedule.id, self.today + timedelta(weeks=i))
+             for i in range(3)])
+
+    def test_class_occurrences_window_applies_to_rows(self):
+        last_month = self.today - timedelta(days=30)
+        ClassOccurrence.objects.create(
+            school=self.school, class_model=self.class_one,
+            planned_date=last_month, actual_date=last_month,
+            planned_start_time=time(12, 0), actual_start_time=time(12, 0),
+            planned_duration=60, actual_duration=60)
+
+        response = self.client.get(reverse("class_occurrences"), {
+            "start_date": self.today.isoformat(),
+            "end_date": self.today.isoformat(),
+        })
+
+        self.assertEqual(
+            [occ["id"] for occ in json.loads(response.content)["response"]],
+            [self.virtual_id])
+
+    def test_class_occurrences_window_must_be_ordered(self):
+        response = self.client.get(reverse("class_occurrences"), {
+            "start_date": self.today.isoformat(),
+            "end_date": (self.today - timedelta(days=1)).isoformat(),
+        })
+
+        self.error_response_helper(
+            response, 400, "start_date must not be after end_date")
+
+    def test_check_in_materializes_once(self):
+        for _ in range(2):
+            response = self.client.post(
+                reverse("check_in"),
+                json.dumps({"checkInData": {
+                    "studentId": self.student.id,
+                    "classOccurrencesList": [self.virtual_id],
+                    "todayDate": self.today.isoformat(),
+                }}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        occurrence = ClassOccurrence.objects.get()
+        self.assertEqual(occurrence.schedule, self.schedule)
+        self.assertEqual(occurrence.planned_date, self.today)
+        self.assertEqual(
+            Attendance.objects.get().class_occurrence, occurrence)
+        self.assertEqual(
+            [occ["id"] for occ in self.get_today()], [occurrence.id])
+
+    def test_cancelling_materializes(self):
+        response = self.client.patch(
+            reverse("edit_occurrence", args=[self.virtual_id]),
+            json.dumps({"isCancelled": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        occurrence = ClassOccurrence.objects.get()
+        self.assertTrue(occurrence.is_cancelled)
+        self.assertEqual(json.loads(response.content)["id"], occurrence.id)
+        self.assertEqual(
+            [occ["isCancelled"] for occ in self.get_today()], [True])
+
+    def test_unscheduled_virtual_id_is_not_found(self):
+        wrong_day = make_virtual_id(
+            self.schedule.id, self.today + timedelta(days=1))
+
+        response = self.client.patch(
+            reverse("edit_occurrence", args=[wrong_day]),
+            json.dumps({"isCancelled": True}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ClassOccurrence.objects.exists())
+
+    def test_deleting_virtual_occurrence_cancels_it(self):
+        response = self.client.delete(
+            reverse("delete_occurrence", args=[self.virtual_id]))
+
+        self.assertEqual(response.status_code, 200)
+        occurrence = ClassOccurrence.objects.get()
+        self.assertTrue(occurrence.is_cancelled)
+        self.assertEqual(
+            [occ["isCancelled"] for occ in self.get_today()], [True])
+
+    def test_taken_slot_is_a_duplicate(self):
+        # Another occurrence was moved onto the class's slot after the
+        # client listed the virtual one.
+        yesterday = self.today - timedelta(days=1)
+        ClassOccurrence.objects.create(
+            school=self.school, class_model=self.class_one,
+            fallback_class_name="Moved",
+            planned_date=yesterday, actual_date=self.today,
+            planned_start_time=time(10, 0), actual_start_time=time(10, 0),
+            planned_duration=60, actual_duration=60)
+
+        response = self.client.patch(
+            reverse("edit_occurrence", args=[self.virtual_id]),
+            json.dumps({"isCancelled": True}),
+            content_type="application/json",
+        )
+
+        self.error_response_helper(
+            response, 400, DUPLICATE_OCCURRENCE_ERROR)
+        self.assertEqual(ClassOccurrence.objects.count(), 1)
+
+    def test_available_time_includes_virtual_occurrences(self):
+        def get_intervals():
+            response = self.client.get(
+                reverse("available_occurrence_time"),
+                {"date": self.today.isoformat(), "duration": 60})
+            return json.loads(response.content)["availableIntervals"]
+
+        self.assertEqual(get_intervals(), [["08:00", "09:00"], ["11:00", "20:00"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.create(
+                class_model=self.class_one, day=self.day,
+                class_time=time(12, 0), school=self.school)
+
+        self.assertEqual(
+            get_intervals(),
+            [["08:00", "09:00"], ["11:00", "11:00"], ["13:00", "20:00"]])
@@ -1,4 +1,6 @@
-from django.urls import path
+from django.urls import path, register_converter
+
+from .converters import OccurrenceIdConverter
 
 from .views import (
     attendance_list, available_time_slots, check_in, class_occurrences,
@@ -9,11 +11,15 @@ from .views import (
     prices, schedules, school_detail, schools, students_view,
     today_class_occurrences, today_classes_list, create_invitation,
     accept_invitation, list_memberships, edit_membership, delete_membership,
-    available_occurrence_time, health,
+    available_occurrence_time, available_week_slots, health, profiles,
+    profile_detail, slow_query_log, scrape_metrics,
 )
 
+register_converter(OccurrenceIdConverter, "occurrence_id")
+
 urlpatterns = [
     path("health/", health, name="health"),
+    path("metrics/", scrape_metrics, name="metrics"),
     path("check_in/", check_in, name="check_in"),
     path("confirm/", confirm, name="confirm"),
     path("attendances/", attendance_list, name="attendances"),
@@ -21,8 +27,8 @@ urlpatterns = [
     path("today_classes_list/", today_classes_list, name="today_classes_list"),
     path("today_class_occurrences/", today_class_occurrences, name="today_class_occurrences"),
     path("class_occurrences/", class_occurrences, name="class_occurrences"),
-    path("class_occurrences/<int:occurrence_id>/delete/", delete_occurrence, name="delete_occurrence"),
-    path("class_occurrences/<int:occurrence_id>/edit/", edit_occurrence, name="edit_occurrence"),
+    path("class_occurrences/<occurrence_id:occurrence_id>/delete/", delete_occurrence, name="delete_occurrence"),
+    path("class_occurrences/<occurrence_id:occurrence_id>/edit/", edit_occurrence, name="edit_occurrence"),
     path("classes/<int:class_id>/edit/", edit_class, name="edit_class"),
     path("classes/<int:class_id>/delete/", delete_class, name="delete_class"),
     path("students/", students_view, name="students"),
@@ -37,6 +43,7 @@ urlpatterns = [
     path("schedules/", schedules, name="schedules"),
     path("schedules/<int:schedule_id>/delete/", delete_schedule, name="delete_schedule"),
     path("available_time_slots/", available_time_slots, name="available_time_slots"),
+    path("available_week_slots/", available_week_slots, name="available_week_slots"),
     path("available_occurrence_time/", available_occurrence_time, name="available_occurrence_time"),
     path("me/", get_user, name="get_user"),
     path("schools/", schools, name="schools"),
@@ -48,4 +55,7 @@ urlpatterns = [
     path("memberships/", list_memberships, name="list_memberships"),
     path("memberships/<int:membership_id>/edit/", edit_membership, name="edit_membership"),
     path("memberships/<int:membership_id>/delete/", delete_membership, name="delete_membership"),
+    path("profiles/", profiles, name="profiles"),
+    path("profiles/<str:profile_id>/", profile_detail, name="profile_detail"),
+    path("slow_queries/", slow_query_log, name="slow_queries"),
 ]
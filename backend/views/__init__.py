@@ -14,7 +14,8 @@ from backend.views.payments import (
     delete_payment, edit_price, payment_summary, payments, prices,
 )
 from backend.views.schedules import (
-    available_occurrence_time, available_time_slots, delete_schedule, schedules,
+    available_occurrence_time, available_time_slots, available_week_slots,
+    delete_schedule, schedules,
 )
 from backend.views.schools import (
     delete_school, edit_school, school_detail, schools,
@@ -30,7 +31,8 @@ from backend.views.invitations import (
 from backend.views.memberships import (
     list_memberships, edit_membership, delete_membership,
 )
-from backend.views.health import health
+from backend.views.health import health, scrape_metrics
+from backend.views.profiling import profile_detail, profiles, slow_query_log
 
 __all__ = [
     "get_user",
@@ -46,6 +48,7 @@ __all__ = [
     "delete_schedule",
     "available_occurrence_time",
     "available_time_slots",
+    "available_week_slots",
     "students_view",
     "list_students",
     "create_student",
@@ -70,4 +73,8 @@ __all__ = [
     "edit_membership",
     "delete_membership",
     "health",
+    "scrape_metrics",
+    "profiles",
+    "profile_detail",
+    "slow_query_log",
 ]
@@ -1,6 +1,7 @@
 import json
 import logging
 
+from django.db import IntegrityError
 from django.utils.timezone import now
 
 logger = logging.getLogger(__name__)
@@ -9,16 +10,32 @@ from django.views.decorators.http import require_http_methods
 
 from django_ratelimit.decorators import ratelimit
 
-from backend.decorators import kiosk_or_above, teacher_or_above
-from backend.models import Attendance, Student
-from backend.serializers import (
-    AttendanceSerializer, CaseSerializer,
+from backend.decorators import (
+    kiosk_or_above, query_budget, reads_from, teacher_or_above,
 )
+from backend.models import Attendance, ClassOccurrence, Student
+from backend.serializers import CaseSerializer
+from backend.services import db_routing, virtual_occurrences
 from backend.views.helpers import (
-    make_error_json_response, make_success_json_response,
+    DUPLICATE_OCCURRENCE_ERROR, make_error_json_response,
+    make_success_json_response,
 )
 
 
+def check_in_query_budget(request):
+    # Materializing a virtual occurrence takes up to five queries.
+    try:
+        occurrence_ids = json.loads(request.body).get(
+            "checkInData", {}).get("classOccurrencesList", [])
+        virtual = sum(
+            1 for occurrence_id in occurrence_ids
+            if virtual_occurrences.parse_virtual_id(occurrence_id))
+    except (AttributeError, TypeError, ValueError):
+        virtual = 0
+    return 6 + 5 * virtual
+
+
+@query_budget(check_in_query_budget)
 @ratelimit(key='ip', rate='30/m', method='POST', block=False)
 @csrf_exempt
 @kiosk_or_above
@@ -36,6 +53,15 @@ def check_in(request):
         if not student_id or not today_date:
             return make_error_json_response("Missing required fields", 400)
 
+        try:
+            student = Student.objects.get(id=student_id, school=request.school)
+        except (Student.DoesNotExist, TypeError, ValueError):
+            return make_error_json_response("Student not found", 404)
+
+        # Checking in to a virtual occurrence materializes it.
+        class_occurrences_list = virtual_occurrences.resolve_ids(
+            request.school, class_occurrences_list)
+
         existing_occurrences = set(
             Attendance.objects.filter(
                 student_id=student_id,
@@ -48,20 +74,30 @@ def check_in(request):
 
         to_add_response, to_delete_response = [], []
 
-        for occ in to_add:
-            data_to_write = {
-                "student_id": student_id,
-                "class_occurrence": occ,
-                "attendance_date": today_date,
-            }
-
-            serializer = AttendanceSerializer(data=data_to_write)
-
-            if serializer.is_valid():
-                serializer.save(school=request.school)
-                to_add_response.append(occ)
-            else:
-                return make_error_json_response(serializer.errors, 400)
+        if to_add:
+            # One query for the occurrences and their classes, one insert.
+            occurrences = list(ClassOccurrence.objects.select_related(
+                "class_model",
+            ).filter(
+                id__in=to_add,
+                school=request.school,
+            ))
+            if len(occurrences) != len(to_add):
+                raise ClassOccurrence.DoesNotExist
+
+            attendances = [
+                Attendance(
+                    school=request.school,
+                    student_id=student,
+                    class_occurrence=occurrence,
+                    attendance_date=today_date,
+                )
+                for occurrence in occurrences
+            ]
+            for attendance in attendances:
+                attendance.fill_fallbacks()
+            Attendance.objects.bulk_create(attendances, ignore_conflicts=True)
+            to_add_response.extend(occurrence.id for occurrence in occurrences)
 
         if to_delete:
             Attendance.objects.filter(
@@ -84,6 +120,11 @@ def check_in(request):
 
         return make_success_json_response(200, response_body=response)
 
+    except ClassOccurrence.DoesNotExist:
+        return make_error_json_response("Class occurrence not found", 404)
+    except IntegrityError:
+        # Another occurrence took a virtual occurrence's slot.
+        return make_error_json_response(DUPLICATE_OCCURRENCE_ERROR, 400)
     except json.JSONDecodeError:
         return make_error_json_response("Invalid JSON", 400)
     except Exception as e:
@@ -91,6 +132,9 @@ def check_in(request):
         return make_error_json_response("An internal error occurred", 500)
 
 
+# Teachers confirm from this list right after students check in on a kiosk.
+@query_budget(2)
+@reads_from(db_routing.PRIMARY)
 @kiosk_or_above
 def get_attended_students(request):
     attended_today = Attendance.objects.filter(
@@ -127,6 +171,7 @@ def get_attended_students(request):
     return make_success_json_response(200, response_body=response)
 
 
+@query_budget(4)
 @teacher_or_above
 @csrf_exempt
 @require_http_methods(["PUT"])
@@ -200,6 +245,7 @@ def confirm(request):
         return make_error_json_response("An internal error occurred", 500)
 
 
+@query_budget(1)
 @teacher_or_above
 @require_http_methods(["GET"])
 def attendance_list(request):
@@ -223,6 +269,8 @@ def attendance_list(request):
 
             attendances = Attendance.objects.filter(
                 school=request.school,
+            ).select_related(
+                "class_occurrence__class_model",
             ).order_by("-attendance_date").filter(
                 attendance_date__month=request_month,
                 attendance_date__year=request_year
@@ -232,6 +280,8 @@ def attendance_list(request):
     else:
         attendances = Attendance.objects.filter(
             school=request.school,
+        ).select_related(
+            "class_occurrence__class_model",
         ).order_by("-attendance_date")
 
     attendance_dict = {}
@@ -1,30 +1,46 @@
 import json
 import logging
-from datetime import datetime
+from datetime import date
 
+from django.db import router, transaction
 from django.views.decorators.csrf import csrf_exempt
 
 logger = logging.getLogger(__name__)
 from django.views.decorators.http import require_http_methods
 
-from backend.decorators import teacher_or_above
-from backend.models import ClassModel, Day, Schedule
+from backend.decorators import (
+    cached_response, conditional_get, query_budget, teacher_or_above,
+)
+from backend.models import ClassModel
 from backend.serializers import ClassModelSerializer
+from backend.services import (
+    occurrence_generation, schedule_conflicts, school_cache, today_snapshots,
+)
 from backend.views.helpers import (
-    make_error_json_response, make_success_json_response,
+    make_error_json_response, make_json_bytes_response,
+    make_schedule_conflict_response, make_success_json_response,
+    parse_fields_param,
 )
 
 
+@query_budget(1)
+@conditional_get(school_cache.CLASSES)
 @teacher_or_above
+@cached_response(school_cache.CLASSES)
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def classes(request):
     if request.method == "GET":
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), ClassModelSerializer)
+        except ValueError as e:
+            return make_error_json_response(str(e), 400)
+
         classes = ClassModel.objects.filter(school=request.school)
-        serializer = ClassModelSerializer(classes, many=True)
 
         response = {
-            "response": serializer.data
+            "response": ClassModelSerializer.fast_data(classes, fields=fields)
         }
 
         return make_success_json_response(200, response_body=response)
@@ -96,12 +112,29 @@ def edit_class(request, class_id):
                 class_instance.name = class_name
 
             if duration_minutes is not None:
+                try:
+                    duration_minutes = int(duration_minutes)
+                except (TypeError, ValueError):
+                    return make_error_json_response(
+                        "Invalid durationMinutes format", 400)
+                if duration_minutes <= 0:
+                    return make_error_json_response(
+                        "Class duration must be positive", 400)
+                if duration_minutes != class_instance.duration_minutes:
+                    conflicts = schedule_conflicts.find_duration_change_conflicts(
+                        request.school.id, class_instance.id,
+                        duration_minutes)
+                    if conflicts:
+                        return make_schedule_conflict_response(conflicts)
                 class_instance.duration_minutes = duration_minutes
 
             if is_recurring is not None and is_recurring != class_instance.is_recurring:
                 class_instance.is_recurring = is_recurring
 
-            class_instance.save()
+            with transaction.atomic(using=router.db_for_write(ClassModel)):
+                class_instance.save()
+                occurrence_generation.refresh_class_occurrences(
+                    request.school, class_instance)
 
             response = ClassModelSerializer.dict_to_camel_case({
                 "message": "Class was updated successfully",
@@ -152,27 +185,7 @@ def delete_class(request, class_id):
             return make_error_json_response("An internal error occurred", 500)
 
 
+@query_budget(2)
 def today_classes_list(request):
-    today_name = datetime.today().strftime("%A")
-
-    today_day_object = Day.objects.filter(name=today_name).first()
-    if not today_day_object:
-        return make_success_json_response(200, response_body={"response": []})
-
-    scheduled_today = Schedule.objects.filter(
-        school=request.school,
-        day=today_day_object
-    ).values("class_model")
-
-    classes = ClassModel.objects.filter(
-        id__in=scheduled_today,
-        school=request.school,
-    )
-
-    serializer = ClassModelSerializer(classes, many=True)
-
-    response = {
-        "response": serializer.data
-    }
-
-    return make_success_json_response(200, response_body=response)
+    return make_json_bytes_response(
+        today_snapshots.classes_snapshot(request.school.id, date.today()))
@@ -1,5 +1,25 @@
-from django.http import JsonResponse
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+
+from ..services import metrics
 
 
 def health(request):
     return JsonResponse({"status": "ok"})
+
+
+def scrape_metrics(request):
+    """The merged metrics of every process, for Prometheus to scrape."""
+    token = settings.METRICS_TOKEN
+    if token is None:
+        if not settings.DEBUG:
+            raise Http404
+    else:
+        header = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+            return JsonResponse({"error": "Invalid metrics token"}, status=401)
+
+    return HttpResponse(
+        metrics.render(metrics.collect()), content_type=metrics.CONTENT_TYPE)
@@ -1,4 +1,11 @@
-from django.http import JsonResponse
+import base64
+import json
+
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+
+from backend.serializers import CaseSerializer
+from backend.services import json_encoding
 
 # Default configuration constants
 DEFAULT_CLASS_NAME = "No name class"
@@ -6,10 +13,23 @@ DEFAULT_CLASS_DURATION_MINUTES = 60
 DEFAULT_DAY_START_TIME = "08:00"
 DEFAULT_DAY_END_TIME = "21:00"
 DEFAULT_TIME_SLOT_STEP_MINUTES = 30
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Raised by the unique constraints on the class or fallback name, date and
+# start time.
+DUPLICATE_OCCURRENCE_ERROR = (
+    "Another occurrence of this class already starts at that date and time")
 
 
-def make_error_json_response(error_message, status_code):
-    return JsonResponse({"error": error_message}, status=status_code)
+def make_json_response(data, status_code=200):
+    """Encode data with the configured JSON encoder backend."""
+    return make_json_bytes_response(json_encoding.dumps(data), status_code)
+
+
+def make_error_json_response(error_message, status_code, details=None):
+    return make_json_response(
+        {"error": error_message, **(details or {})}, status_code)
 
 
 def make_success_json_response(
@@ -17,5 +37,102 @@ def make_success_json_response(
         message="Success",
         response_body=None):
     if response_body:
-        return JsonResponse(response_body, status=status_code)
-    return JsonResponse({"message": message}, status=status_code)
+        return make_json_response(response_body, status_code)
+    return make_json_response({"message": message}, status_code)
+
+
+def make_json_bytes_response(payload, status_code=200):
+    """Send an already encoded JSON body, e.g. a cached snapshot."""
+    return HttpResponse(
+        payload, content_type="application/json", status=status_code)
+
+
+def make_schedule_conflict_response(conflicts):
+    return make_error_json_response(
+        "Schedule conflicts with existing classes",
+        400,
+        details={
+            "conflicts": [
+                CaseSerializer.dict_to_camel_case(conflict)
+                for conflict in conflicts
+            ],
+        },
+    )
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by encode_cursor. Raises ValueError if malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Malformed cursor: {e}") from e
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def parse_page_size(limit_param):
+    """Parse the ``limit`` query parameter. Raises ValueError if invalid."""
+    if limit_param is None:
+        return DEFAULT_PAGE_SIZE
+    limit = int(limit_param)
+    if not (1 <= limit <= MAX_PAGE_SIZE):
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def parse_date_range(start_param, end_param, default_start=None,
+                     default_end=None):
+    """
+    Parse the ``start_date`` and ``end_date`` query parameters, either of
+    which may fall back to a default or None. Raises ValueError if invalid.
+    """
+    dates = []
+    for param, default in ((start_param, default_start),
+                           (end_param, default_end)):
+        if not param:
+            dates.append(default)
+            continue
+        parsed = parse_date(param)
+        if parsed is None:
+            raise ValueError("Invalid date format")
+        dates.append(parsed)
+    start_date, end_date = dates
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    return start_date, end_date
+
+
+def parse_field_list(fields_param, allowed, field_sets=None):
+    """
+    Parse a comma-separated ``fields`` query parameter (camelCase), or the
+    name of one of field_sets, into snake_case names from allowed. Returns
+    None if no fields were requested. Raises ValueError on unknown fields.
+    """
+    if not fields_param:
+        return None
+    if field_sets and fields_param in field_sets:
+        return list(field_sets[fields_param])
+    requested = [
+        CaseSerializer.camel_to_snake(name.strip())
+        for name in fields_param.split(",") if name.strip()
+    ]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(CaseSerializer.snake_to_camel(n) for n in unknown)}")
+    return requested
+
+
+def parse_fields_param(fields_param, serializer_class):
+    """parse_field_list against serializer_class's allow-list and field_sets."""
+    return parse_field_list(
+        fields_param, serializer_class.allowed_fields(),
+        serializer_class.field_sets)
@@ -4,30 +4,45 @@ import logging
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from ..decorators import admin_or_owner
+from ..decorators import admin_or_owner, conditional_get, query_budget
 from ..models import SchoolMembership
 from ..serializers import MembershipSerializer
-from .helpers import make_error_json_response, make_success_json_response
+from ..services import school_cache
+from .helpers import (
+    make_error_json_response, make_success_json_response, parse_field_list,
+)
 
 logger = logging.getLogger(__name__)
 
+# Member fields ?fields= may select, and the columns each one reads.
+MEMBER_FIELDS = {
+    "id": "id",
+    "first_name": "user__first_name",
+    "last_name": "user__last_name",
+    "email": "user__email",
+    "role": "role",
+}
 
+
+@query_budget(1)
+@conditional_get(school_cache.MEMBERSHIPS)
 @admin_or_owner
 @csrf_exempt
 @require_http_methods(["GET"])
 def list_memberships(request):
-    memberships = SchoolMembership.objects.filter(
+    try:
+        fields = parse_field_list(request.GET.get("fields"), MEMBER_FIELDS)
+    except ValueError as e:
+        return make_error_json_response(str(e), 400)
+    if fields is None:
+        fields = list(MEMBER_FIELDS)
+
+    rows = SchoolMembership.objects.filter(
         school=request.school
-    ).select_related("user")
+    ).values_list(*(MEMBER_FIELDS[field] for field in fields))
     members = [
-        MembershipSerializer.dict_to_camel_case({
-            "id": m.id,
-            "first_name": m.user.first_name,
-            "last_name": m.user.last_name,
-            "email": m.user.email,
-            "role": m.role,
-        })
-        for m in memberships
+        MembershipSerializer.dict_to_camel_case(dict(zip(fields, row)))
+        for row in rows
     ]
     return make_success_json_response(200, response_body={"members": members})
 
@@ -1,27 +1,39 @@
 import json
 import logging
-
-from django.db.models import Q
+from datetime import date
 
 logger = logging.getLogger(__name__)
+from django.db import IntegrityError, router, transaction
 from django.utils.dateparse import parse_date, parse_time
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from backend.decorators import kiosk_or_above, teacher_or_above
+from backend.decorators import kiosk_or_above, query_budget, teacher_or_above
 from backend.models import ClassModel, ClassOccurrence, Schedule
 from backend.serializers import ClassModelSerializer, ClassOccurrenceSerializer
+from backend.services import today_snapshots, virtual_occurrences
+from backend.services.occurrence_generation import horizon_end
 from backend.views.helpers import (
     DEFAULT_CLASS_DURATION_MINUTES, DEFAULT_CLASS_NAME,
-    make_error_json_response, make_success_json_response,
+    DUPLICATE_OCCURRENCE_ERROR,
+    make_error_json_response, make_json_bytes_response,
+    make_success_json_response, parse_date_range, parse_fields_param,
 )
 
 
+# A POST inside a transaction adds a savepoint and its release.
+@query_budget(5)
 @kiosk_or_above
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def class_occurrences(request):
     if request.method == "GET":
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), ClassOccurrenceSerializer)
+        except ValueError as e:
+            return make_error_json_response(str(e), 400)
+
         class_id = request.GET.get("class_id")
         if class_id:
             occurrences = ClassOccurrence.objects.filter(
@@ -32,10 +44,35 @@ def class_occurrences(request):
             occurrences = ClassOccurrence.objects.filter(
                 school=request.school,
             )
-        serializer = ClassOccurrenceSerializer(occurrences, many=True)
+
+        default_start = default_end = None
+        if virtual_occurrences.is_enabled():
+            # Virtual occurrences cover the same window generation would have
+            # materialized, unless the caller asks for another one.
+            default_start = date.today()
+            default_end = horizon_end(
+                default_start, request.school.occurrence_horizon_weeks)
+        try:
+            start_date, end_date = parse_date_range(
+                request.GET.get("start_date"), request.GET.get("end_date"),
+                default_start, default_end)
+        except ValueError as e:
+            return make_error_json_response(str(e), 400)
+
+        if start_date:
+            occurrences = occurrences.filter(actual_date__gte=start_date)
+        if end_date:
+            occurrences = occurrences.filter(actual_date__lte=end_date)
+
+        virtual = []
+        if virtual_occurrences.is_enabled():
+            virtual = virtual_occurrences.synthesize(
+                request.school.id, start_date, end_date,
+                class_id=class_id or None)
 
         response = {
-            "response": serializer.data
+            "response": today_snapshots.serialize_occurrences(
+                occurrences, virtual, fields)
         }
 
         return make_success_json_response(200, response_body=response)
@@ -93,10 +130,15 @@ def class_occurrences(request):
             }
 
             serializer = ClassOccurrenceSerializer(data=data_to_write)
-            if serializer.is_valid():
-                saved_occurrence = serializer.save(school=request.school)
-            else:
+            if not serializer.is_valid():
                 return make_error_json_response(serializer.errors, 400)
+            try:
+                with transaction.atomic(
+                        using=router.db_for_write(ClassOccurrence)):
+                    saved_occurrence = serializer.save(school=request.school)
+            except IntegrityError:
+                return make_error_json_response(
+                    DUPLICATE_OCCURRENCE_ERROR, 400)
 
             response = ClassOccurrenceSerializer.dict_to_camel_case({
                 "message": "Class occurrence was created successfully",
@@ -124,10 +166,9 @@ def class_occurrences(request):
 def edit_occurrence(request, occurrence_id):
     if request.method == "PATCH":
         try:
-            occurrence_instance = ClassOccurrence.objects.get(
-                id=occurrence_id,
-                school=request.school,
-            )
+            # Editing or cancelling a virtual occurrence materializes it.
+            occurrence_instance = virtual_occurrences.materialize(
+                request.school, occurrence_id)
 
             request_body = json.loads(request.body)
             actual_date_str = request_body.get("actualDate")
@@ -171,14 +212,19 @@ def edit_occurrence(request, occurrence_id):
 
             serializer = ClassOccurrenceSerializer(
                 occurrence_instance, data=data_to_write, partial=True)
-            if serializer.is_valid():
-                serializer.save(school=request.school)
-            else:
+            if not serializer.is_valid():
                 return make_error_json_response(serializer.errors, 400)
+            try:
+                with transaction.atomic(
+                        using=router.db_for_write(ClassOccurrence)):
+                    serializer.save(school=request.school)
+            except IntegrityError:
+                return make_error_json_response(
+                    DUPLICATE_OCCURRENCE_ERROR, 400)
 
             response = ClassModelSerializer.dict_to_camel_case({
                 "message": "Class Occurrence was updated successfully",
-                "id": occurrence_id,
+                "id": occurrence_instance.id,
                 **data_to_write,
             })
 
@@ -186,6 +232,9 @@ def edit_occurrence(request, occurrence_id):
 
         except ClassOccurrence.DoesNotExist:
             return make_error_json_response("Class occurrence not found", 404)
+        except IntegrityError:
+            # Another occurrence took the virtual occurrence's slot.
+            return make_error_json_response(DUPLICATE_OCCURRENCE_ERROR, 400)
         except json.JSONDecodeError:
             return make_error_json_response("Invalid JSON", 400)
         except Exception as e:
@@ -199,46 +248,48 @@ def edit_occurrence(request, occurrence_id):
 def delete_occurrence(request, occurrence_id):
     if request.method == "DELETE":
         try:
-            occurrence_instance = ClassOccurrence.objects.get(
-                id=occurrence_id,
-                school=request.school,
-            )
+            occurrence_instance = virtual_occurrences.materialize(
+                request.school, occurrence_id)
             occurrence_instance_id = occurrence_instance.id
             class_name = occurrence_instance.safe_class_name
             class_actual_date = occurrence_instance.actual_date
             class_actual_time = occurrence_instance.actual_start_time
 
-            occurrence_instance.delete()
+            # A scheduled occurrence is cancelled instead: without its row,
+            # generation or the virtual schedule would bring it back.
+            if occurrence_instance.schedule_id is not None:
+                occurrence_instance.is_cancelled = True
+                occurrence_instance.save(update_fields=["is_cancelled"])
+                outcome = "cancelled"
+            else:
+                occurrence_instance.delete()
+                outcome = "deleted"
 
             response = ClassModelSerializer.dict_to_camel_case({
-                "message": f"Occurrence for {class_name} at {class_actual_date} {class_actual_time} was deleted successfully",
+                "message": f"Occurrence for {class_name} at {class_actual_date} {class_actual_time} was {outcome} successfully",
                 "occurrence_id": occurrence_instance_id,
+                "is_cancelled": outcome == "cancelled",
             })
 
             return make_success_json_response(200, response_body=response)
 
         except ClassOccurrence.DoesNotExist:
             return make_error_json_response("Class Occurrence not found", 404)
+        except IntegrityError:
+            return make_error_json_response(DUPLICATE_OCCURRENCE_ERROR, 400)
         except Exception as e:
             logger.exception(f"Unexpected error in delete_occurrence (id={occurrence_id}): {e}")
             return make_error_json_response("An internal error occurred", 500)
 
 
+@query_budget(3)
 @kiosk_or_above
 def today_class_occurrences(request):
-    from datetime import date
-
-    today_day = date.today()
-    occurrences = ClassOccurrence.objects.filter(
-        school=request.school,
-    ).filter(
-        Q(planned_date=today_day) | Q(actual_date=today_day)
-    )
-
-    serializer = ClassOccurrenceSerializer(occurrences, many=True)
-
-    response = {
-        "response": serializer.data
-    }
-
-    return make_success_json_response(200, response_body=response)
+    try:
+        fields = parse_fields_param(
+            request.GET.get("fields"), ClassOccurrenceSerializer)
+    except ValueError as e:
+        return make_error_json_response(str(e), 400)
+
+    return make_json_bytes_response(today_snapshots.occurrences_snapshot(
+        request.school.id, date.today(), fields))
@@ -1,7 +1,7 @@
 import json
 import logging
 
-from django.db.models import Sum
+from django.db.models import Q, Sum
 
 logger = logging.getLogger(__name__)
 from django.utils.dateparse import parse_datetime
@@ -9,38 +9,29 @@ from django.utils.timezone import is_naive, make_aware, now
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from backend.decorators import teacher_or_above
+from backend.decorators import (
+    cached_response, conditional_get, query_budget, teacher_or_above,
+)
 from backend.models import ClassModel, Payment, Price, Student
 from backend.serializers import PaymentSerializer, PriceSerializer
+from backend.services import school_cache
 from backend.views.helpers import (
-    make_error_json_response, make_success_json_response,
+    decode_cursor, encode_cursor, make_error_json_response,
+    make_success_json_response, parse_fields_param, parse_page_size,
 )
 
 
+@query_budget(4)
+@conditional_get(school_cache.PRICES)
 @teacher_or_above
+@cached_response(school_cache.PRICES)
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def prices(request):
     if request.method == "GET":
-        prices = Price.objects.filter(
-            school=request.school,
-        )
-
-        price_dict = {}
-
-        for price in prices:
-            inner = {
-                "class_name": price.class_id.name,
-                "amount": price.amount,
-                "price_id": price.id,
-            }
-            inner = PriceSerializer.dict_to_camel_case(inner)
-            price_dict[str(price.class_id.id)] = inner
-
-        result = PriceSerializer.dict_to_camel_case(price_dict)
-
+        # @cached_response already caches the rendered table.
         response = {
-            "response": result
+            "response": build_price_table(request.school.id)
         }
 
         return make_success_json_response(200, response_body=response)
@@ -95,6 +86,25 @@ def prices(request):
             return make_error_json_response("Invalid JSON", 400)
 
 
+def build_price_table(school_id):
+    prices = Price.objects.filter(
+        school_id=school_id,
+    ).values_list("id", "amount", "class_id", "class_id__name")
+
+    price_dict = {}
+
+    for price_id, amount, class_id, class_name in prices:
+        inner = {
+            "class_name": class_name,
+            "amount": amount,
+            "price_id": price_id,
+        }
+        inner = PriceSerializer.dict_to_camel_case(inner)
+        price_dict[str(class_id)] = inner
+
+    return PriceSerializer.dict_to_camel_case(price_dict)
+
+
 @teacher_or_above
 @csrf_exempt
 @require_http_methods(["PATCH"])
@@ -133,6 +143,7 @@ def edit_price(request, price_id):
             return make_error_json_response("Price not found", 404)
 
 
+@query_budget(5)
 @teacher_or_above
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
@@ -140,16 +151,81 @@ def payments(request):
     if request.method == "GET":
         payment_month_param = request.GET.get('month', now().month)
         payment_year_param = request.GET.get('year', now().year)
+        student_id_param = request.GET.get("student_id")
+        class_id_param = request.GET.get("class_id")
+        cursor_param = request.GET.get("cursor")
+        limit_param = request.GET.get("limit")
+
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), PaymentSerializer)
+        except ValueError as e:
+            return make_error_json_response(str(e), 400)
+
         payments = Payment.objects.filter(
             school=request.school,
         ).filter(
             payment_month=payment_month_param,
             payment_year=payment_year_param
         )
-        serializer = PaymentSerializer(payments, many=True)
+
+        if student_id_param:
+            try:
+                student_id = int(student_id_param)
+            except ValueError:
+                return make_error_json_response("Invalid student_id", 400)
+            payments = payments.filter(student_id=student_id)
+        if class_id_param:
+            try:
+                class_id = int(class_id_param)
+            except ValueError:
+                return make_error_json_response("Invalid class_id", 400)
+            payments = payments.filter(class_id=class_id)
+
+        is_paginated = cursor_param is not None or limit_param is not None
+
+        if not is_paginated:
+            response = {
+                "response": PaymentSerializer.fast_data(payments, fields=fields)
+            }
+
+            return make_success_json_response(200, response_body=response)
+
+        try:
+            page_size = parse_page_size(limit_param)
+        except ValueError as e:
+            return make_error_json_response(f"Invalid limit: {e}", 400)
+
+        if cursor_param:
+            try:
+                last_date_str, last_id = decode_cursor(cursor_param)
+                last_date = parse_datetime(last_date_str)
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                return make_error_json_response("Invalid cursor", 400)
+            if last_date is None:
+                return make_error_json_response("Invalid cursor", 400)
+
+            payments = payments.filter(
+                Q(payment_date__lt=last_date) |
+                Q(payment_date=last_date, id__lt=last_id)
+            )
+
+        # The sort key rides along after the serialized columns.
+        plan = PaymentSerializer.read_plan(fields)
+        page = list(payments.order_by("-payment_date", "-id").values_list(
+            *plan.lookups, "payment_date", "id")[:page_size + 1])
+        has_next = len(page) > page_size
+        page = page[:page_size]
+
+        next_cursor = None
+        if has_next:
+            *_, last_date, last_id = page[-1]
+            next_cursor = encode_cursor([last_date.isoformat(), last_id])
 
         response = {
-            "response": serializer.data
+            "response": plan.to_dicts(page),
+            "nextCursor": next_cursor,
         }
 
         return make_success_json_response(200, response_body=response)
@@ -282,6 +358,7 @@ def delete_payment(request, payment_id):
         return make_error_json_response("An internal error occurred", 500)
 
 
+@query_budget(1)
 @teacher_or_above
 def payment_summary(request):
     payment_month_param = request.GET.get("month", now().month)
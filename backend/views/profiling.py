@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from ..decorators import admin_or_owner
+from ..serializers import CaseSerializer
+from ..services import profiling, slow_queries
+from .helpers import make_error_json_response, make_success_json_response
+
+
+@admin_or_owner
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def profiles(request):
+    if request.method == "POST":
+        # Sent as the X-Profile-Token header, e.g. from the device on which
+        # the slow request happens.
+        response = CaseSerializer.dict_to_camel_case({
+            "token": profiling.issue_token(request.school.id),
+            "header": profiling.HEADER,
+            "expires_in": settings.PROFILING_TOKEN_MAX_AGE,
+        })
+        return make_success_json_response(201, response_body=response)
+
+    return make_success_json_response(200, response_body={
+        "profiles": [
+            CaseSerializer.dict_to_camel_case(summary)
+            for summary in profiling.list_profiles(request.school.id)
+        ],
+    })
+
+
+@admin_or_owner
+@require_http_methods(["GET"])
+def profile_detail(request, profile_id):
+    record = profiling.load(profile_id, request.school.id)
+    if record is None:
+        return make_error_json_response("Profile not found", 404)
+
+    record["queries"] = [
+        CaseSerializer.dict_to_camel_case(query) for query in record["queries"]]
+    record["functions"] = [
+        CaseSerializer.dict_to_camel_case(function)
+        for function in record["functions"]]
+    return make_success_json_response(
+        200, response_body=CaseSerializer.dict_to_camel_case(record))
+
+
+@admin_or_owner
+@require_http_methods(["GET"])
+def slow_query_log(request):
+    school_id = request.school.id
+    return make_success_json_response(200, response_body={
+        "recent": [
+            CaseSerializer.dict_to_camel_case(record)
+            for record in slow_queries.log.recent(school_id)
+        ],
+        "top": [
+            CaseSerializer.dict_to_camel_case(entry)
+            for entry in slow_queries.log.top_fingerprints(school_id=school_id)
+        ],
+    })
@@ -1,25 +1,49 @@
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
+from django.db import router, transaction
 from django.utils.dateparse import parse_date, parse_time
 
 logger = logging.getLogger(__name__)
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from backend.decorators import teacher_or_above
+from backend.decorators import (
+    cached_response, conditional_get, query_budget, teacher_or_above,
+)
 from backend.models import ClassModel, ClassOccurrence, Day, Schedule
 from backend.serializers import CaseSerializer, ScheduleSerializer
+from backend.services import (
+    availability, occurrence_generation, schedule_conflicts, school_cache,
+    virtual_occurrences,
+)
 from backend.views.helpers import (
     DEFAULT_DAY_END_TIME,
     DEFAULT_DAY_START_TIME,
     DEFAULT_TIME_SLOT_STEP_MINUTES,
     make_error_json_response,
+    make_schedule_conflict_response,
     make_success_json_response,
+    parse_fields_param,
 )
 
 
+def class_durations(school_id):
+    """
+    The school's class durations. Availability is only cached for these, so
+    clients can not fill the cache with arbitrary keys.
+    """
+    return school_cache.get_or_build(
+        school_id,
+        school_cache.CLASSES,
+        lambda: set(ClassModel.objects.filter(
+            school_id=school_id,
+        ).values_list("duration_minutes", flat=True)),
+        "class_durations",
+    )
+
+
 @teacher_or_above
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -44,13 +68,41 @@ def available_occurrence_time(request):
     except ValueError:
         return make_error_json_response("Invalid duration_minutes format", 400)
 
-    occurrences = ClassOccurrence.objects.filter(
-        actual_date=parsed_date,
-        school=request.school,
+    use_virtual = virtual_occurrences.is_enabled()
+
+    def build():
+        occurrences = list(ClassOccurrence.objects.filter(
+            actual_date=parsed_date,
+            school=request.school,
+        ).only("actual_start_time", "actual_duration"))
+        if use_virtual:
+            occurrences.extend(virtual_occurrences.synthesize(
+                request.school.id, parsed_date, parsed_date))
+        return calculate_available_occurrence_time_intervals(
+            occurrences, duration_minutes, parsed_date)
+
+    today = date.today()
+    cacheable = (
+        today <= parsed_date
+        <= occurrence_generation.horizon_end(
+            today, request.school.occurrence_horizon_weeks)
+        and duration_minutes in class_durations(request.school.id)
     )
-
-    available_slots = calculate_available_occurrence_time_intervals(
-        occurrences, duration_minutes, parsed_date)
+    if cacheable:
+        # Virtual occurrences come from schedules, so their version counts too.
+        schedules_version = (
+            school_cache.get_version(request.school.id, school_cache.SCHEDULES)
+            if use_virtual else None
+        )
+        available_slots = school_cache.get_or_build(
+            request.school.id,
+            school_cache.OCCURRENCES,
+            build,
+            "available_intervals", parsed_date.isoformat(), duration_minutes,
+            schedules_version,
+        )
+    else:
+        available_slots = build()
 
     response = CaseSerializer.dict_to_camel_case({
         "message": "Available time intervals for class occurrence",
@@ -128,7 +180,10 @@ def delete_schedule(request, schedule_id):
             )
             schedule_instance_id = schedule_instance.id
 
-            schedule_instance.delete()
+            with transaction.atomic(using=router.db_for_write(Schedule)):
+                occurrence_generation.remove_future_occurrences(
+                    [schedule_instance_id])
+                schedule_instance.delete()
 
             response = ScheduleSerializer.dict_to_camel_case({
                 "message": f"Schedule {schedule_instance_id} was deleted successfully",
@@ -144,11 +199,20 @@ def delete_schedule(request, schedule_id):
             return make_error_json_response("An internal error occurred", 500)
 
 
+@query_budget(12)
+@conditional_get(school_cache.SCHEDULES)
 @teacher_or_above
+@cached_response(school_cache.SCHEDULES)
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def schedules(request):
     if request.method == "GET":
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), ScheduleSerializer)
+        except ValueError as e:
+            return make_error_json_response(str(e), 400)
+
         class_id = request.GET.get("class_id")
         if class_id:
             schedules = Schedule.objects.filter(
@@ -159,10 +223,9 @@ def schedules(request):
             schedules = Schedule.objects.filter(
                 school=request.school,
             )
-        serializer = ScheduleSerializer(schedules, many=True)
 
         response = {
-            "response": serializer.data
+            "response": ScheduleSerializer.fast_data(schedules, fields=fields)
         }
 
         return make_success_json_response(200, response_body=response)
@@ -197,6 +260,12 @@ def schedules(request):
             except (ValueError, TypeError):
                 return make_error_json_response("Invalid time format", 400)
 
+            conflicts = schedule_conflicts.find_new_schedule_conflicts(
+                request.school.id, day, parsed_time,
+                class_model.duration_minutes)
+            if conflicts:
+                return make_schedule_conflict_response(conflicts)
+
             data_to_write = {
                 "class_model": class_model.id,
                 "day": day.id,
@@ -204,11 +273,14 @@ def schedules(request):
             }
 
             serializer = ScheduleSerializer(data=data_to_write)
-            if serializer.is_valid():
-                saved_schedule = serializer.save(school=request.school)
-            else:
+            if not serializer.is_valid():
                 return make_error_json_response(serializer.errors, 400)
 
+            with transaction.atomic(using=router.db_for_write(Schedule)):
+                saved_schedule = serializer.save(school=request.school)
+                occurrence_generation.sync_schedule_occurrences(
+                    request.school, [saved_schedule.id])
+
             response = ScheduleSerializer.dict_to_camel_case({
                 "message": "Schedule was created successfully",
                 "schedule_id": saved_schedule.id,
@@ -227,6 +299,8 @@ def schedules(request):
             return make_error_json_response("An internal error occurred", 500)
 
 
+# The day, then the school's class durations and schedules on a cache miss.
+@query_budget(3)
 @teacher_or_above
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -255,13 +329,28 @@ def available_time_slots(request):
         logger.exception(f"Unexpected error in available_time_slots looking up day '{day_param}': {e}")
         return make_error_json_response(f"Day {day_param} does not exist", 400)
 
-    schedules = Schedule.objects.filter(
-        day=day_obj,
-        school=request.school,
-    )
-
-    available_slots = calculate_available_time_slots(
-        schedules, duration_minutes)
+    def build():
+        intervals = availability.load_schedule_intervals(
+            request.school.id, day=day_obj)
+        return availability.find_available_slots(
+            intervals,
+            [duration_minutes],
+            DEFAULT_TIME_SLOT_STEP_MINUTES,
+            availability.hhmm_to_minutes(DEFAULT_DAY_START_TIME),
+            availability.hhmm_to_minutes(DEFAULT_DAY_END_TIME),
+            day_names=[day_obj.name],
+        )[day_obj.name][duration_minutes]
+
+    if duration_minutes in class_durations(request.school.id):
+        available_slots = school_cache.get_or_build(
+            request.school.id,
+            school_cache.SCHEDULES,
+            build,
+            "available_slots", day_obj.id, duration_minutes,
+            DEFAULT_TIME_SLOT_STEP_MINUTES,
+        )
+    else:
+        available_slots = build()
 
     response = CaseSerializer.dict_to_camel_case({
         "message": "Available time slots",
@@ -271,60 +360,58 @@ def available_time_slots(request):
     return make_success_json_response(200, response_body=response)
 
 
-def calculate_available_time_slots(
-        schedules,
-        duration_to_fit,
-        step_minutes=None,
-        day_start=None,
-        day_end=None):
-    if step_minutes is None:
-        step_minutes = DEFAULT_TIME_SLOT_STEP_MINUTES
-    if day_start is None:
-        day_start = DEFAULT_DAY_START_TIME
-    if day_end is None:
-        day_end = DEFAULT_DAY_END_TIME
-    available_slots, taken_slots = [], []
-    base_date = datetime.today().date()
-
-    dummy_day_start_class = datetime.combine(
-        base_date, datetime.strptime(
-            day_start, "%H:%M").time())
-    dummy_day_end_class = datetime.combine(
-        base_date, datetime.strptime(
-            day_end, "%H:%M").time())
-    taken_slots.append({"start_time": dummy_day_start_class,
-                       "end_time": dummy_day_start_class})
-
-    for schedule in schedules:
-        start_time = datetime.combine(base_date, schedule.class_time)
-        class_duration = schedule.class_model.duration_minutes
-        end_time = start_time + timedelta(minutes=class_duration)
-        taken_slots.append({"start_time": start_time, "end_time": end_time})
-
-    taken_slots.append({"start_time": dummy_day_end_class,
-                       "end_time": dummy_day_end_class})
-
-    len_taken_slots = len(taken_slots)
-
-    taken_slots = sorted(taken_slots, key=lambda x: x["start_time"])
-
-    for i in range(len_taken_slots - 1):
-        window_start = taken_slots[i]["end_time"]
-        window_end = taken_slots[i + 1]["start_time"]
-
-        time_interval = window_end - window_start
-        interval_minutes = int(time_interval.total_seconds() // 60)
+# The school's class durations and its schedules, each on a cache miss.
+@query_budget(2)
+@teacher_or_above
+@csrf_exempt
+@require_http_methods(["GET"])
+def available_week_slots(request):
+    duration_params = [
+        value.strip()
+        for param in request.GET.getlist("duration")
+        for value in param.split(",") if value.strip()
+    ]
+
+    if not duration_params:
+        return make_error_json_response("Class duration was not provided", 400)
 
-        if interval_minutes < duration_to_fit:
-            continue
-        else:
-            duration = timedelta(minutes=duration_to_fit)
-            step = timedelta(minutes=step_minutes)
-            candidate_start = window_start
+    try:
+        durations = sorted({int(value) for value in duration_params})
+    except ValueError:
+        return make_error_json_response("Invalid duration_minutes format", 400)
+    if durations[0] <= 0:
+        return make_error_json_response("Class duration must be positive", 400)
+
+    def build():
+        intervals = availability.load_schedule_intervals(request.school.id)
+        return availability.find_available_slots(
+            intervals,
+            durations,
+            DEFAULT_TIME_SLOT_STEP_MINUTES,
+            availability.hhmm_to_minutes(DEFAULT_DAY_START_TIME),
+            availability.hhmm_to_minutes(DEFAULT_DAY_END_TIME),
+        )
+
+    if set(durations) <= class_durations(request.school.id):
+        week_slots = school_cache.get_or_build(
+            request.school.id,
+            school_cache.SCHEDULES,
+            build,
+            "available_week_slots", ",".join(map(str, durations)),
+            DEFAULT_TIME_SLOT_STEP_MINUTES,
+        )
+    else:
+        week_slots = build()
 
-            while candidate_start + duration <= window_end:
-                available_slots.append(
-                    candidate_start.time().strftime("%H:%M"))
-                candidate_start += step
+    response = CaseSerializer.dict_to_camel_case({
+        "message": "Available time slots for the week",
+        "available_slots": {
+            day_name: {
+                str(duration): slots
+                for duration, slots in slots_by_duration.items()
+            }
+            for day_name, slots_by_duration in week_slots.items()
+        },
+    })
 
-    return available_slots
+    return make_success_json_response(200, response_body=response)
@@ -10,6 +10,7 @@ from django.views.decorators.http import require_http_methods
 from backend.decorators import admin_or_owner, any_authenticated_user
 from backend.models import School, SchoolMembership
 from backend.serializers import SchoolSerializer
+from backend.services.occurrence_generation import generate_horizon_occurrences
 from backend.views.helpers import (
     make_error_json_response, make_success_json_response,
 )
@@ -108,6 +109,7 @@ def edit_school(request, school_id):
         phone = request_body.get("phone")
         address = request_body.get("address")
         logo_url = request_body.get("logoUrl")
+        occurrence_horizon_weeks = request_body.get("occurrenceHorizonWeeks")
 
         data_to_write = {}
         if name is not None:
@@ -121,6 +123,8 @@ def edit_school(request, school_id):
             data_to_write["address"] = address
         if logo_url is not None:
             data_to_write["logo_url"] = logo_url
+        if occurrence_horizon_weeks is not None:
+            data_to_write["occurrence_horizon_weeks"] = occurrence_horizon_weeks
 
         if not data_to_write:
             return make_error_json_response("No fields to update", 400)
@@ -131,6 +135,9 @@ def edit_school(request, school_id):
         else:
             return make_error_json_response(serializer.errors, 400)
 
+        if "occurrence_horizon_weeks" in data_to_write:
+            generate_horizon_occurrences(school_ids=[school.id])
+
         response = {
             "message": "School was updated successfully",
             "school_id": school.id,
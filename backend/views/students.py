@@ -6,14 +6,19 @@ from django.views.decorators.csrf import csrf_exempt
 logger = logging.getLogger(__name__)
 from django.views.decorators.http import require_http_methods
 
-from backend.decorators import kiosk_or_above, teacher_or_above
+from backend.decorators import (
+    conditional_get, kiosk_or_above, query_budget, teacher_or_above,
+)
 from backend.models import Student
 from backend.serializers import StudentSerializer
+from backend.services import school_cache
 from backend.views.helpers import (
-    make_error_json_response, make_success_json_response,
+    make_error_json_response, make_success_json_response, parse_fields_param,
 )
 
 
+@query_budget(1)
+@conditional_get(school_cache.STUDENTS)
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def students_view(request):
@@ -27,13 +32,18 @@ def students_view(request):
 @kiosk_or_above
 @require_http_methods(["GET"])
 def list_students(request):
+    try:
+        fields = parse_fields_param(
+            request.GET.get("fields"), StudentSerializer)
+    except ValueError as e:
+        return make_error_json_response(str(e), 400)
+
     students = Student.objects.filter(
         school=request.school,
     )
-    serializer = StudentSerializer(students, many=True)
 
     response = {
-        "response": serializer.data
+        "response": StudentSerializer.fast_data(students, fields=fields)
     }
 
     return make_success_json_response(200, response_body=response)
@@ -62,7 +62,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,14 +73,60 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'backend.middleware.ClerkAuthenticationMiddleware',
+    'backend.middleware.ConditionalGetMiddleware',
+    'backend.middleware.DatabaseRoutingMiddleware',
+    'backend.middleware.ProfilingMiddleware',
+    'backend.middleware.SlowQueryMiddleware',
+    'backend.middleware.QueryBudgetMiddleware',
 ]
 
+# What to do when a view runs more queries than its @query_budget: "log",
+# "raise" or "off" (see services.query_budget).
+QUERY_BUDGET_MODE = 'log'
+
+# Request profiling (services.profiling): the share of requests profiled
+# without a token, how long a profiling token lasts, and where the newest
+# PROFILING_MAX_PROFILES profiles are kept.
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_PROFILES = 100
+
+# Slow-query log (services.slow_queries): queries slower than the threshold
+# (None turns the log off) are logged and the last SLOW_QUERY_BUFFER_SIZE
+# kept, with an EXPLAIN per query fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL
+# seconds.
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_BUFFER_SIZE = 500
+SLOW_QUERY_EXPLAIN_INTERVAL = 5 * 60
+SLOW_QUERY_MAX_FINGERPRINTS = 1000
+
+# Metrics (services.metrics): every process publishes its counters to the
+# cache at most every METRICS_PUBLISH_INTERVAL seconds and drops out of
+# /backend/metrics/ METRICS_PROCESS_TIMEOUT seconds after its last publish.
+# Scrapers send METRICS_TOKEN as a bearer token; without one the endpoint is
+# only served with DEBUG on.
+METRICS_PUBLISH_INTERVAL = 10
+METRICS_PROCESS_TIMEOUT = 60 * 60
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Responses smaller than this are not worth compressing.
+COMPRESSION_MIN_SIZE = 1024
+# Fast levels: most of the size win on JSON for a fraction of the CPU.
+COMPRESSION_GZIP_LEVEL = 1
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Per-process tier of the response cache (services.response_cache); the
+# shared tier is the default Django cache.
+RESPONSE_CACHE_LOCAL_MAX_BYTES = 16 * 1024 * 1024
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:8081',
 ]
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "X-School-ID",
+    "X-Profile-Token",
 ]
 
 ROOT_URLCONF = 'check_in_backend.urls'
@@ -112,6 +160,21 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = [
+    'backend.services.db_routing.ShardRouter',
+    'backend.services.db_routing.ReplicaRouter',
+]
+
+# Where School, User and SchoolMembership live, and the aliases a school's
+# data can live on (School.shard; see services.db_routing).
+DATABASE_DIRECTORY_ALIAS = 'default'
+DATABASE_SHARDS = ['default']
+
+# Alias of a read replica for GET requests (see services.db_routing), and
+# how long a user stays on the primary after writing to a school.
+DATABASE_REPLICA_ALIAS = None
+DATABASE_REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -163,10 +226,48 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "America/Los_Angeles"
 CELERY_ENABLE_UTC = True
 
+# "auto" uses orjson when it is installed and the stdlib json otherwise.
+JSON_ENCODER_BACKEND = "auto"
+
+# When on, class occurrences are synthesized from schedules on read and only
+# stored once checked in to, edited or cancelled; nothing is generated ahead.
+VIRTUAL_OCCURRENCES = False
+
+# Nightly occurrence generation is spread over a window (in CELERY_TIMEZONE):
+# each school is hashed into one bucket of the window, and a catch-up pass
+# at the end of the window retries schools whose generation did not finish.
+# The bucket length must divide 60.
+OCCURRENCE_GENERATION_WINDOW_START_HOUR = 1
+OCCURRENCE_GENERATION_WINDOW_MINUTES = 4 * 60
+OCCURRENCE_GENERATION_BUCKET_MINUTES = 15
+
+_generation_window_end = (
+    OCCURRENCE_GENERATION_WINDOW_START_HOUR * 60
+    + OCCURRENCE_GENERATION_WINDOW_MINUTES
+)
+
 CELERY_BEAT_SCHEDULE = {
-    'create-class-occurrences-weekly': {
-        'task': 'backend.tasks.create_class_occurrences',
-        'schedule': crontab(hour=0, minute=0, day_of_week='sunday'),
+    'generate-class-occurrences-staggered': {
+        'task': 'backend.tasks.generate_due_class_occurrences',
+        'schedule': crontab(
+            minute=f'*/{OCCURRENCE_GENERATION_BUCKET_MINUTES}',
+            hour=','.join(
+                str((OCCURRENCE_GENERATION_WINDOW_START_HOUR + hour) % 24)
+                for hour in range(-(-OCCURRENCE_GENERATION_WINDOW_MINUTES // 60))
+            ),
+        ),
+    },
+    'catch-up-class-occurrences': {
+        'task': 'backend.tasks.catch_up_class_occurrences',
+        'schedule': crontab(
+            hour=(_generation_window_end // 60) % 24,
+            minute=_generation_window_end % 60,
+        ),
+    },
+    # After generation and before the studios open.
+    'warm-today-snapshots': {
+        'task': 'backend.tasks.warm_today_snapshots',
+        'schedule': crontab(hour=6, minute=0),
     },
 }
 
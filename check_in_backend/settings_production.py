@@ -61,6 +61,31 @@ DATABASES = {
     }
 }
 
+# Optional streaming replica of the same database for read-only requests.
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+    }
+    DATABASE_REPLICA_ALIAS = "replica"
+
+# Optional tenant shards besides the default database, e.g.
+# DB_SHARD_HOSTS="shard_1=db-1.internal,shard_2=db-2.internal". Schools are
+# moved onto them with manage.py move_school_shard.
+for _alias, _, _host in (
+        _entry.strip().partition("=")
+        for _entry in os.environ.get("DB_SHARD_HOSTS", "").split(",")
+        if _entry.strip()):
+    DATABASES[_alias] = {**DATABASES["default"], "HOST": _host}
+    DATABASE_SHARDS = [*DATABASE_SHARDS, _alias]
+
+# Query budgets are enforced in development and tests; don't pay for
+# counting every query here.
+QUERY_BUDGET_MODE = "off"
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
 # ── Static files ──────────────────────────────────────────────────────────────
 # collectstatic dumps files to staticfiles/; serve that directory via your
 # platform's static hosting or a CDN. Django admin CSS/JS needs this.
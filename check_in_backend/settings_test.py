@@ -22,6 +22,23 @@ CACHES = {
 # Run Celery tasks synchronously in the test process — no broker needed.
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+# Chords still track their results eagerly; keep them in memory too.
+CELERY_RESULT_BACKEND = "cache+memory://"
+
+# Separate SQLite databases stand in for the read replica and a second
+# tenant shard in the routing tests; nothing is routed to them unless
+# DATABASE_REPLICA_ALIAS or DATABASE_SHARDS say so.
+DATABASES["replica"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": ":memory:",
+}
+DATABASES["shard_1"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": ":memory:",
+}
+
+# A view going over its @query_budget fails the test.
+QUERY_BUDGET_MODE = "raise"
 
 # MD5 is much faster than the default PBKDF2 for tests.
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]